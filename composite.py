@@ -0,0 +1,93 @@
+"""Composite waveform kept as a running sum of per-signal components.
+
+generate_composite_iq regenerates every carrier whenever anything in the
+signal list changes. IncrementalComposite instead caches each enabled
+signal's component (keyed by its definition) and keeps their sum, so adding,
+deleting or toggling one signal costs one vector add/subtract plus at most
+one component generation. Normalization is applied when the composite is
+read, not folded into the sum.
+"""
+import threading
+
+import numpy as np
+
+from waveform_cache import WaveformCache, waveform_key
+
+REBUILD_EVERY = 64   # incremental updates before the sum is rebuilt to shed float32 rounding
+
+
+class IncrementalComposite:
+    """Running sum of signal components.
+
+    generate_component(sig, sample_rate, num_samples) must return a complex
+    array of num_samples. Components that are toggled off stay in `cache` so
+    toggling them back on is free. The array of each active component is held
+    until it is removed and subtracted as is: a cache eviction followed by a
+    regeneration (unseeded noise or symbols) would not give back the same
+    samples.
+    """
+
+    def __init__(self, generate_component, cache=None, rebuild_every=REBUILD_EVERY):
+        self.generate_component = generate_component
+        self.cache = cache if cache is not None else WaveformCache(max_bytes=512 * 1024 * 1024)
+        self.rebuild_every = rebuild_every
+        self._shape = None        # (sample_rate, num_samples) the sum was built for
+        self._sum = None
+        self._active = {}         # component key -> (signal dict, complex64 array added to the sum)
+        self._updates = 0
+        self._lock = threading.RLock()
+
+    def _component_keys(self, signals, sample_rate, num_samples):
+        """Key per enabled signal; identical signals get distinct keys so they stay independent."""
+        keys = {}
+        seen = {}
+        for sig in signals:
+            if not sig.get('enabled', True):
+                continue
+            sig = {k: v for k, v in sig.items() if k != 'enabled'}
+            base = waveform_key([sig], sample_rate, num_samples)
+            copy = seen.get(base, 0)
+            seen[base] = copy + 1
+            keys[waveform_key([sig], sample_rate, num_samples, copy=copy)] = sig
+        return keys
+
+    def component(self, key, sig, sample_rate, num_samples):
+        """Cached complex64 component for one signal."""
+        iq = self.cache.get_or_create(key, lambda: self.generate_component(sig, sample_rate, num_samples))
+        return iq.view(np.complex64)
+
+    def update(self, signals, sample_rate, num_samples):
+        """Bring the sum in line with `signals`; returns the (unnormalized) sum."""
+        with self._lock:
+            return self._update(signals, sample_rate, num_samples)
+
+    def _update(self, signals, sample_rate, num_samples):
+        wanted = self._component_keys(signals, sample_rate, num_samples)
+        removed = [k for k in self._active if k not in wanted]
+        added = [k for k in wanted if k not in self._active]
+        rebuild = (self._shape != (sample_rate, num_samples) or self._updates >= self.rebuild_every
+                   or len(removed) + len(added) >= max(len(wanted), 1))
+        if rebuild:
+            self._sum = np.zeros(num_samples, dtype=np.complex64)
+            self._active = {}
+            self._shape = (sample_rate, num_samples)
+            self._updates = 0
+            removed, added = [], list(wanted)
+        elif removed or added:
+            self._updates += 1
+        for k in removed:
+            self._sum -= self._active.pop(k)[1]
+        for k in added:
+            iq = self.component(k, wanted[k], sample_rate, num_samples)
+            self._sum += iq
+            self._active[k] = (wanted[k], iq)
+        return self._sum
+
+    def normalized(self, signals, sample_rate, num_samples):
+        """Composite scaled to unit peak (a new complex64 array)."""
+        with self._lock:
+            iq = self._update(signals, sample_rate, num_samples).copy()
+        peak = np.max(np.abs(iq)) if iq.size else 0
+        if peak > 0:
+            iq /= peak
+        return iq
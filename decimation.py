@@ -0,0 +1,93 @@
+"""Display decimation for long traces.
+
+Plots only need about one point per pixel column. minmax_decimate keeps the
+extremes of each column so peaks and envelopes survive; lttb
+(Largest-Triangle-Three-Buckets) keeps the visually most significant sample
+of each bucket. Both take a 1-D array or an (n, channels) array. lttb picks
+one sample per bucket for all channels, so I and Q stay paired; minmax takes
+each channel's extremes separately, so every trace keeps its envelope but a
+point's I and Q generally come from different samples.
+"""
+import numpy as np
+
+
+def bucket_edges(n, buckets):
+    """Start index of each of `buckets` near-equal buckets over n samples."""
+    return (np.arange(buckets) * n) // buckets
+
+
+def minmax_decimate(y, width):
+    """Per-bucket min and max of y over `width` buckets.
+
+    Returns (positions, values) with 2*width points (min then max of each
+    bucket, both placed at the bucket start); y is returned unchanged when it
+    already has no more than 2*width samples. For (n, channels) input the min
+    and max are per channel, so the channels of one output point need not come
+    from the same sample: right for plotting I and Q against time, wrong for
+    an I/Q scatter (use lttb).
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+    if width <= 0 or n <= 2 * width:
+        return np.arange(n), y
+    edges = bucket_edges(n, width)
+    lo = np.minimum.reduceat(y, edges, axis=0)
+    hi = np.maximum.reduceat(y, edges, axis=0)
+    values = np.empty((2 * width,) + y.shape[1:], dtype=y.dtype)
+    values[0::2] = lo
+    values[1::2] = hi
+    return np.repeat(edges, 2), values
+
+
+def lttb(y, width):
+    """Largest-Triangle-Three-Buckets down to `width` points.
+
+    Returns (positions, values). Multi-channel input sums the triangle areas
+    across channels. The first and last samples are always kept.
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+    if width < 3 or n <= width:
+        return np.arange(n), y
+    yy = y.reshape(n, -1).astype(np.float64)
+    # inner buckets cover samples 1 .. n-2
+    edges = 1 + bucket_edges(n - 2, width - 2)
+    edges = np.append(edges, n - 1)
+    # average point of every bucket, used as the third vertex for the previous one
+    counts = np.diff(edges)
+    avg_y = np.add.reduceat(yy[1:n - 1], edges[:-1] - 1, axis=0) / counts[:, None]
+    avg_x = (edges[:-1] + edges[1:] - 1) / 2.0
+    positions = np.empty(width, dtype=np.int64)
+    positions[0] = 0
+    positions[-1] = n - 1
+    a = 0
+    for b in range(width - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if b + 1 < width - 2:
+            cx, cy = avg_x[b + 1], avg_y[b + 1]
+        else:
+            cx, cy = n - 1, yy[n - 1]
+        xs = np.arange(lo, hi)
+        # twice the triangle area (a, candidate, c) for each candidate, summed over channels
+        area = np.abs((a - cx) * (yy[lo:hi] - yy[a]) - (a - xs)[:, None] * (cy - yy[a])).sum(axis=1)
+        a = lo + int(np.argmax(area))
+        positions[b + 1] = a
+    return positions, y[positions]
+
+
+def peak_decimate(y, width, x=None):
+    """Max of y over `width` buckets (for spectra, so narrow peaks are not lost).
+
+    Returns (x, values); x is the bucket centre of `x` (or of the index when
+    x is None). y is returned unchanged when it has no more than width points.
+    """
+    y = np.asarray(y)
+    n = y.shape[0]
+    if x is None:
+        x = np.arange(n)
+    if width <= 0 or n <= width:
+        return x, y
+    edges = bucket_edges(n, width)
+    ends = np.append(edges[1:], n)
+    centres = (x[edges] + x[ends - 1]) / 2
+    return centres, np.maximum.reduceat(y, edges, axis=0)
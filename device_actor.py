@@ -0,0 +1,217 @@
+"""Single-thread owner of a VSG60 handle.
+
+Request handlers and the sweep thread used to call the vsg_api wrapper
+directly, serialized by a lock. The DeviceActor instead owns the handle and
+runs every command on its own thread, in submission order, taking them from
+a queue and returning concurrent.futures.Future objects. Each turn drains
+everything queued, which allows two optimizations without reordering anything
+observable:
+
+- setters in COALESCED (frequency, level, sample rate) queued back to back
+  collapse to the last value, and a setter matching the value already applied
+  is skipped;
+- identical status reads in the same turn run once and share the result.
+
+Queue wait and execution time are recorded per command so latency can be
+measured and bounded. call() waits COMMAND_TIMEOUT for most commands; a
+waveform upload gets extra time per sample (see command_timeout), since
+transferring a long waveform can take far longer than any other command.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+COALESCED = ('vsg_set_frequency', 'vsg_set_level', 'vsg_set_sample_rate')
+STATUS_READS = ('vsg_get_serial_number', 'vsg_get_firmware_version', 'vsg_get_cal_date',
+                'vsg_read_temperature', 'vsg_get_RF_output_state', 'vsg_get_frequency',
+                'vsg_get_sample_rate', 'vsg_get_level', 'vsg_is_waveform_active', 'vsg_get_USB_status')
+COMMAND_TIMEOUT = 5.0
+# calls whose second argument is a sample count, and the time added per sample
+UPLOADS = ('vsg_repeat_waveform', 'vsg_submit_IQ')
+UPLOAD_SECONDS_PER_SAMPLE = 1e-6
+
+
+def command_timeout(name, args):
+    """Seconds to wait for vsg.<name>(handle, *args): COMMAND_TIMEOUT, plus the upload time of a waveform."""
+    if name in UPLOADS and len(args) >= 2:
+        return COMMAND_TIMEOUT + int(args[1]) * UPLOAD_SECONDS_PER_SAMPLE
+    return COMMAND_TIMEOUT
+
+
+class Command:
+    __slots__ = ('name', 'args', 'future', 'queued_at')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class DeviceActor:
+    """Runs vsg_api calls for one device on a dedicated thread.
+
+    submit(name, *args) calls vsg.<name>(handle, *args) and returns a Future.
+    open()/close() are commands too, so they are ordered with everything else.
+    """
+
+    def __init__(self, vsg, open_name='vsg_open_device', open_args=(), name='vsg-device-actor'):
+        self.vsg = vsg
+        self.open_name = open_name
+        self.open_args = open_args
+        self.handle = None
+        self._queue = queue.Queue()
+        self._applied = {}          # setter -> args last sent
+        self._thread = threading.Thread(target=self._run, daemon=True, name=name)
+        self._thread.start()
+        self.executed = 0
+        self.coalesced = 0
+        self.max_wait = 0.0
+        self.max_exec = 0.0
+        self.total_wait = 0.0
+
+    # ---- client side ----
+
+    def submit(self, name, *args):
+        cmd = Command(name, args)
+        self._queue.put(cmd)
+        return cmd.future
+
+    def call(self, name, *args, timeout=None):
+        """submit() and wait for the result, for `timeout` seconds (default command_timeout(name, args))."""
+        if timeout is None:
+            timeout = command_timeout(name, args)
+        return self.submit(name, *args).result(timeout)
+
+    def open(self):
+        """Future resolving to the handle (opens the device if needed)."""
+        return self.submit('_open')
+
+    def close(self):
+        return self.submit('_close')
+
+    def read_status(self, names=STATUS_READS):
+        """Future resolving to {name: result} for several reads done in one turn."""
+        return self.submit('_status', tuple(names))
+
+    def stats(self):
+        return {"open": self.handle is not None, "executed": self.executed, "coalesced": self.coalesced,
+                "queued": self._queue.qsize(), "max_wait": self.max_wait, "max_exec": self.max_exec,
+                "mean_wait": self.total_wait / self.executed if self.executed else 0.0}
+
+    # ---- actor thread ----
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        setters = {}   # name -> [commands], flushed in first-seen order at the next other command
+        reads = {}     # (name, args) -> result shared within the turn
+        for cmd in batch:
+            if cmd.name in COALESCED:
+                setters.setdefault(cmd.name, []).append(cmd)
+                continue
+            if self._flush_setters(setters):
+                reads.clear()
+            if cmd.name in STATUS_READS:
+                key = (cmd.name, cmd.args)
+                if key in reads:
+                    self._resolve(cmd, *reads[key])
+                    self.coalesced += 1
+                    continue
+                reads[key] = self._execute(cmd)
+            else:
+                # anything else may change device state, so later reads must go to the device
+                reads.clear()
+                if cmd.name in ('vsg_preset', 'vsg_recal'):
+                    self._applied.clear()
+                self._execute(cmd)
+        self._flush_setters(setters)
+
+    def _flush_setters(self, setters):
+        """Run the pending setters; True if any reached the device (cached reads are then stale)."""
+        executed = False
+        for name, cmds in setters.items():
+            last = cmds[-1]
+            if self._applied.get(name) == last.args and self.handle is not None:
+                outcome = ({"status": 0}, None)
+                self._resolve(last, *outcome)
+            else:
+                outcome = self._execute(last)
+                executed = True
+                result, error = outcome
+                # a failed set (negative status from the dict-returning wrappers) is not applied
+                if error is None and (not isinstance(result, dict) or result.get("status", -1) >= 0):
+                    self._applied[name] = last.args
+                else:
+                    self._applied.pop(name, None)
+            for cmd in cmds[:-1]:
+                self._resolve(cmd, *outcome)
+            self.coalesced += len(cmds) - 1
+        setters.clear()
+        return executed
+
+    def _execute(self, cmd):
+        start = time.perf_counter()
+        wait = start - cmd.queued_at
+        try:
+            result, error = self._dispatch(cmd), None
+        except BaseException as exc:  # the wrapper's error_check calls exit()
+            result, error = None, exc if isinstance(exc, Exception) else RuntimeError(
+                f"{cmd.name} failed: {exc!r}")
+        self.executed += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.max_exec = max(self.max_exec, time.perf_counter() - start)
+        self._resolve(cmd, result, error)
+        return result, error
+
+    def _resolve(self, cmd, result, error):
+        if error is not None:
+            cmd.future.set_exception(error)
+        else:
+            cmd.future.set_result(result)
+
+    def _dispatch(self, cmd):
+        if self.vsg is None:
+            raise RuntimeError("VSG API not available")
+        if cmd.name == '_open':
+            if self.handle is None:
+                result = getattr(self.vsg, self.open_name)(*self.open_args)
+                if result.get("status", -1) != 0:
+                    raise RuntimeError(f"Failed to open device: {result}")
+                self.handle = result["handle"]
+                self._applied.clear()
+            return self.handle
+        if cmd.name == '_close':
+            if self.handle is not None:
+                try:
+                    self.vsg.vsg_abort(self.handle)
+                except Exception:
+                    pass
+                try:
+                    self.vsg.vsg_close_device(self.handle)
+                finally:
+                    # a unit that fails to close (e.g. unplugged) is gone either way
+                    self.handle = None
+                    self._applied.clear()
+            return None
+        if self.handle is None:
+            raise RuntimeError("Device not open")
+        if cmd.name == '_status':
+            out = {}
+            for name in cmd.args[0]:
+                try:
+                    out[name] = getattr(self.vsg, name)(self.handle)
+                except BaseException:
+                    out[name] = None
+            return out
+        return getattr(self.vsg, cmd.name)(self.handle, *cmd.args)
@@ -0,0 +1,165 @@
+"""Several VSG60s in one process, each behind its own DeviceActor.
+
+web_vsg drives a single device through one actor that opens whichever unit
+the API hands out first. The DeviceManager enumerates the connected units,
+opens them by serial number and gives each serial its own actor (so its own
+command thread and queue) and its own lock for callers that need a run of
+commands on one unit without another scenario interleaving. Commands for
+different units never wait on each other: dispatch() queues every unit's
+commands on that unit's actor at once and returns the futures, so a scenario
+that sets up four units costs about as long as the slowest unit rather than
+the sum of all four.
+"""
+import threading
+
+from device_actor import DeviceActor, COMMAND_TIMEOUT, command_timeout
+
+
+def split_span(start, stop, count):
+    """Edges of `count` equal contiguous segments of [start, stop], as (lo, hi) pairs."""
+    width = (stop - start) / count
+    return [(start + i * width, start + (i + 1) * width) for i in range(count)]
+
+
+class DeviceManager:
+    """Registry of per-serial device actors.
+
+    `default` is the application's existing single-device actor (opened with
+    vsg_open_device). When it already holds a unit, asking for that unit's
+    serial returns the default actor rather than trying to open the unit twice.
+    """
+
+    def __init__(self, vsg, default=None):
+        self.vsg = vsg
+        self.default = default
+        self._actors = {}      # serial -> DeviceActor
+        self._locks = {}       # serial -> threading.Lock
+        self._lock = threading.Lock()
+        self._default_serial = (None, None)   # (handle, serial) of the default actor's unit
+
+    def enumerate(self):
+        """Serial numbers of the connected units (the default actor's unit included)."""
+        if self.vsg is None:
+            raise RuntimeError("VSG API not available")
+        if not hasattr(self.vsg, 'vsg_get_device_list'):
+            raise RuntimeError("backend cannot list devices")
+        result = self.vsg.vsg_get_device_list()
+        if result.get("status", -1) < 0:
+            raise RuntimeError(f"Failed to list devices: {result}")
+        serials = list(result["serials"])
+        serial = self.default_serial()
+        if serial is not None and serial not in serials:
+            serials.append(serial)
+        return serials
+
+    def default_serial(self):
+        """Serial of the unit the default actor holds, None when it holds none."""
+        if self.default is None or self.default.handle is None:
+            return None
+        handle, serial = self._default_serial
+        if handle != self.default.handle:
+            try:
+                serial = self.default.call('vsg_get_serial_number')["serial"]
+            except Exception:
+                return None
+            self._default_serial = (self.default.handle, serial)
+        return serial
+
+    def actor(self, serial):
+        """The actor for `serial`, created (not yet opened) on first use."""
+        serial = int(serial)
+        if serial == self.default_serial():
+            return self.default
+        with self._lock:
+            actor = self._actors.get(serial)
+            if actor is None:
+                actor = self._actors[serial] = DeviceActor(
+                    self.vsg, open_name='vsg_open_device_by_serial', open_args=(serial,),
+                    name=f'vsg-device-{serial}')
+                self._locks[serial] = threading.Lock()
+            return actor
+
+    def lock(self, serial):
+        """Lock reserving `serial` for a sequence of commands."""
+        self.actor(serial)
+        serial = int(serial)
+        with self._lock:
+            return self._locks.setdefault(serial, threading.Lock())
+
+    def open(self, serials, timeout=COMMAND_TIMEOUT):
+        """Open the units in parallel; {serial: handle}.
+
+        If any unit fails to open, the units this call opened are closed again
+        and the first failure is raised.
+        """
+        actors = {int(s): self.actor(s) for s in serials}
+        was_open = {s for s, a in actors.items() if a.handle is not None}
+        futures = {s: a.open() for s, a in actors.items()}
+        handles, error = {}, None
+        for s, f in futures.items():
+            try:
+                handles[s] = f.result(timeout)
+            except Exception as exc:
+                error = error or exc
+        if error is not None:
+            opened = [actors[s] for s in handles if s not in was_open and actors[s] is not self.default]
+            for f in [a.close() for a in opened]:
+                try:
+                    f.result(timeout)
+                except Exception:
+                    pass
+            raise error
+        return handles
+
+    def close(self, serials=None, timeout=COMMAND_TIMEOUT):
+        """Close the given units (all opened by the manager when None) in parallel."""
+        with self._lock:
+            serials = list(self._actors) if serials is None else [int(s) for s in serials]
+            actors = [self._actors[s] for s in serials if s in self._actors]
+        for f in [a.close() for a in actors]:
+            f.result(timeout)
+
+    def dispatch(self, plan):
+        """Queue commands on several units at once.
+
+        plan maps serial -> [(name, *args), ...]; each unit's commands run in
+        order on its actor, concurrently with the other units'. Returns
+        {serial: [Future, ...]} in the same order.
+        """
+        return {int(s): [self.actor(s).submit(*cmd) for cmd in cmds] for s, cmds in plan.items()}
+
+    def gather(self, futures, timeout=COMMAND_TIMEOUT):
+        """Results of dispatch() futures, {serial: [result, ...]}.
+
+        Raises the first failure; a negative status counts as one (RuntimeError).
+        """
+        out = {s: [f.result(timeout) for f in fs] for s, fs in futures.items()}
+        for s, results in out.items():
+            for result in results:
+                if isinstance(result, dict) and result.get("status", 0) < 0:
+                    raise RuntimeError(f"unit {s}: call failed: {result}")
+        return out
+
+    def run(self, plan, timeout=None):
+        """dispatch() and wait for every command (by default as long as the slowest may take)."""
+        if timeout is None:
+            timeout = max((command_timeout(cmd[0], cmd[1:]) for cmds in plan.values() for cmd in cmds),
+                          default=COMMAND_TIMEOUT)
+        return self.gather(self.dispatch(plan), timeout)
+
+    def handles(self):
+        """{serial: handle} of the open units, the default actor's included."""
+        with self._lock:
+            out = {s: a.handle for s, a in self._actors.items() if a.handle is not None}
+        serial = self.default_serial()
+        if serial is not None:
+            out[serial] = self.default.handle
+        return out
+
+    def stats(self):
+        with self._lock:
+            out = {s: a.stats() for s, a in self._actors.items()}
+        serial = self.default_serial()
+        if serial is not None:
+            out[serial] = self.default.stats()
+        return out
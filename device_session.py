@@ -0,0 +1,171 @@
+"""Keeps the VSG60 open across start/stop cycles and watches its health.
+
+Opening the device enumerates USB and loads calibration, which dominated the
+time from /start to RF when every /stop closed the device. A DeviceSession
+opens it once, on first use, and keeps it open; /stop only turns the output
+off. A background thread runs a cheap health check every `interval` seconds
+(USB status and temperature, one actor turn) while the device is open, and
+when a check fails it closes the stale handle and reopens the unit, so the
+next request finds a working device. A reopened unit comes back preset and
+anything holding the old handle (a StreamingEngine) is broken, so the
+session calls `on_reopen(handle)` to put the output back and records what it
+reported, or that the output was lost. State, identity and the last health
+readings are cached, so polling them does no device I/O.
+"""
+import threading
+import time
+
+from device_actor import COMMAND_TIMEOUT
+
+HEALTH_INTERVAL = 5.0
+HEALTH_READS = ('vsg_get_USB_status', 'vsg_read_temperature')
+INFO_READS = ('vsg_get_serial_number', 'vsg_get_firmware_version')
+
+CLOSED, READY, FAULT = 'closed', 'ready', 'fault'
+
+
+def _ok(result):
+    return isinstance(result, dict) and result.get("status", -1) >= 0
+
+
+class DeviceSession:
+    """Lazily opened, health-checked device behind a DeviceActor."""
+
+    def __init__(self, actor, interval=HEALTH_INTERVAL, timeout=COMMAND_TIMEOUT, on_reopen=None):
+        self.actor = actor
+        self.on_reopen = on_reopen
+        self.interval = interval
+        self.timeout = timeout
+        self.state = CLOSED
+        self.info = {}          # INFO_READS results, read once per open
+        self.health = {}        # last health check: usb, temperature, checked (time.time())
+        self.opens = 0
+        self.reopens = 0
+        self.checks = 0
+        self.faults = 0
+        self.open_time = None   # seconds the last open took
+        self.last_error = None
+        self.last_reopen = None   # {"time", "output"} of the last reopen, "output" from on_reopen
+        self.output_lost = False  # on_reopen failed: whatever was playing stopped
+        self._reopened = False
+        self._lock = threading.Lock()    # one open/close at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ensure_open(self):
+        """Handle of the open device. Opens it (or reopens it after a fault) only when needed."""
+        if self.state == READY and self.actor.handle is not None:
+            return self.actor.handle
+        with self._lock:
+            if self.state == READY and self.actor.handle is not None:
+                return self.actor.handle
+            handle = self._open()
+        self._restore(handle)
+        return handle
+
+    def close(self):
+        """Close the device; the next ensure_open() opens it again."""
+        with self._lock:
+            self.state = CLOSED
+            self.actor.close().result(self.timeout)
+
+    def _open(self):
+        reopen = self.state == FAULT or self.actor.handle is not None
+        if self.actor.handle is not None:
+            try:
+                self.actor.close().result(self.timeout)
+            except Exception:
+                pass
+        start = time.perf_counter()
+        try:
+            handle = self.actor.open().result(self.timeout)
+        except Exception as exc:
+            self.last_error = str(exc)
+            if self.state != FAULT:
+                self.state = CLOSED
+            raise
+        self.open_time = time.perf_counter() - start
+        self.info = self.actor.read_status(INFO_READS).result(self.timeout)
+        self.opens += 1
+        if reopen:
+            self.reopens += 1
+            self._reopened = True
+        self.state = READY
+        self._start_monitor()
+        return handle
+
+    def _restore(self, handle):
+        """After a reopen (outside the lock, so the hook may take its own locks), run on_reopen."""
+        if not self._reopened:
+            return
+        self._reopened = False
+        output = None
+        self.output_lost = False
+        if self.on_reopen is not None:
+            try:
+                output = self.on_reopen(handle)
+            except Exception as exc:
+                output = f"output lost: {exc}"
+                self.output_lost = True
+        self.last_reopen = {"time": time.time(), "output": output}
+
+    # ---- health checks ----
+
+    def _start_monitor(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._monitor, daemon=True, name='vsg-health')
+            self._thread.start()
+
+    def stop_monitor(self):
+        self._stop.set()
+
+    def _monitor(self):
+        while not self._stop.wait(self.interval):
+            if self.state != CLOSED:
+                self.check()
+
+    def check(self):
+        """Run one health check now; a failed check reopens the device. Returns the state."""
+        if self.state == CLOSED:
+            return self.state
+        checked = self.actor.handle
+        if self.state == READY and checked is not None:
+            try:
+                reads = self.actor.read_status(HEALTH_READS).result(self.timeout)
+            except Exception as exc:
+                reads, error = {}, str(exc)
+            else:
+                error = None
+            usb, temp = reads.get('vsg_get_USB_status'), reads.get('vsg_read_temperature')
+            self.checks += 1
+            self.health = {"usb": usb, "temperature": temp.get("temp") if _ok(temp) else None,
+                           "checked": time.time()}
+            if error is None and _ok(usb) and _ok(temp):
+                return self.state
+            with self._lock:
+                # close() (or a close and reopen) may have run while the reads were in
+                # flight: that is not a fault of the device we have now
+                if self.state != READY or self.actor.handle != checked:
+                    return self.state
+                self.faults += 1
+                self.last_error = error or f"health check failed: usb={usb} temperature={temp}"
+                self.state = FAULT
+        # faulted (or closed behind our back): try to get a working handle back
+        handle = None
+        with self._lock:
+            if self.state != CLOSED:
+                try:
+                    handle = self._open()
+                except Exception:
+                    pass
+        if handle is not None:
+            self._restore(handle)
+        return self.state
+
+    def status(self):
+        """Cached session state; no device I/O."""
+        return {"state": self.state, "handle": self.actor.handle, "info": self.info, "health": self.health,
+                "opens": self.opens, "reopens": self.reopens, "checks": self.checks, "faults": self.faults,
+                "open_time": self.open_time, "last_error": self.last_error, "last_reopen": self.last_reopen,
+                "output_lost": self.output_lost, "interval": self.interval}
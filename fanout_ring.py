@@ -0,0 +1,144 @@
+"""Single-producer, multi-subscriber ring buffer for live IQ blocks.
+
+A fixed number of slots holds the most recent blocks, addressed by a
+monotonically increasing sequence number. Every subscriber has its own read
+cursor, so each one sees every block in order, can tell exactly how many it
+missed, and can resume from a sequence number after reconnecting. Blocks are
+shared by reference (they must not be modified after publish), so fan-out
+costs no copies.
+
+Policies when a subscriber falls a full ring behind:
+    'drop_oldest'  the producer overwrites; the subscriber skips ahead and counts drops
+    'block'        the producer waits for the slowest subscriber (e.g. a recorder)
+"""
+import threading
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+
+
+def parse_seq(value):
+    """Sequence number from a client (?since=, Last-Event-ID); None when absent.
+
+    Raises ValueError for anything but an integer >= -1.
+    """
+    if value is None or value == '':
+        return None
+    try:
+        seq = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"sequence number must be an integer, got {value!r}") from None
+    if seq < -1:
+        raise ValueError(f"sequence number must be >= -1, got {seq}")
+    return seq
+
+
+class Subscription:
+    """Read cursor into a FanoutRing."""
+
+    def __init__(self, ring, cursor, name=None):
+        self.ring = ring
+        self.cursor = cursor
+        self.name = name
+        self.dropped = 0
+        self.received = 0
+        self.closed = False
+
+    @property
+    def lag(self):
+        return self.ring.head - self.cursor
+
+    def get(self, timeout=None):
+        """Next block in sequence, or None on timeout / close."""
+        return self.ring._get(self, timeout)
+
+    def close(self):
+        self.ring._unsubscribe(self)
+
+    def stats(self):
+        return {"name": self.name, "cursor": self.cursor, "lag": self.lag,
+                "dropped": self.dropped, "received": self.received}
+
+
+class FanoutRing:
+    def __init__(self, capacity=64, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"unknown policy {policy}")
+        self.capacity = int(capacity)
+        self.policy = policy
+        self._slots = [None] * self.capacity
+        self.head = 0              # sequence number of the next block to publish
+        self._cond = threading.Condition()
+        self._subs = []
+        self.published = 0
+        self.producer_waits = 0
+
+    @property
+    def oldest(self):
+        """Oldest sequence number still held."""
+        return max(0, self.head - self.capacity)
+
+    def publish(self, item, timeout=None):
+        """Append item; returns its sequence number (None if a 'block' wait timed out)."""
+        with self._cond:
+            if self.policy == BLOCK:
+                full = lambda: any(self.head - s.cursor >= self.capacity for s in self._subs)
+                if full():
+                    self.producer_waits += 1
+                    if not self._cond.wait_for(lambda: not full(), timeout=timeout):
+                        return None
+            seq = self.head
+            self._slots[seq % self.capacity] = item
+            self.head += 1
+            self.published += 1
+            self._cond.notify_all()
+        return seq
+
+    def subscribe(self, start_seq=None, name=None):
+        """New cursor at start_seq (clamped to what is still held), or at the next block."""
+        with self._cond:
+            if start_seq is None:
+                cursor = self.head
+            else:
+                cursor = min(max(int(start_seq), self.oldest), self.head)
+            sub = Subscription(self, cursor, name)
+            self._subs.append(sub)
+        return sub
+
+    def close(self):
+        """Wake every waiting subscriber; their get() returns None."""
+        with self._cond:
+            for sub in self._subs:
+                sub.closed = True
+            self._subs = []
+            self._cond.notify_all()
+
+    def _unsubscribe(self, sub):
+        with self._cond:
+            sub.closed = True
+            if sub in self._subs:
+                self._subs.remove(sub)
+            self._cond.notify_all()
+
+    def _get(self, sub, timeout):
+        with self._cond:
+            if not self._cond.wait_for(lambda: sub.closed or sub.cursor < self.head, timeout=timeout):
+                return None
+            if sub.closed:
+                return None
+            if sub.cursor < self.oldest:
+                sub.dropped += self.oldest - sub.cursor
+                sub.cursor = self.oldest
+            item = self._slots[sub.cursor % self.capacity]
+            sub.cursor += 1
+            sub.received += 1
+            if self.policy == BLOCK:
+                self._cond.notify_all()
+        return item
+
+    def stats(self):
+        with self._cond:
+            return {"head": self.head, "oldest": self.oldest, "capacity": self.capacity,
+                    "policy": self.policy, "published": self.published,
+                    "producer_waits": self.producer_waits,
+                    "subscribers": [s.stats() for s in self._subs]}
@@ -0,0 +1,86 @@
+"""Hop-schedule based frequency-hopping generation.
+
+The prototype generator walked every sample in Python to decide when to hop.
+Here the hop boundaries are computed once as arrays (dwell start, length,
+slot), and the waveform is filled from per-slot rotation tables with array
+operations (runs of short dwells in one pass, see HopNCO), so the cost is a
+handful of vector passes regardless of hop rate.
+"""
+import numpy as np
+
+from oscillators import HopNCO, DEFAULT_BLOCK_SIZE
+
+
+class HopSchedule:
+    """Seeded sequence of dwells: (slot index, dwell length, guard length).
+
+    Dwell lengths are `dwell_samples`, optionally jittered uniformly by
+    +/- `dwell_jitter` (fraction of a dwell). The first `guard_samples` of each
+    dwell are transmitted as silence, modelling the retune gap of a real
+    hopping radio. Slots are drawn uniformly, matching the prototype's
+    random.randint behaviour.
+    """
+
+    def __init__(self, num_slots, dwell_samples, seed=None, dwell_jitter=0.0, guard_samples=0):
+        if num_slots < 1:
+            raise ValueError('num_slots must be at least 1')
+        self.num_slots = int(num_slots)
+        self.dwell_samples = float(dwell_samples)
+        self.dwell_jitter = float(dwell_jitter)
+        self.guard_samples = int(guard_samples)
+        self.rng = np.random.default_rng(seed)
+        self._carry = 0.0  # fractional sample left over from the last dwell boundary
+
+    @property
+    def max_dwell(self):
+        return int(np.ceil(self.dwell_samples * (1 + self.dwell_jitter))) + 1
+
+    def draw(self, count):
+        """Return (slots, lengths, guards) arrays for the next `count` dwells."""
+        slots = self.rng.integers(0, self.num_slots, count)
+        nominal = np.full(count, self.dwell_samples)
+        if self.dwell_jitter:
+            nominal *= 1.0 + self.rng.uniform(-self.dwell_jitter, self.dwell_jitter, count)
+        # Place boundaries on the fractional grid then round, so long schedules
+        # do not drift from the requested hop rate.
+        edges = self._carry + np.cumsum(nominal)
+        ends = np.ceil(edges - 1e-9).astype(np.int64)
+        starts = np.concatenate(([0], ends[:-1]))
+        lengths = np.maximum(ends - starts, 1)
+        self._carry = edges[-1] - ends[-1]
+        guards = np.minimum(self.guard_samples, lengths)
+        return slots, lengths, guards
+
+
+def slot_frequencies(center_freq, hop_bw, num_slots):
+    slot_width = hop_bw / num_slots
+    return center_freq - hop_bw/2 + slot_width/2 + slot_width * np.arange(num_slots)
+
+
+def hopping_oscillator(center_freq, hop_bw, num_slots, hop_rate, sample_rate, seed=None,
+                       dwell_jitter=0.0, guard_time=0.0, block_size=DEFAULT_BLOCK_SIZE, amplitude=1.0):
+    """HopNCO over evenly spaced slots, driven by a HopSchedule."""
+    schedule = HopSchedule(num_slots, sample_rate / hop_rate, seed=seed, dwell_jitter=dwell_jitter,
+                           guard_samples=int(round(guard_time * sample_rate)))
+    freqs = slot_frequencies(center_freq, hop_bw, num_slots)
+    return HopNCO(freqs, schedule, sample_rate, block_size=block_size, amplitude=amplitude)
+
+
+def generate_freq_hopping_cw(center_freq, gain_dbm, sample_rate, num_samples, hop_bw, num_slots, hop_rate,
+                             seed=None, dwell_jitter=0.0, guard_time=0.0):
+    """Vectorized drop-in for the prototype generate_freq_hopping_cw.
+
+    center_freq: center frequency offset (Hz)
+    hop_bw: total hopping bandwidth (Hz)
+    num_slots: number of frequency slots
+    hop_rate: hops per second
+    seed: makes the hop pattern reproducible
+    dwell_jitter: +/- fraction of a dwell to randomize each dwell length
+    guard_time: silent time (s) at the start of each dwell
+    """
+    # the gain is folded into the rotation tables and the oscillator's own
+    # buffer is returned, so the waveform is written exactly once
+    osc = hopping_oscillator(center_freq, hop_bw, num_slots, hop_rate, sample_rate, seed=seed,
+                             dwell_jitter=dwell_jitter, guard_time=guard_time, block_size=num_samples,
+                             amplitude=10**(gain_dbm/20))
+    return osc.read(num_samples)
@@ -0,0 +1,53 @@
+"""Aligned, pooled complex64 sample buffers.
+
+The device takes interleaved float32 I/Q, which is byte for byte the layout
+of a complex64 array, so samples can be generated as complex64 and handed
+over as a float32 view (as_float32) with no interleaving pass. The buffers
+come from a BufferPool, allocated once and aligned to a cache line (64
+bytes, also enough for any SIMD load in the driver), and go back to the
+pool after each submission instead of being reallocated.
+"""
+import queue
+
+import numpy as np
+
+ALIGNMENT = 64
+
+
+def aligned_empty(n, dtype=np.complex64, alignment=ALIGNMENT):
+    """Uninitialized 1-D array whose data starts on an `alignment`-byte boundary."""
+    dtype = np.dtype(dtype)
+    raw = np.empty(n * dtype.itemsize + alignment, dtype=np.uint8)
+    offset = -raw.ctypes.data % alignment
+    return raw[offset:offset + n * dtype.itemsize].view(dtype)
+
+
+def as_float32(iq):
+    """Interleaved float32 view of complex64 samples; float32 arrays pass through. No copy."""
+    if iq.dtype == np.complex64:
+        return iq.view(np.float32)
+    if iq.dtype != np.float32:
+        raise TypeError(f"expected complex64 or float32 samples, got {iq.dtype}")
+    return iq
+
+
+class BufferPool:
+    """A fixed set of aligned complex64 buffers of `size` samples, handed out and returned."""
+
+    def __init__(self, count, size, alignment=ALIGNMENT):
+        self.size = int(size)
+        self.count = int(count)
+        self._free = queue.Queue()
+        for _ in range(self.count):
+            self._free.put(aligned_empty(self.size, np.complex64, alignment))
+
+    def acquire(self, timeout=None):
+        """A free buffer; blocks until one is released (queue.Empty after `timeout`)."""
+        return self._free.get(timeout=timeout)
+
+    def release(self, buf):
+        self._free.put(buf)
+
+    @property
+    def available(self):
+        return self._free.qsize()
@@ -0,0 +1,66 @@
+"""Memory-mapped raw IQ files.
+
+Recordings are raw interleaved float32 I/Q. Reading them with f.read() and
+np.frombuffer holds the bytes twice and makes startup proportional to the
+file size; here the file is mapped with np.memmap instead, so opening is
+constant time and only the windows actually touched are paged in.
+"""
+import os
+
+import numpy as np
+
+
+class IQFile:
+    """Read-only memory map over a raw interleaved float32 IQ file."""
+
+    def __init__(self, path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        size = os.path.getsize(path) // 8  # complex samples (a trailing odd float is ignored)
+        if size == 0:
+            raise ValueError(f"IQ file has no samples: {path}")
+        self.path = path
+        self.complex_samples = size
+        self.raw = np.memmap(path, dtype=np.float32, mode='r', shape=(2 * size,))
+        self.iq = self.raw.view(np.complex64)
+
+    def window(self, start, count):
+        """complex64 view of samples [start, start+count), clipped to the file; no copy."""
+        start = max(0, min(int(start), self.complex_samples))
+        return self.iq[start:start + int(count)]
+
+    def interleaved(self, start=0, count=None):
+        """float32 interleaved view of the same window; no copy."""
+        if count is None:
+            count = self.complex_samples
+        start = max(0, min(int(start), self.complex_samples))
+        return self.raw[2 * start:2 * (start + int(count))]
+
+    def take(self, start, count):
+        """count samples from start, wrapping around the end of the file (a copy)."""
+        count = int(count)
+        start = int(start) % self.complex_samples
+        if start + count <= self.complex_samples:
+            return np.array(self.iq[start:start + count])
+        return np.take(self.iq, np.arange(start, start + count), mode='wrap')
+
+
+class IQFileSource:
+    """Block source over an IQFile for StreamingEngine; read(n) returns file windows."""
+
+    # windows stay valid after later reads, so the engine submits them without copying
+    stable = True
+
+    def __init__(self, iq_file, loop=False, start=0):
+        self.file = iq_file
+        self.loop = loop
+        self.position = int(start) % iq_file.complex_samples
+
+    def read(self, n):
+        if self.position >= self.file.complex_samples:
+            if not self.loop:
+                return None
+            self.position = 0
+        block = self.file.window(self.position, n)
+        self.position += len(block)
+        return block
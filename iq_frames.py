@@ -0,0 +1,94 @@
+"""Binary framing for live IQ blocks.
+
+Each block is serialized once into a frame (fixed header + raw samples) and
+the same bytes are written to every subscriber, instead of converting the
+samples to Python lists and JSON for each client.
+
+Header (little endian, HEADER_SIZE bytes):
+    magic      4s   b'IQF1'
+    fmt        B    FMT_FLOAT32 (interleaved float32 I/Q) or FMT_INT16 (int16 I/Q)
+    reserved   B
+    reserved   H
+    seq        Q    block sequence number
+    sample_rate d   Hz
+    timestamp  d    time.time() when the block was produced
+    samples    I    complex samples in the payload
+    scale      f    int16 full scale (payload * scale / 32767 = value); 1.0 for float32
+"""
+import json
+import struct
+
+import numpy as np
+
+FRAME_MAGIC = b'IQF1'
+FMT_FLOAT32 = 0
+FMT_INT16 = 1
+HEADER = struct.Struct('<4sBBHQddIf')
+HEADER_SIZE = HEADER.size
+SAMPLE_BYTES = {FMT_FLOAT32: 8, FMT_INT16: 4}
+
+
+def encode_frame(iq, seq, sample_rate, timestamp, fmt=FMT_FLOAT32):
+    """Frame complex samples (or float32 interleaved I/Q) as bytes."""
+    iq = np.asarray(iq)
+    if np.iscomplexobj(iq):
+        iq = np.ascontiguousarray(iq, dtype=np.complex64).view(np.float32)
+    n = iq.size // 2
+    if fmt == FMT_INT16:
+        scale = float(np.max(np.abs(iq))) if iq.size else 0.0
+        scale = scale or 1.0
+        payload = np.round(iq * (32767.0 / scale)).astype('<i2')
+    elif fmt == FMT_FLOAT32:
+        scale = 1.0
+        payload = np.ascontiguousarray(iq, dtype='<f4')
+    else:
+        raise ValueError(f"unknown frame format {fmt}")
+    return HEADER.pack(FRAME_MAGIC, fmt, 0, 0, seq, sample_rate, timestamp, n, scale) + payload.tobytes()
+
+
+def frame_size(header):
+    return HEADER_SIZE + header['samples'] * SAMPLE_BYTES[header['fmt']]
+
+
+def decode_header(buf):
+    magic, fmt, _, _, seq, sample_rate, timestamp, n, scale = HEADER.unpack_from(buf)
+    if magic != FRAME_MAGIC:
+        raise ValueError('bad IQ frame magic')
+    return {"fmt": fmt, "seq": seq, "sample_rate": sample_rate, "timestamp": timestamp,
+            "samples": n, "scale": scale}
+
+
+def decode_frame(buf):
+    """Inverse of encode_frame: returns (header dict, complex64 samples)."""
+    header = decode_header(buf)
+    n = header['samples']
+    if header['fmt'] == FMT_INT16:
+        raw = np.frombuffer(buf, dtype='<i2', count=2 * n, offset=HEADER_SIZE)
+        iq = raw.astype(np.float32) * np.float32(header['scale'] / 32767.0)
+    else:
+        iq = np.frombuffer(buf, dtype='<f4', count=2 * n, offset=HEADER_SIZE).astype(np.float32)
+    return header, iq.view(np.complex64)
+
+
+class IQBlock:
+    """One produced block; each wire encoding is built on first use and then shared."""
+
+    def __init__(self, iq, seq, sample_rate, timestamp):
+        self.iq = iq
+        self.seq = seq
+        self.sample_rate = sample_rate
+        self.timestamp = timestamp
+        self._encoded = {}
+
+    def frame(self, fmt=FMT_FLOAT32):
+        data = self._encoded.get(fmt)
+        if data is None:
+            data = self._encoded[fmt] = encode_frame(self.iq, self.seq, self.sample_rate, self.timestamp, fmt)
+        return data
+
+    def json(self):
+        data = self._encoded.get('json')
+        if data is None:
+            data = self._encoded['json'] = json.dumps({"seq": self.seq, "i": self.iq.real.tolist(),
+                                                       "q": self.iq.imag.tolist()})
+        return data
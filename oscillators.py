@@ -0,0 +1,337 @@
+"""Phase-continuous stateful oscillators (NCOs) for block-wise IQ generation.
+
+The generator scripts build `t = np.arange(num_samples) / sample_rate` and call
+np.exp on the whole array, restarting at phase zero on every call. These
+oscillators keep a float64 phase accumulator instead, so successive read()
+calls join with exact phase continuity, and they synthesize each block from a
+precomputed complex64 table times one phasor, which replaces the per-sample
+time vector and transcendental with a single complex multiply.
+
+read(n) returns a view into a preallocated output buffer that is overwritten
+by the next read(); copy it if it has to outlive the next call. NCO and
+SweepNCO also have read_into(out), which writes straight into a caller's
+buffer (e.g. a pooled device buffer) instead.
+"""
+import functools
+
+import numpy as np
+
+TWO_PI = 2 * np.pi
+DEFAULT_BLOCK_SIZE = 16384
+MAX_PERIOD_TABLE = 1 << 22  # longest sweep period (samples) cached as a table
+MAX_HOP_BANK = 1 << 20      # samples of hop tables (all slots) kept as one bank
+MAX_BANK_DWELL = 1024       # longest dwell filled from the bank; longer ones are one multiply each anyway
+HOP_BATCHES = 16            # schedule draws (of 256 dwells) taken at once with a bank
+CLOSE_TOLERANCE = 1e-9      # rad of period phase left over by closed_sweep_center
+CLOSE_ITERATIONS = 8
+
+
+def _rotation_table(step, n):
+    return np.exp(1j * step * np.arange(n)).astype(np.complex64)
+
+
+class NCO:
+    """Fixed-frequency complex oscillator with a phase accumulator, scaled by `amplitude`."""
+
+    def __init__(self, freq, sample_rate, block_size=DEFAULT_BLOCK_SIZE, phase=0.0, amplitude=1.0):
+        self.sample_rate = float(sample_rate)
+        self.phase = float(phase) % TWO_PI
+        self.amplitude = float(amplitude)
+        self.block_size = int(block_size)
+        self._out = np.empty(self.block_size, dtype=np.complex64)
+        self.set_frequency(freq)
+
+    def set_frequency(self, freq):
+        """Retune without a phase jump; the next sample continues from the current phase."""
+        self.freq = float(freq)
+        self.step = TWO_PI * self.freq / self.sample_rate
+        self._table = _rotation_table(self.step, self.block_size)
+
+    def _ensure(self, n):
+        if n > self.block_size:
+            self.block_size = n
+            self._out = np.empty(n, dtype=np.complex64)
+            self._table = _rotation_table(self.step, n)
+
+    def read(self, n):
+        self._ensure(n)
+        out = self._out[:n]
+        self.read_into(out)
+        return out
+
+    def read_into(self, out):
+        """Write the next len(out) samples into `out` (complex64); returns the count."""
+        n = len(out)
+        self._ensure(n)
+        np.multiply(self._table[:n], np.complex64(self.amplitude * np.exp(1j * self.phase)), out=out)
+        self.phase = (self.phase + n * self.step) % TWO_PI
+        return n
+
+
+def sweep_frequency(shape, center, bandwidth, x, carrier=0.0):
+    """Instantaneous baseband frequency (Hz) of a SweepNCO sweep at period fraction(s) x."""
+    if shape == 'log':
+        lo = carrier + center - bandwidth / 2
+        return lo * ((lo + bandwidth) / lo) ** x - carrier
+    if shape == 'sawtooth':
+        sweep = x - 0.5
+    elif shape == 'triangle':
+        sweep = 0.5 - np.abs(2 * x - 1)
+    else:
+        sweep = 0.5 * np.sin(TWO_PI * x)
+    return center + bandwidth * sweep
+
+
+def sweep_period_phase(shape, center, bandwidth, period_samples, sample_rate, carrier=0.0):
+    """Phase (rad) one sweep period advances, summed in table-sized chunks to bound memory."""
+    total = 0.0
+    for start in range(0, period_samples, MAX_PERIOD_TABLE):
+        idx = np.arange(start, min(start + MAX_PERIOD_TABLE, period_samples))
+        freq = sweep_frequency(shape, center, bandwidth, idx / period_samples, carrier)
+        total += float(np.sum(TWO_PI * freq / sample_rate))
+    return total
+
+
+@functools.lru_cache(maxsize=64)
+def closed_sweep_center(shape, center, bandwidth, period_samples, sample_rate, carrier=0.0):
+    """Centre near `center` for which one sweep period advances a whole number of turns.
+
+    The period phase is linear in the centre for the sawtooth, triangle and
+    sine laws, so the first step lands on it; for 'log' the lower edge, and
+    with it the whole law, moves with the centre, so the step is refined by
+    the secant method.
+    """
+    phase = sweep_period_phase(shape, center, bandwidth, period_samples, sample_rate, carrier)
+    target = np.round(phase / TWO_PI) * TWO_PI
+    slope = TWO_PI * period_samples / sample_rate   # d(phase)/d(centre) for the linear laws
+    best = center, abs(target - phase)
+    for _ in range(CLOSE_ITERATIONS):
+        error = target - phase
+        if abs(error) <= CLOSE_TOLERANCE:
+            break
+        step = error / slope
+        moved = sweep_period_phase(shape, center + step, bandwidth, period_samples, sample_rate, carrier)
+        if abs(target - moved) >= best[1]:
+            break   # at the rounding floor of the float64 phase sum
+        if moved != phase:
+            slope = (moved - phase) / step
+        center, phase = center + step, moved
+        best = center, abs(target - phase)
+    return best[0]
+
+
+class SweepNCO:
+    """Periodically swept oscillator (sawtooth, triangle, sine or log frequency law).
+
+    The instantaneous frequency runs over `center +/- bandwidth/2` once per
+    `period` seconds (rounded to whole samples). One period of phase is cached
+    as a table; each period wrap only advances a scalar phase, so output is
+    continuous across blocks and periods. Periods longer than MAX_PERIOD_TABLE
+    samples are synthesized per block instead.
+
+    'log' sweeps upward with a constant ratio per unit time between the
+    absolute frequencies `carrier + center -/+ bandwidth/2` (carrier is the
+    RF frequency baseband 0 Hz maps to; both edges must be positive).
+    With closed=True the centre is nudged (see closed_sweep_center; by at most
+    about sample_rate / 2 / period samples) so one period advances the phase by
+    a whole number of turns, which makes a single period loop seamlessly in
+    vsg_repeat_waveform.
+    """
+
+    SHAPES = ('sawtooth', 'triangle', 'sine', 'log')
+
+    def __init__(self, center, bandwidth, period, sample_rate, shape='sawtooth',
+                 block_size=DEFAULT_BLOCK_SIZE, carrier=0.0, closed=False, amplitude=1.0):
+        if shape not in self.SHAPES:
+            raise ValueError(f"Unknown sweep shape '{shape}'")
+        self.center = float(center)
+        self.bandwidth = float(bandwidth)
+        self.sample_rate = float(sample_rate)
+        self.shape = shape
+        self.carrier = float(carrier)
+        self.amplitude = float(amplitude)
+        if shape == 'log' and self.carrier + self.center - self.bandwidth / 2 <= 0:
+            raise ValueError("log sweep needs a positive lower edge frequency")
+        self.period_samples = max(1, int(round(period * self.sample_rate)))
+        if closed:
+            self.center = closed_sweep_center(shape, self.center, self.bandwidth, self.period_samples,
+                                              self.sample_rate, self.carrier)
+        self.position = 0  # sample index within the current period
+        self.phase = 0.0   # phase at the start of the current period
+        self._offset = 0.0  # phase accumulated since the period start (untabled path)
+        self._out = np.empty(int(block_size), dtype=np.complex64)
+        self._table = None
+        if self.period_samples <= MAX_PERIOD_TABLE:
+            steps = self._steps(np.arange(self.period_samples))
+            # exclusive cumsum: phase at sample n is the sum of steps before it
+            phase = np.concatenate(([0.0], np.cumsum(steps)[:-1]))
+            self._table = np.exp(1j * phase).astype(np.complex64)
+            self.period_phase = float(np.sum(steps))
+        else:
+            self.period_phase = sweep_period_phase(shape, self.center, self.bandwidth, self.period_samples,
+                                                   self.sample_rate, self.carrier)
+
+    def frequency(self, x):
+        """Baseband frequency (Hz) at period fraction(s) x in [0, 1)."""
+        return sweep_frequency(self.shape, self.center, self.bandwidth, x, self.carrier)
+
+    def _steps(self, idx):
+        """Per-sample phase increment (rad) at period positions idx."""
+        return TWO_PI * self.frequency(idx / self.period_samples) / self.sample_rate
+
+    def read(self, n):
+        if n > self._out.size:
+            self._out = np.empty(n, dtype=np.complex64)
+        out = self._out[:n]
+        self.read_into(out)
+        return out
+
+    def read_into(self, out):
+        """Write the next len(out) samples into `out` (complex64); returns the count."""
+        n = len(out)
+        done = 0
+        while done < n:
+            count = min(n - done, self.period_samples - self.position)
+            seg = out[done:done + count]
+            start = self.position
+            if self._table is not None:
+                np.multiply(self._table[start:start + count], np.complex64(self.amplitude * np.exp(1j * self.phase)),
+                            out=seg)
+            else:
+                steps = self._steps(np.arange(start, start + count))
+                phase = self._offset + np.concatenate(([0.0], np.cumsum(steps)[:-1]))
+                seg[:] = self.amplitude * np.exp(1j * (self.phase + phase))
+                self._offset += float(np.sum(steps))
+            done += count
+            self.position += count
+            if self.position == self.period_samples:
+                self.position = 0
+                self._offset = 0.0
+                self.phase = (self.phase + self.period_phase) % TWO_PI
+        return n
+
+
+class HopNCO:
+    """Frequency-hopping oscillator with phase continuity across hops.
+
+    Dwells come from a schedule object (see hopping.HopSchedule) whose
+    draw(count) returns (slots, lengths, guards) arrays; slots index `freqs`
+    and the first `guard` samples of a dwell are silent. Each frequency keeps
+    its own rotation table (scaled by `amplitude`), so a hop costs no more
+    than a segment boundary. Short dwells (up to MAX_BANK_DWELL samples) would
+    be dominated by that per-dwell cost, so their tables form one bank and
+    runs of whole dwells are filled from it with a few array operations.
+    """
+
+    def __init__(self, freqs, schedule, sample_rate, block_size=DEFAULT_BLOCK_SIZE, amplitude=1.0):
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        self.sample_rate = float(sample_rate)
+        self.schedule = schedule
+        self.block_size = int(block_size)
+        self.amplitude = float(amplitude)
+        # a segment never spans more than one dwell, so tables only need to
+        # cover the longest possible dwell (or a block, if that is shorter)
+        self._table_size = schedule.max_dwell
+        self.phase = 0.0
+        self._steps = TWO_PI * self.freqs / self.sample_rate
+        self._tables = {}
+        self._bank = None
+        if self._table_size <= MAX_BANK_DWELL and self.freqs.size * self._table_size <= MAX_HOP_BANK:
+            self._bank = np.stack([self._rotation(step, self._table_size) for step in self._steps])
+        self._out = np.empty(self.block_size, dtype=np.complex64)
+        self._slots = self._lengths = self._guards = np.empty(0, dtype=np.int64)
+        self._pending = 0   # index of the next undrawn dwell in the arrays above
+        self._next_dwell()
+
+    def _rotation(self, step, n):
+        table = _rotation_table(step, n)
+        if self.amplitude != 1.0:
+            table *= np.complex64(self.amplitude)
+        return table
+
+    def _table(self, slot):
+        if self._bank is not None:
+            return self._bank[slot]
+        table = self._tables.get(slot)
+        size = min(self.block_size, self._table_size)
+        if table is None or table.size < size:
+            table = self._rotation(self._steps[slot], size)
+            self._tables[slot] = table
+        return table
+
+    def _draw(self):
+        if self._pending == self._slots.size:
+            # always 256 dwells per draw, so the pattern for a seed does not depend on the batch
+            batches = HOP_BATCHES if self._bank is not None else 1
+            drawn = [self.schedule.draw(256) for _ in range(batches)]
+            self._slots, self._lengths, self._guards = (np.concatenate(a) for a in zip(*drawn))
+            self._pending = 0
+
+    def _next_dwell(self):
+        self._draw()
+        i = self._pending
+        self.slot, self.remaining, self.guard = (int(self._slots[i]), int(self._lengths[i]),
+                                                 int(self._guards[i]))
+        self._pending += 1
+
+    def _fill_dwells(self, out, done):
+        """Write the whole dwells that fit in out[done:] from the bank; returns the new done."""
+        while True:
+            self._draw()
+            i = self._pending
+            lengths = self._lengths[i:]
+            ends = np.cumsum(lengths)
+            k = int(np.searchsorted(ends, len(out) - done, side='right'))
+            if k == 0:
+                return done
+            slots, lengths, guards = self._slots[i:i + k], lengths[:k], self._guards[i:i + k]
+            m = int(ends[k - 1])
+            seg = out[done:done + m]
+            advance = lengths * self._steps[slots] % TWO_PI
+            phase = self.phase + np.concatenate(([0.0], np.cumsum(advance[:-1])))
+            phasors = np.exp(1j * phase).astype(np.complex64)
+            size = int(lengths[0])
+            if np.all(lengths == size):
+                # equal dwells: one row per dwell
+                np.multiply(self._bank[slots, :size], phasors[:, None], out=seg.reshape(k, size))
+            else:
+                starts = np.repeat(ends[:k] - lengths, lengths)
+                index = np.arange(m) - starts
+                np.take(self._bank.reshape(-1), index + np.repeat(slots * self._table_size, lengths), out=seg)
+                seg *= np.repeat(phasors, lengths)
+            if guards.any():
+                offset = np.arange(m) - np.repeat(ends[:k] - lengths, lengths)
+                seg[offset < np.repeat(guards, lengths)] = 0
+            self.phase = float((phase[-1] + advance[-1]) % TWO_PI)
+            self._pending += k
+            done += m
+            if self._pending < self._slots.size:
+                return done   # the next dwell does not fit
+
+    def read(self, n):
+        if n > self.block_size:
+            self.block_size = n
+            self._out = np.empty(n, dtype=np.complex64)
+        out = self._out[:n]
+        done = 0
+        while done < n:
+            if self.remaining == 0:
+                if self._bank is not None:
+                    done = self._fill_dwells(out, done)
+                    if done == n:
+                        break
+                self._next_dwell()
+            step = self._steps[self.slot]
+            if self.guard:
+                # silent retune gap; the phase keeps running underneath
+                count = min(n - done, self.guard)
+                out[done:done + count] = 0
+                self.guard -= count
+            else:
+                count = min(n - done, self.remaining)
+                np.multiply(self._table(self.slot)[:count], np.complex64(np.exp(1j * self.phase)),
+                            out=out[done:done + count])
+            self.phase = (self.phase + count * step) % TWO_PI
+            self.remaining -= count
+            done += count
+        return out
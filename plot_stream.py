@@ -0,0 +1,225 @@
+"""Framed IQ stream from a producer to the SpectrumPlotter (vsg_ploy_v2.py).
+
+The plotter used to take one TCP connection per update with a bare 12-byte
+'dI' header. Here a producer keeps one connection open and sends
+length-prefixed frames; the receiver reads them with recv_into into a buffer
+it allocates once, so steady streaming does no per-frame allocation.
+
+Frame header (little endian, HEADER_SIZE bytes), followed by `length` payload bytes:
+    magic       4s  b'VSGF'
+    type        B   FRAME_IQ, FRAME_SHM or FRAME_SHUTDOWN
+    flags       B
+    reserved    H
+    seq         Q   frame sequence number
+    sample_rate d   Hz
+    length      I   payload bytes
+
+FRAME_IQ carries complex64 samples. For producers on the same host,
+ShmSender writes the samples into a shared-memory ring instead and sends a
+FRAME_SHM whose payload is SHM_REF (slot byte offset, sample count) followed
+by the shared-memory block name, so the samples never pass through the socket.
+Each slot is preceded by an int64 stamp holding the seq of the frame in it
+(-1 while it is being written); the reader checks the stamp before and after
+copying the slot out and drops the frame if the producer has reused the slot.
+
+PlotMonitor forwards a StreamingEngine's blocks to the plotter at a bounded
+frame rate (see sim_stream_bench.py --plot).
+"""
+import socket
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+FRAME_MAGIC = b'VSGF'
+FRAME_IQ = 1
+FRAME_SHM = 2
+FRAME_SHUTDOWN = 3
+HEADER = struct.Struct('<4sBBHQdI')
+HEADER_SIZE = HEADER.size
+SHM_REF = struct.Struct('<QI')
+DEFAULT_BUFFER = 1 << 20   # bytes; grown if a larger frame arrives
+SHM_SLOTS = 4
+STAMP_SIZE = 8             # int64 seq stamp in front of each shm slot
+WRITING = -1               # stamp of a slot the producer is filling
+PLOT_INTERVAL = 0.05       # seconds between frames forwarded by PlotMonitor
+
+
+def recv_exact_into(conn, view):
+    """Fill the memoryview from the socket; False if the peer closed first."""
+    got = 0
+    while got < len(view):
+        n = conn.recv_into(view[got:])
+        if n == 0:
+            return False
+        got += n
+    return True
+
+
+class FrameReader:
+    """Reads frames from a connected socket into one reusable buffer.
+
+    `dropped` counts shared-memory frames whose slot was reused before it was read.
+    """
+
+    def __init__(self, conn, buffer_size=DEFAULT_BUFFER):
+        self.conn = conn
+        self._header = bytearray(HEADER_SIZE)
+        self._buf = bytearray(buffer_size)
+        self._iq = np.empty(buffer_size // 8, dtype=np.complex64)  # shm slots are copied here
+        self._shm = {}
+        self.dropped = 0
+
+    def read_header(self, prefix=b''):
+        """Next header as (type, seq, sample_rate, length); None at end of stream.
+
+        `prefix` holds header bytes the caller already consumed.
+        """
+        view = memoryview(self._header)
+        view[:len(prefix)] = prefix
+        if not recv_exact_into(self.conn, view[len(prefix):]):
+            return None
+        magic, ftype, _, _, seq, sample_rate, length = HEADER.unpack(self._header)
+        if magic != FRAME_MAGIC:
+            raise ValueError('bad frame magic')
+        return ftype, seq, sample_rate, length
+
+    def read_payload(self, length):
+        """Payload of `length` bytes as a memoryview into the reused buffer (valid until the next read)."""
+        if length > len(self._buf):
+            self._buf = bytearray(length)
+        view = memoryview(self._buf)[:length]
+        if not recv_exact_into(self.conn, view):
+            return None
+        return view
+
+    def read_iq(self, ftype, length, seq):
+        """complex64 samples of an IQ or SHM frame (a view into a reused buffer; copy it to keep it).
+
+        None at end of stream. An SHM frame whose slot no longer holds frame
+        `seq` comes back empty and is counted in `dropped`.
+        """
+        payload = self.read_payload(length)
+        if payload is None:
+            return None
+        if ftype == FRAME_IQ:
+            return np.frombuffer(payload, dtype=np.complex64)
+        offset, n = SHM_REF.unpack_from(payload)
+        name = bytes(payload[SHM_REF.size:]).decode()
+        shm = self._shm.get(name)
+        if shm is None:
+            shm = self._shm[name] = shared_memory.SharedMemory(name=name)
+        if n > self._iq.size:
+            self._iq = np.empty(n, dtype=np.complex64)
+        stamp = np.frombuffer(shm.buf, dtype=np.int64, count=1, offset=offset - STAMP_SIZE)
+        src = np.frombuffer(shm.buf, dtype=np.complex64, count=n, offset=offset)
+        fresh = stamp[0] == seq
+        if fresh:
+            np.copyto(self._iq[:n], src)
+            # the producer may have started on the slot during the copy
+            fresh = stamp[0] == seq
+        del stamp, src
+        if not fresh:
+            self.dropped += 1
+            return self._iq[:0]
+        return self._iq[:n]
+
+    def close(self):
+        for shm in self._shm.values():
+            shm.close()
+        self._shm = {}
+
+
+class FrameSender:
+    """Producer side: one persistent connection, frames sent without copying the samples."""
+
+    def __init__(self, host='127.0.0.1', port=56789):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.seq = 0
+
+    def _send(self, ftype, sample_rate, payload=b''):
+        self.sock.sendall(HEADER.pack(FRAME_MAGIC, ftype, 0, 0, self.seq, sample_rate, len(payload)))
+        if len(payload):
+            self.sock.sendall(payload)
+        self.seq += 1
+
+    def send_iq(self, iq, sample_rate):
+        iq = np.ascontiguousarray(iq, dtype=np.complex64)
+        self._send(FRAME_IQ, sample_rate, memoryview(iq).cast('B'))
+
+    def shutdown(self):
+        """Tell the plotter to close its window."""
+        self._send(FRAME_SHUTDOWN, 0.0)
+
+    def close(self):
+        self.sock.close()
+
+
+class ShmSender(FrameSender):
+    """Same-host producer: samples go through a shared-memory ring, only references through the socket.
+
+    The ring has SHM_SLOTS slots of max_samples each and the producer never
+    waits for the plotter. A plotter more than SHM_SLOTS - 1 frames behind
+    finds the slot stamped with a later frame (or mid-write) and drops the
+    frame instead of showing a torn one.
+    """
+
+    def __init__(self, max_samples, host='127.0.0.1', port=56789):
+        super().__init__(host, port)
+        self.max_samples = int(max_samples)
+        self._stride = STAMP_SIZE + self.max_samples * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=SHM_SLOTS * self._stride)
+        self._stamps = np.ndarray((SHM_SLOTS,), dtype=np.int64, buffer=self.shm.buf, strides=(self._stride,))
+        self._stamps[:] = WRITING
+        self._ring = np.ndarray((SHM_SLOTS, self.max_samples), dtype=np.complex64, buffer=self.shm.buf,
+                                offset=STAMP_SIZE, strides=(self._stride, 8))
+        self._name = self.shm.name.encode()
+
+    def send_iq(self, iq, sample_rate):
+        n = len(iq)
+        if n > self.max_samples:
+            raise ValueError(f"frame of {n} samples exceeds the ring slot size {self.max_samples}")
+        slot = self.seq % SHM_SLOTS
+        self._stamps[slot] = WRITING
+        self._ring[slot, :n] = iq
+        self._stamps[slot] = self.seq
+        self._send(FRAME_SHM, sample_rate, SHM_REF.pack(slot * self._stride + STAMP_SIZE, n) + self._name)
+
+    def close(self):
+        super().close()
+        self._stamps = self._ring = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class PlotMonitor:
+    """StreamingEngine monitor that forwards a block to the plotter at most every `interval` seconds.
+
+    Pass it as StreamingEngine(monitor=...). The sender copies the block (into
+    the socket or the shm ring), so the engine's buffer is not kept. A plotter
+    that goes away only stops the forwarding, not the stream.
+    """
+
+    def __init__(self, sender, sample_rate, interval=PLOT_INTERVAL):
+        self.sender = sender
+        self.sample_rate = float(sample_rate)
+        self.interval = float(interval)
+        self.frames = 0
+        self._next = 0.0
+
+    def __call__(self, block):
+        if self.sender is None:
+            return
+        now = time.monotonic()
+        if now < self._next:
+            return
+        self._next = now + self.interval
+        block = block[:getattr(self.sender, 'max_samples', len(block))]
+        try:
+            self.sender.send_iq(block, self.sample_rate)
+        except OSError:
+            self.sender = None
+            return
+        self.frames += 1
@@ -0,0 +1,165 @@
+"""Polyphase RRC pulse shaping with cached filter designs.
+
+generate_psk in the generator scripts zero-stuffs the symbols to the sample
+rate and runs np.convolve with the whole RRC, so (sps - 1) of every sps
+multiplies are against zeros, and it redesigns the filter on every call.
+Here the RRC is split into its sps polyphase branches and each branch filters
+the symbols directly at the symbol rate; the output phases are interleaved
+into the result. All branches are applied at once as a matrix product of the
+symbol windows (real and imaginary parts separately) with the branch taps;
+very long branches switch to FFT overlap-save, sharing one forward transform
+of the symbols across all branches. Designs are cached by (rolloff, sps, span).
+"""
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# branches longer than this are filtered with FFT overlap-save
+FFT_THRESHOLD = 64
+MIN_FFT_SIZE = 2048
+DIRECT_CHUNK = 8192   # symbols per matrix product on the direct path
+
+
+def rrc_filter(num_taps, beta, sps):
+    """Root raised cosine impulse response, num_taps + 1 taps (num_taps even), unit energy."""
+    t = np.arange(-num_taps//2, num_taps//2 + 1) / sps
+    pi = np.pi
+    h = np.empty(t.size)
+    center = t == 0
+    # t = +/-1/(4 beta) zeroes the denominator; those taps take their limit
+    edge = np.isclose(np.abs(4 * beta * t), 1.0) if beta > 0 else np.zeros(t.size, dtype=bool)
+    rest = ~(center | edge)
+    tr = t[rest]
+    h[rest] = ((np.sin(pi * tr * (1 - beta)) + 4 * beta * tr * np.cos(pi * tr * (1 + beta)))
+               / (pi * tr * (1 - (4 * beta * tr)**2)))
+    h[center] = 1.0 - beta + 4 * beta / pi
+    if beta > 0:
+        h[edge] = (beta/np.sqrt(2)) * ((1 + 2/pi) * np.sin(pi/(4*beta)) + (1 - 2/pi) * np.cos(pi/(4*beta)))
+    return h / np.sqrt(np.sum(h**2))
+
+
+@lru_cache(maxsize=64)
+def rrc_taps(rolloff, sps, span):
+    """RRC design for `span` symbols at `sps` (span*sps + 1 taps), cached and read-only."""
+    h = rrc_filter(span * sps, rolloff, sps)
+    h.setflags(write=False)
+    return h
+
+
+@lru_cache(maxsize=64)
+def polyphase_bank(rolloff, sps, span):
+    """RRC split into sps branches, shape (sps, branch_len), zero padded."""
+    h = rrc_taps(rolloff, sps, span)
+    branch_len = -(-h.size // sps)
+    bank = np.zeros(sps * branch_len)
+    bank[:h.size] = h
+    bank = bank.reshape(branch_len, sps).T.copy()
+    bank.setflags(write=False)
+    return bank
+
+
+def _direct(x, bank):
+    """'valid' filtering of x through every branch as one real matrix product.
+
+    Returns complex64 of shape (len(x) - branch_len + 1, sps). The complex
+    windows are viewed as interleaved float32 pairs and multiplied by a
+    matrix that applies the taps to the real and imaginary parts alike, so
+    the product is already the interleaved complex64 output.
+    """
+    sps, branch_len = bank.shape
+    weights = _direct_weights(bank)
+    x = np.ascontiguousarray(x, dtype=np.complex64)
+    n = x.size - branch_len + 1
+    out = np.empty((n, sps), dtype=np.complex64)
+    flat = out.view(np.float32)
+    windows = sliding_window_view(x, branch_len)
+    for start in range(0, n, DIRECT_CHUNK):
+        stop = min(n, start + DIRECT_CHUNK)
+        rows = np.ascontiguousarray(windows[start:stop]).view(np.float32)
+        np.matmul(rows, weights, out=flat[start:stop])
+    return out
+
+
+def _direct_weights(bank):
+    """(2*branch_len, 2*sps) float32: window pair 2j, 2j+1 times tap bank[k, -1-j] into output pair 2k, 2k+1."""
+    sps, branch_len = bank.shape
+    taps = bank[:, ::-1].T.astype(np.float32)
+    weights = np.zeros((2 * branch_len, 2 * sps), dtype=np.float32)
+    weights[0::2, 0::2] = taps
+    weights[1::2, 1::2] = taps
+    return weights
+
+
+def _filter_bank(symbols, bank):
+    """Filter symbols through every branch.
+
+    Returns complex64 of shape (len(symbols) + branch_len - 1, sps), so that
+    reshape(-1) is already the interleaved sample-rate output.
+    """
+    sps, branch_len = bank.shape
+    n = symbols.size + branch_len - 1
+    if branch_len <= FFT_THRESHOLD:
+        pad = np.zeros(branch_len - 1, dtype=np.complex64)
+        return _direct(np.concatenate((pad, symbols.astype(np.complex64), pad)), bank)
+    out = np.empty((n, sps), dtype=np.complex64)
+    # overlap-save: one FFT of each symbol block is shared by all branches. The
+    # output is complex64, so the transforms run in single precision (numpy >= 2
+    # keeps float32/complex64 FFTs in single precision; older versions upcast)
+    nfft = max(MIN_FFT_SIZE, 1 << int(np.ceil(np.log2(8 * branch_len))))
+    step = nfft - branch_len + 1
+    H = np.fft.fft(bank.astype(np.float32), nfft, axis=1).T.copy()
+    padded = np.concatenate((np.zeros(branch_len - 1, dtype=np.complex64), symbols.astype(np.complex64),
+                             np.zeros(branch_len - 1 + step, dtype=np.complex64)))
+    for start in range(0, n, step):
+        X = np.fft.fft(padded[start:start + nfft])
+        y = np.fft.ifft(H * X[:, None], axis=0)[branch_len - 1:]
+        count = min(step, n - start)
+        out[start:start + count] = y[:count]
+    return out
+
+
+def shape_symbols(symbols, sps, rolloff, span, mode='same'):
+    """RRC-shape symbols to sps samples/symbol without zero stuffing.
+
+    mode='same' returns len(symbols)*sps samples aligned like
+    np.convolve(upsampled, rrc, mode='same'); mode='full' returns the full
+    filter output.
+    """
+    symbols = np.asarray(symbols, dtype=np.complex128)
+    bank = polyphase_bank(rolloff, sps, span)
+    full = _filter_bank(symbols, bank).reshape(-1)  # sample m*sps + k comes from branch k
+    num_taps = rrc_taps(rolloff, sps, span).size
+    if mode == 'full':
+        return full[:(symbols.size - 1) * sps + num_taps]
+    n = symbols.size * sps
+    start = (min(n, num_taps) - 1) // 2
+    out = full[start:start + max(n, num_taps)]
+    if out.size < max(n, num_taps):
+        out = np.pad(out, (0, max(n, num_taps) - out.size))
+    return out
+
+
+class PolyphaseShaper:
+    """Streaming form of shape_symbols: keeps branch history across calls.
+
+    process(symbols) returns len(symbols)*sps samples; concatenating the
+    outputs equals the 'full' shaping of all symbols, delayed by the filter.
+    """
+
+    def __init__(self, sps, rolloff, span):
+        self.sps = sps
+        self.bank = polyphase_bank(rolloff, sps, span)
+        self._history = np.zeros(self.bank.shape[1] - 1, dtype=np.complex64)
+
+    def process(self, symbols):
+        x = np.concatenate((self._history, symbols))
+        hist = self._history.size
+        if self.bank.shape[1] <= FFT_THRESHOLD:
+            # the history already covers the filter, so only the valid rows are needed
+            out = _direct(x, self.bank)
+        else:
+            out = _filter_bank(x, self.bank)[hist:hist + len(symbols)]
+        if hist:
+            self._history = x[-hist:]
+        return out.reshape(-1)
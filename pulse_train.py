@@ -0,0 +1,162 @@
+"""Vectorized pulse envelopes and pulse trains.
+
+The prototype apply_pulse_envelope looped over every sample computing
+`t[i] % period`. Here the envelope is built from pulse edges: a constant PRI
+that is a whole number of samples is rendered once and tiled into the block
+with slicing, and anything else (fractional PRI, stagger, jitter, duty-cycle
+lists) is rendered from the list of pulse start/end samples with a couple of
+array passes. The envelope can be applied in place on complex64 data.
+
+A PulseTrain keeps its position, so read()/apply() on consecutive blocks give
+the same result as one call on the whole waveform.
+"""
+import numpy as np
+
+DEFAULT_BLOCK_SIZE = 16384
+
+
+def _ramp(n):
+    """Raised-cosine ramp from 0 to 1 over n samples (excluding both ends)."""
+    return (0.5 - 0.5 * np.cos(np.pi * (np.arange(n) + 1) / (n + 1))).astype(np.float32)
+
+
+def render_pulses(out, starts, ends, rise=0, fall=0):
+    """Render pulses [starts, ends) (sample indices relative to out) into out.
+
+    Pulses may extend past either end of `out`; only the overlap is written.
+    """
+    n = out.size
+    out[:] = 0
+    if len(starts) == 0:
+        return out
+    s = np.clip(starts, 0, n)
+    e = np.clip(ends, 0, n)
+    edges = np.bincount(s, minlength=n + 1) - np.bincount(e, minlength=n + 1)
+    np.cumsum(edges[:n], out=edges[:n])
+    np.greater(edges[:n], 0, out=out, casting='unsafe')
+    for length, anchor, ramp in ((rise, starts, _ramp(rise)), (fall, ends - fall, _ramp(fall)[::-1])):
+        if not length:
+            continue
+        idx = anchor[:, None] + np.arange(length)
+        inside = (idx >= np.maximum(starts, 0)[:, None]) & (idx < np.minimum(ends, n)[:, None]) & (idx >= 0)
+        vals = np.broadcast_to(ramp, idx.shape)[inside]
+        idx = idx[inside]
+        out[idx] = np.minimum(out[idx], vals)
+    return out
+
+
+class PulseTrain:
+    """Stateful pulse-train envelope generator.
+
+    sample_rate: Hz
+    pri: pulse repetition interval (s); a list gives a staggered PRI sequence
+    pulse_width: pulse width (s), or
+    duty_cycles: list of duty cycles (fraction of each PRI), cycled per pulse
+    rise_time/fall_time: raised-cosine edge durations (s), inside the pulse
+    pri_jitter: +/- fraction of the PRI applied randomly to each interval
+    seed: makes jitter reproducible
+    """
+
+    def __init__(self, sample_rate, pri, pulse_width=None, duty_cycles=None, rise_time=0.0, fall_time=0.0,
+                 pri_jitter=0.0, seed=None, block_size=DEFAULT_BLOCK_SIZE):
+        if pulse_width is None and duty_cycles is None:
+            raise ValueError('pulse_width or duty_cycles is required')
+        self.sample_rate = float(sample_rate)
+        self.pris = np.atleast_1d(np.asarray(pri, dtype=np.float64)) * self.sample_rate
+        if duty_cycles is not None:
+            self.duties = np.atleast_1d(np.asarray(duty_cycles, dtype=np.float64))
+            self.width = None
+        else:
+            self.duties = None
+            self.width = float(pulse_width) * self.sample_rate
+        self.rise = int(round(rise_time * self.sample_rate))
+        self.fall = int(round(fall_time * self.sample_rate))
+        self.pri_jitter = float(pri_jitter)
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+        self._out = np.empty(int(block_size), dtype=np.float32)
+        # pulse schedule (absolute samples): pending pulses not yet fully consumed
+        self._count = 0
+        self._next = 0.0
+        self._starts = np.zeros(0, dtype=np.int64)
+        self._ends = np.zeros(0, dtype=np.int64)
+        self._tile = None
+        period = self.pris[0]
+        if (len(self.pris) == 1 and not self.pri_jitter and (self.duties is None or len(self.duties) == 1)
+                and period == int(period)):
+            # constant integer PRI: render one period and tile it
+            self._tile = np.empty(int(period), dtype=np.float32)
+            self._schedule(int(period))
+            render_pulses(self._tile, self._starts, self._ends, self.rise, self.fall)
+
+    def _schedule(self, end):
+        """Extend the pulse list until the next pulse starts at or after `end`."""
+        if self._next >= end:
+            return
+        count = int((end - self._next) / (self.pris.min() * (1 - self.pri_jitter))) + 2
+        k = self._count + np.arange(count)
+        intervals = self.pris[k % len(self.pris)]
+        if self.pri_jitter:
+            intervals = intervals * (1 + self.rng.uniform(-self.pri_jitter, self.pri_jitter, count))
+        t0 = self._next + np.concatenate(([0.0], np.cumsum(intervals)[:-1]))
+        width = self.width if self.duties is None else self.duties[k % len(self.duties)] * intervals
+        # same rule as `(t % period) < pulse_width`: first sample at or after each edge
+        starts = np.ceil(t0 - 1e-9).astype(np.int64)
+        ends = np.ceil(t0 + width - 1e-9).astype(np.int64)
+        self._starts = np.concatenate((self._starts, starts))
+        self._ends = np.concatenate((self._ends, ends))
+        self._next = t0[-1] + intervals[-1]
+        self._count += count
+
+    def read(self, n):
+        """Envelope for the next n samples (view into a reused buffer)."""
+        if n > self._out.size:
+            self._out = np.empty(n, dtype=np.float32)
+        out = self._out[:n]
+        if self._tile is not None:
+            _tile_into(out, self._tile, self.position % self._tile.size)
+        else:
+            end = self.position + n
+            self._schedule(end)
+            keep = self._ends > self.position
+            self._starts, self._ends = self._starts[keep], self._ends[keep]
+            active = self._starts < end
+            render_pulses(out, self._starts[active] - self.position, self._ends[active] - self.position,
+                          self.rise, self.fall)
+        self.position += n
+        return out
+
+    def apply(self, iq):
+        """Multiply iq (complex64) in place by the next len(iq) envelope samples."""
+        env = self.read(len(iq))
+        iq.view(np.float32).reshape(-1, 2)[:] *= env[:, None]
+        return iq
+
+
+def _tile_into(out, tile, offset):
+    """Fill out with tile repeated, starting at tile[offset], using slice copies."""
+    p = tile.size
+    n = out.size
+    head = min(n, p - offset)
+    out[:head] = tile[offset:offset + head]
+    full = (n - head) // p
+    if full:
+        out[head:head + full * p].reshape(full, p)[:] = tile
+    rest = n - head - full * p
+    if rest:
+        out[n - rest:] = tile[:rest]
+    return out
+
+
+def apply_pulse_envelope(iq, sample_rate, pulse_width, pulse_freq, rise_time=0.0, fall_time=0.0):
+    """Vectorized drop-in for the prototype apply_pulse_envelope.
+
+    Pulses start every 1/pulse_freq seconds from t=0 and last pulse_width.
+    Returns a new array and leaves iq untouched (it may be a cached waveform);
+    PulseTrain.apply gates a complex64 buffer in place.
+    """
+    train = PulseTrain(sample_rate, 1.0 / pulse_freq, pulse_width=pulse_width,
+                       rise_time=rise_time, fall_time=fall_time, block_size=len(iq))
+    if iq.dtype == np.complex64:
+        return train.apply(iq.copy())
+    return iq * train.read(len(iq))
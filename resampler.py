@@ -0,0 +1,196 @@
+"""Rational and Farrow resamplers for exact PSK symbol rates.
+
+The composite generators use `sps = int(sample_rate / symrate)` (clamped to 2
+or 8), so a symbol rate that does not divide the VSG sample rate comes out at
+the wrong rate. Here the carrier is shaped at the integer sps just below the
+ratio and then interpolated by the exact remaining ratio (between 1 and 2) to
+the sample rate: a polyphase rational resampler when the ratio reduces to a
+small fraction, otherwise a cubic Farrow interpolator. Both are streaming (state is kept between process()
+calls) so they fit the block engine.
+"""
+from fractions import Fraction
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from pulse_shaping import shape_symbols
+
+MAX_UP = 64          # largest interpolation factor handled by the rational resampler
+HALF_LEN = 16        # lowpass half-length in input samples (per phase)
+GROUP_WIDTH = 32     # fewest outputs per row of the resampler's matrix product
+
+
+def shaping_sps(sample_rate, symrate, min_sps=2):
+    """Integer sps to shape at; returns (sps, exact) where exact means no resampling is needed.
+
+    Shaping at the largest sps below the ratio leaves the resampler a ratio
+    between 1 and 2 (pure interpolation) instead of shaping at a higher rate
+    and throwing samples away; below min_sps the resampler has to decimate.
+    """
+    ratio = sample_rate / symrate
+    nearest = int(round(ratio))
+    if nearest >= min_sps and abs(ratio - nearest) < 1e-9 * ratio:
+        return nearest, True
+    return max(min_sps, int(ratio)), False
+
+
+def lowpass(up, down, half_len=HALF_LEN, beta=8.0):
+    """Kaiser-windowed sinc for a rational up/down resampler (designed at the up rate, gain up)."""
+    m = max(up, down)
+    n = np.arange(-half_len * m, half_len * m + 1)
+    h = np.sinc(n / m) * np.kaiser(n.size, beta)
+    return h * (up / np.sum(h))
+
+
+class RationalResampler:
+    """Streaming polyphase resampler by up/down.
+
+    Output m is the input interpolated at time m*down/up (no time shift); it
+    is emitted once the input has run `latency` samples past that point.
+
+    The output is computed in groups of a multiple of `up` outputs, which
+    consume a fixed stride of input and repeat the same filter phases. One
+    group is one row of a real matrix product: the input windows (real and
+    imaginary parts separately) times a matrix holding each output's phase
+    taps at its input offsets, so the filtering runs in BLAS rather than as a
+    per-output gather.
+    """
+
+    def __init__(self, up, down, half_len=HALF_LEN):
+        g = np.gcd(up, down)
+        self.up, self.down = up // g, down // g
+        h = lowpass(self.up, self.down, half_len)
+        taps = -(-h.size // self.up)
+        padded = np.zeros(taps * self.up)
+        padded[:h.size] = h
+        # bank[p, j] = h[p + j*up]: phase p applied to input x[i - j]
+        self.bank = padded.reshape(taps, self.up).T.copy()
+        self.latency = half_len * max(self.up, self.down) / self.up
+        self._hist = np.zeros(taps - 1, dtype=np.complex64)
+        self._base = -(taps - 1)  # absolute input index of _hist[0]
+        # next output position on the up-rate grid, offset by the filter
+        # centre so the group delay is absorbed here
+        self._pos = (h.size - 1) // 2
+        self._group = -(-GROUP_WIDTH // self.up)   # up-cycles per group
+        self._plans = {}
+
+    def _plan(self, phase):
+        """(lo, matrix) for a group whose first output sits `phase` (< up) into its input sample.
+
+        Row r of the matrix weights input lo + r relative to that sample;
+        column c gives output c of the group.
+        """
+        plan = self._plans.get(phase)
+        if plan is None:
+            taps = self.bank.shape[1]
+            c = np.arange(self._group * self.up)
+            pos = phase + c * self.down
+            newest = pos // self.up
+            lo = -(taps - 1)
+            matrix = np.zeros((newest[-1] - lo + 1, c.size), dtype=np.float32)
+            matrix[newest[:, None] - np.arange(taps) - lo, c[:, None]] = self.bank[pos % self.up]
+            plan = self._plans[phase] = (lo, matrix)
+        return plan
+
+    def process(self, x):
+        buf = np.concatenate((self._hist, np.asarray(x, dtype=np.complex64)))
+        last = self._base + buf.size - 1
+        count = (last * self.up + self.up - 1 - self._pos) // self.down + 1
+        if count > 0:
+            first, phase = divmod(self._pos, self.up)
+            lo, matrix = self._plan(phase)
+            width = matrix.shape[1]
+            groups = -(-count // width)
+            stride = self._group * self.down
+            start = first - self._base + lo
+            need = start + (groups - 1) * stride + matrix.shape[0]
+            if need > buf.size:
+                # the last group runs past the input; its extra outputs are dropped
+                src = np.concatenate((buf, np.zeros(need - buf.size, dtype=np.complex64)))
+            else:
+                src = buf
+            out = np.empty((groups, width), dtype=np.complex64)
+            for part, dest in ((src.real, out.real), (src.imag, out.imag)):
+                windows = sliding_window_view(part, matrix.shape[0])[start::stride][:groups]
+                dest[...] = np.ascontiguousarray(windows) @ matrix
+            y = out.reshape(-1)[:count]
+            self._pos += self.down * count
+        else:
+            y = np.zeros(0, dtype=np.complex64)
+        keep = self._hist.size
+        self._base += buf.size - keep
+        self._hist = buf[buf.size - keep:]
+        return y
+
+
+class FarrowResampler:
+    """Streaming cubic (Lagrange) Farrow interpolator for arbitrary ratios.
+
+    Only suitable for oversampled signals, which is what the shaping stage
+    produces; ratio = rate_out / rate_in. Output m is the input at time
+    m / ratio, emitted two input samples later.
+    """
+
+    def __init__(self, ratio):
+        self.step = 1.0 / ratio   # input samples per output sample
+        self.latency = 2.0
+        self._hist = np.zeros(4, dtype=np.complex64)
+        self._t = 4.0             # next output time as an index into [_hist, x]
+
+    def process(self, x):
+        buf = np.concatenate((self._hist, np.asarray(x, dtype=np.complex64)))
+        # need buf[k-1 .. k+2] around t = k + mu
+        count = int(np.floor((buf.size - 3 - self._t) / self.step)) + 1
+        if count > 0:
+            t = self._t + self.step * np.arange(count)
+            k = np.floor(t).astype(np.int64)
+            mu = (t - k).astype(np.float32)
+            xm1, x0, x1, x2 = buf[k - 1], buf[k], buf[k + 1], buf[k + 2]
+            c0 = -mu * (mu - 1) * (mu - 2) / 6
+            c1 = (mu + 1) * (mu - 1) * (mu - 2) / 2
+            c2 = -(mu + 1) * mu * (mu - 2) / 2
+            c3 = (mu + 1) * mu * (mu - 1) / 6
+            y = (c0 * xm1 + c1 * x0 + c2 * x1 + c3 * x2).astype(np.complex64)
+            self._t += self.step * count
+        else:
+            y = np.zeros(0, dtype=np.complex64)
+        # keep enough history that the next output still has buf[k - 1]
+        drop = buf.size - 4
+        self._t -= drop
+        self._hist = buf[drop:]
+        return y
+
+
+def make_resampler(rate_in, rate_out, max_up=MAX_UP):
+    """Rational resampler when rate_out/rate_in reduces to up/down with up <= max_up, else Farrow."""
+    frac = Fraction(rate_out / rate_in).limit_denominator(1 << 20)
+    if frac.numerator <= max_up and abs(float(frac) - rate_out / rate_in) < 1e-12 * rate_out / rate_in:
+        return RationalResampler(frac.numerator, frac.denominator)
+    return FarrowResampler(rate_out / rate_in)
+
+
+def resample(x, rate_in, rate_out):
+    """One-shot resample; output has round(len(x)*rate_out/rate_in) samples."""
+    r = make_resampler(rate_in, rate_out)
+    n_out = int(round(len(x) * rate_out / rate_in))
+    pad = int(np.ceil(r.latency)) + 2
+    y = np.concatenate((r.process(x), r.process(np.zeros(pad, dtype=np.complex64))))[:n_out]
+    if y.size < n_out:
+        y = np.pad(y, (0, n_out - y.size))
+    return y
+
+
+def shape_to_rate(symbols, symrate, rolloff, span, sample_rate, sps=None):
+    """RRC-shape symbols at an integer sps and resample to exactly sample_rate.
+
+    Returns round(len(symbols) * sample_rate / symrate) samples. When sps is
+    None the smallest suitable sps is picked with shaping_sps().
+    """
+    if sps is None:
+        sps, exact = shaping_sps(sample_rate, symrate)
+    else:
+        exact = abs(sps * symrate - sample_rate) < 1e-9 * sample_rate
+    shaped = shape_symbols(symbols, sps, rolloff, span)
+    if exact:
+        return shaped
+    return resample(shaped, sps * symrate, sample_rate)
@@ -0,0 +1,107 @@
+"""Stream a composite through the StreamingEngine into the simulated VSG60.
+
+Runs without hardware (vsgdevice.vsg_sim) at a chosen sample rate and
+reports submit throughput, device buffer fill and underruns, then checks the
+tapped "transmitted" IQ against a second run of the same source. Exits with
+status 1 on underruns or a mismatch, so it can gate CI.
+
+    python sim_stream_bench.py --sample-rate 54e6 --seconds 5
+
+With --plot the blocks are also forwarded (through shared memory, a few
+frames a second) to a running vsg_ploy_v2.py window.
+
+The default signal list generates at roughly 90 MS/s on one core with the
+default 64k-sample blocks, so 54 MS/s (the VSG60 maximum) is supported. At
+that rate the simulated 1M-sample device buffer holds about 19 ms, and a
+scheduler stall longer than that on a loaded host still shows up as an
+underrun.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from plot_stream import PlotMonitor, ShmSender
+from stream_engine import CompositeBlockSource, StreamingEngine, DEFAULT_BLOCK_SIZE
+
+EXAMPLES_PY = os.path.join(os.path.dirname(__file__), "vsg60_series", "examples", "python")
+if EXAMPLES_PY not in sys.path:
+    sys.path.insert(0, EXAMPLES_PY)
+
+from vsgdevice.vsg_sim import SimulatedVSG, IQTap, BUFFER_SAMPLES, USB_RATE  # noqa: E402
+
+SIGNALS = [
+    {"type": "cw", "freq_offset": 1e6, "gain_dbm": 0.0},
+    {"type": "sweeping_cw", "freq_offset": -2e6, "sweep_bw": 4e6, "sweep_speed": 1e8, "gain_dbm": -6.0},
+    {"type": "psk", "mod_type": "qpsk", "freq_offset": 5e6, "symrate": 1e6, "rolloff": 0.35, "gain_dbm": -3.0},
+]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark IQ streaming against the simulated VSG60")
+    p.add_argument("--sample-rate", type=float, default=5e6)
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--block-size", type=int, default=DEFAULT_BLOCK_SIZE)
+    p.add_argument("--buffer-samples", type=int, default=BUFFER_SAMPLES)
+    p.add_argument("--usb-rate", type=float, default=USB_RATE, help="bytes/s across the simulated link")
+    p.add_argument("--verify", type=int, default=1 << 20, help="samples of tapped IQ to compare (0 to skip)")
+    p.add_argument("--plot", action="store_true", help="forward blocks to a running vsg_ploy_v2.py plotter")
+    args = p.parse_args()
+
+    sender = monitor = None
+    if args.plot:
+        try:
+            sender = ShmSender(args.block_size)
+        except OSError as exc:
+            p.error(f"cannot reach the plotter (start vsg_ploy_v2.py first): {exc}")
+        monitor = PlotMonitor(sender, args.sample_rate)
+
+    tap = IQTap(max(args.verify, 1))
+    sim = SimulatedVSG(usb_rate=args.usb_rate, buffer_samples=args.buffer_samples, tap=tap)
+    handle = sim.vsg_open_device()["handle"]
+    sim.vsg_set_sample_rate(handle, args.sample_rate)
+    sim.vsg_set_RF_output_state(handle, 1)
+
+    total = int(args.seconds * args.sample_rate)
+    source = CompositeBlockSource(SIGNALS, args.sample_rate, seed=1)
+    engine = StreamingEngine(sim, handle, source, block_size=args.block_size, total_samples=total,
+                             monitor=monitor)
+    start = time.perf_counter()
+    engine.start()
+    engine.wait()
+    elapsed = time.perf_counter() - start
+    stats = engine.stats()
+    dev = sim.stats(handle)
+
+    print(f"sample rate      {args.sample_rate / 1e6:.3f} MS/s, {total} samples in {elapsed:.3f} s "
+          f"({stats['samples_submitted'] / elapsed / 1e6:.2f} MS/s delivered)")
+    print(f"blocks           {stats['blocks_submitted']} x {args.block_size}, starved {stats['starved']}, "
+          f"max submit {stats['max_submit_time'] * 1e3:.2f} ms")
+    print(f"device buffer    max fill {dev['max_fill']} / {dev['buffer_samples']}, "
+          f"USB busy {dev['usb_time']:.3f} s, blocked {dev['blocked_time']:.3f} s")
+    print(f"underruns        {dev['underruns']} ({dev['underrun_samples']} samples)")
+    if sender is not None:
+        print(f"plot frames      {monitor.frames}")
+        sender.close()
+    ok = stats['error'] is None and dev['underruns'] == 0
+    if stats['error']:
+        print("error           ", stats['error'])
+
+    if args.verify:
+        sent = tap.samples(handle)
+        # regenerate in the engine's block sizes, the way it was sent
+        replay = CompositeBlockSource(SIGNALS, args.sample_rate, seed=1)
+        expected = np.concatenate([replay.read(min(args.block_size, sent.size - start))
+                                   for start in range(0, sent.size, args.block_size)])
+        match = sent.size > 0 and np.allclose(sent, expected, atol=1e-6)
+        print(f"tap check        {sent.size} samples {'match' if match else 'DIFFER'}")
+        ok = ok and match
+
+    sim.vsg_close_device(handle)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Welch power spectra for the live spectrum displays.
+
+The prototypes took one unwindowed FFT of the whole composite per refresh and
+sent every bin to the browser. A SpectrumService instead splits the IQ into
+windowed, overlapping segments sized by the requested RBW, transforms them in
+one batched FFT, averages (or max-holds) across segments and refreshes, and
+reduces the result to the display width with peak-preserving binning. Cost
+depends on the RBW and a segment cap, not on the waveform length.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from decimation import peak_decimate
+
+WINDOWS = ('hann', 'hamming', 'blackman', 'flattop', 'rect')
+MAX_SEGMENTS = 64       # segments per update; longer inputs are sampled evenly
+MAX_NFFT = 1 << 20
+
+
+@lru_cache(maxsize=32)
+def spectral_window(name, n):
+    """Window of length n, read-only and cached."""
+    if name == 'hann':
+        w = np.hanning(n)
+    elif name == 'hamming':
+        w = np.hamming(n)
+    elif name == 'blackman':
+        w = np.blackman(n)
+    elif name == 'flattop':
+        k = 2 * np.pi * np.arange(n) / (n - 1)
+        w = (0.21557895 - 0.41663158 * np.cos(k) + 0.277263158 * np.cos(2 * k)
+             - 0.083578947 * np.cos(3 * k) + 0.006947368 * np.cos(4 * k))
+    elif name == 'rect':
+        w = np.ones(n)
+    else:
+        raise ValueError(f"unknown window {name}")
+    w = w.astype(np.float32)
+    w.setflags(write=False)
+    return w
+
+
+def enbw_bins(name):
+    """Equivalent noise bandwidth of a window, in bins."""
+    w = spectral_window(name, 4096).astype(np.float64)
+    return w.size * np.sum(w ** 2) / np.sum(w) ** 2
+
+
+def nfft_for_rbw(sample_rate, rbw, window='hann'):
+    """Smallest power-of-two FFT size whose resolution bandwidth is at most rbw."""
+    n = int(np.ceil(enbw_bins(window) * sample_rate / rbw))
+    return int(min(MAX_NFFT, max(16, 1 << int(np.ceil(np.log2(n))))))
+
+
+def welch_psd(iq, nfft, window='hann', overlap=0.5, max_segments=MAX_SEGMENTS):
+    """Mean and max over segments of the windowed power spectrum (fftshifted, linear).
+
+    Powers are normalized so a full-scale tone reads 1.0 (0 dB) in its peak bin.
+    Inputs shorter than nfft are zero padded.
+    """
+    iq = np.asarray(iq, dtype=np.complex64)
+    if iq.size < nfft:
+        iq = np.pad(iq, (0, nfft - iq.size))
+    w = spectral_window(window, nfft)
+    step = max(1, int(nfft * (1 - overlap)))
+    starts = np.arange(0, iq.size - nfft + 1, step)
+    if starts.size > max_segments:
+        starts = starts[np.linspace(0, starts.size - 1, max_segments).astype(np.int64)]
+    segments = np.lib.stride_tricks.sliding_window_view(iq, nfft)[starts]
+    spec = np.fft.fft(segments * w, axis=1)
+    power = spec.real ** 2 + spec.imag ** 2
+    power /= np.float32(np.sum(w)) ** 2
+    power = np.fft.fftshift(power, axes=1)
+    return power.mean(axis=0), power.max(axis=0)
+
+
+class SpectrumService:
+    """Averaged spectrum of successive IQ buffers.
+
+    mode: 'clear' (each update replaces the trace), 'average' (running mean
+    over the last `avg_count` updates, exponential after that) or 'maxhold'.
+    """
+
+    def __init__(self, sample_rate, rbw=None, nfft=None, window='hann', overlap=0.5, mode='average',
+                 avg_count=10, max_segments=MAX_SEGMENTS):
+        if window not in WINDOWS:
+            raise ValueError(f"unknown window {window}")
+        if mode not in ('clear', 'average', 'maxhold'):
+            raise ValueError(f"unknown mode {mode}")
+        self.sample_rate = float(sample_rate)
+        self.window = window
+        self.nfft = int(nfft) if nfft else nfft_for_rbw(sample_rate, rbw or sample_rate / 1024, window)
+        self.rbw = enbw_bins(window) * self.sample_rate / self.nfft
+        self.overlap = float(overlap)
+        self.mode = mode
+        self.avg_count = int(avg_count)
+        self.max_segments = max_segments
+        self.freqs = np.fft.fftshift(np.fft.fftfreq(self.nfft, d=1.0 / self.sample_rate))
+        self.reset()
+
+    def reset(self):
+        self.trace = None
+        self.updates = 0
+
+    def update(self, iq):
+        """Fold one IQ buffer into the trace; returns the linear power trace."""
+        mean, peak = welch_psd(iq, self.nfft, self.window, self.overlap, self.max_segments)
+        self.updates += 1
+        if self.trace is None or self.mode == 'clear':
+            self.trace = peak if self.mode == 'maxhold' else mean
+        elif self.mode == 'maxhold':
+            np.maximum(self.trace, peak, out=self.trace)
+        else:
+            k = min(self.updates, self.avg_count)
+            self.trace += (mean - self.trace) / k
+        return self.trace
+
+    def trace_db(self, width=None):
+        """(freqs, dB) of the current trace, peak-binned down to `width` points."""
+        if self.trace is None:
+            return self.freqs[:0], self.freqs[:0]
+        db = 10 * np.log10(self.trace + 1e-20)
+        if width:
+            return peak_decimate(db, width, self.freqs)
+        return self.freqs, db
@@ -0,0 +1,344 @@
+"""Block-streaming composite IQ engine for the VSG60.
+
+Instead of building the whole composite in memory and handing it to
+vsg_repeat_waveform, the engine generates the composite in fixed-size blocks
+and pushes them continuously through vsg_submit_IQ. A producer thread fills
+pooled complex64 buffers and a consumer thread submits them, with a
+bounded queue in between, so memory use is constant no matter how long the
+scenario runs and there is no loop seam.
+
+The engine only needs an object exposing vsg_submit_IQ / vsg_flush /
+vsg_flush_and_wait with the same signatures as vsgdevice.vsg_api, so it can be
+driven against a simulated device as well as the real wrapper.
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+
+from hopping import hopping_oscillator
+from iq_buffers import BufferPool, as_float32
+from oscillators import NCO, SweepNCO
+from pulse_shaping import PolyphaseShaper
+from pulse_train import PulseTrain
+from resampler import make_resampler, shaping_sps
+
+# complex samples per vsg_submit_IQ call: about 1.2 ms at 54 MS/s. Much smaller
+# blocks spend too much of each block period in per-call overhead for one core
+# to keep the device fed at the top sample rate
+DEFAULT_BLOCK_SIZE = 65536
+DEFAULT_QUEUE_DEPTH = 8
+RESAMPLER_HEADROOM = 1.05  # allowance for interpolation overshoot in the peak bound
+PSK_CHUNK = 1 << 16        # shaped PSK samples generated per refill
+SUM_CHUNK = 16384          # samples summed across the components at a time
+
+
+# ------------------------------ Signal blocks -------------------------------
+
+class PSKBlock:
+    """RRC-shaped PSK component with filter state carried across blocks.
+
+    The output is scaled so its peak is at most `amplitude`. The carrier is shaped PSK_CHUNK samples at a time, whatever the block
+    size, so the per-call overhead of the shaper and resampler is spread over
+    enough samples to keep up with the top VSG60 sample rate.
+    """
+
+    def __init__(self, mod_type, symrate, rolloff, freq_offset, sample_rate, rng, amplitude=1.0):
+        # shape at a small integer sps and resample when symrate does not divide sample_rate
+        self.sps, exact = shaping_sps(sample_rate, symrate)
+        self.resampler = None if exact else make_resampler(symrate * self.sps, sample_rate)
+        self.samples_per_symbol = sample_rate / symrate
+        self.order = {'bpsk': 2, 'qpsk': 4, '8psk': 8}.get(mod_type)
+        if self.order is None:
+            raise ValueError('Unsupported PSK type')
+        self.rng = rng
+        self.shaper = PolyphaseShaper(self.sps, rolloff, 11)
+        # worst-case output magnitude for unit-magnitude symbols, used so the
+        # shaped carrier never exceeds 1.0 and the composite scale is a bound
+        self.peak = float(np.max(np.sum(np.abs(self.shaper.bank), axis=1)))
+        if self.resampler is not None:
+            self.peak *= RESAMPLER_HEADROOM
+        # the amplitude / peak scaling is folded into the constellation
+        offset = 0.0 if self.order == 2 else np.pi / self.order
+        points = np.exp(1j * (offset + 2 * np.pi / self.order * np.arange(self.order))) * (amplitude / self.peak)
+        self.constellation = points.astype(np.complex64)
+        self.carrier = NCO(freq_offset, sample_rate)
+        self._pending = np.zeros(0, dtype=np.complex64)
+        self._used = 0   # samples of _pending already read
+
+    def _symbols(self, count):
+        return self.constellation[self.rng.integers(0, self.order, count)]
+
+    def read(self, n):
+        while self._pending.size - self._used < n:
+            available = self._pending.size - self._used
+            count = int((max(n, PSK_CHUNK) - available) / self.samples_per_symbol) + 1
+            shaped = self.shaper.process(self._symbols(count))
+            if self.resampler is not None:
+                shaped = self.resampler.process(shaped)
+            self._pending = np.concatenate((self._pending[self._used:], shaped))
+            self._used = 0
+        out = self._pending[self._used:self._used + n]
+        self._used += n
+        return out * self.carrier.read(n)
+
+
+def make_block(sig, sample_rate, rng, amplitude=1.0):
+    """Build the block generator for one signal dict (as used in data['signals']), scaled by `amplitude`."""
+    if sig['type'] == 'cw':
+        return NCO(sig['freq_offset'], sample_rate, amplitude=amplitude)
+    if sig['type'] == 'sweeping_cw':
+        # sweep_speed is in Hz/s as in web_vsg_prototype_v3, so one sweep takes bw/speed seconds
+        sweep_bw = sig.get('sweep_bw', 1e6)
+        period = sweep_bw / sig.get('sweep_speed', 100)
+        return SweepNCO(sig['freq_offset'], sweep_bw, period, sample_rate, shape=sig.get('sweep_shape', 'sawtooth'),
+                        amplitude=amplitude)
+    if sig['type'] == 'freq_hopping_cw':
+        return hopping_oscillator(sig['freq_offset'], sig.get('hop_bw', 1e6), sig.get('num_slots', 8),
+                                  sig.get('hop_rate', 100), sample_rate,
+                                  seed=sig.get('seed', int(rng.integers(1 << 32))),
+                                  dwell_jitter=sig.get('dwell_jitter', 0.0), guard_time=sig.get('guard_time', 0.0),
+                                  amplitude=amplitude)
+    if sig['type'] == 'psk':
+        return PSKBlock(sig.get('mod_type', 'qpsk'), sig.get('symrate', 1e6), sig.get('rolloff', 0.35),
+                        sig['freq_offset'], sample_rate, rng, amplitude=amplitude)
+    raise ValueError(f"Signal type '{sig['type']}' is not supported for streaming")
+
+
+class CompositeBlockSource:
+    """Successive blocks of the composite of a signal list.
+
+    Each enabled signal keeps its own state so consecutive blocks join with no
+    phase or symbol discontinuity. The composite is scaled by the sum of the
+    signal amplitudes, which bounds the peak to 1.0 without having to see the
+    whole waveform first. Each component's gain and that scale are folded into
+    its generator, so the sum is a copy and an add per component.
+    """
+
+    def __init__(self, signals, sample_rate, seed=None):
+        rng = np.random.default_rng(seed)
+        self.sample_rate = sample_rate
+        self.components = []
+        enabled = [sig for sig in signals if sig.get('enabled', True)]
+        total = sum(10**(sig.get('gain_dbm', 0.0)/20) for sig in enabled)
+        self.scale = 1.0 / total if total > 0 else 0.0
+        for sig in enabled:
+            amp = 10**(sig.get('gain_dbm', 0.0)/20)
+            train = None
+            if sig.get('pulse_width') and sig.get('pulse_freq'):
+                train = PulseTrain(sample_rate, 1.0 / sig['pulse_freq'], pulse_width=sig['pulse_width'],
+                                   rise_time=sig.get('rise_time', 0.0), fall_time=sig.get('fall_time', 0.0),
+                                   pri_jitter=sig.get('pri_jitter', 0.0), seed=int(rng.integers(1 << 32)))
+            self.components.append((make_block(sig, sample_rate, rng, amplitude=amp * self.scale), train))
+        self.position = 0
+
+    def read(self, n):
+        iq = np.empty(n, dtype=np.complex64)
+        self.read_into(iq)
+        return iq
+
+    def read_into(self, out):
+        """Sum the next len(out) composite samples straight into `out`; returns the count."""
+        n = len(out)
+        # a block at a time through every component keeps the working set in cache
+        for start in range(0, n, SUM_CHUNK):
+            part = out[start:start + SUM_CHUNK]
+            m = len(part)
+            if not self.components:
+                part[:] = 0
+            for i, (block, train) in enumerate(self.components):
+                samples = block.read(m)
+                if train is not None:
+                    samples = train.apply(samples)
+                if i == 0:
+                    part[:] = samples
+                else:
+                    part += samples
+        self.position += n
+        return n
+
+
+# --------------------------------- Engine -----------------------------------
+
+class StreamingEngine:
+    """Producer/consumer pipeline from a block source to vsg_submit_IQ.
+
+    `source.read(n)` must return n complex samples (fewer, or None, ends the
+    stream). `total_samples=None` streams until stop() is called. Blocks go
+    to the device as float32 views of complex64 buffers, with no interleave
+    pass: a source with read_into(out) writes straight into a pooled
+    buffer, one whose `stable` attribute is true (its blocks stay valid,
+    like memory-mapped file windows) is submitted without any copy, and
+    anything else is copied into a pooled buffer once. `monitor(block)`, if
+    given, sees every block on the producer thread before it is queued (e.g.
+    a Waterfall.feed); it must not modify or keep the block.
+    """
+
+    def __init__(self, vsg, handle, source, block_size=DEFAULT_BLOCK_SIZE,
+                 queue_depth=DEFAULT_QUEUE_DEPTH, total_samples=None, monitor=None):
+        self.vsg = vsg
+        self.handle = handle
+        self.source = source
+        self.block_size = int(block_size)
+        self.total_samples = total_samples
+        self.monitor = monitor
+        self._queue = queue.Queue(maxsize=queue_depth)
+        # queue_depth buffers in flight, one being filled, one being submitted
+        self._pool = BufferPool(queue_depth + 2, self.block_size)
+        self._stop = threading.Event()
+        self._primed = threading.Event()  # queue full (or source done): submitting may start
+        self._producer = None
+        self._consumer = None
+        self.error = None
+        self.blocks_submitted = 0
+        self.samples_submitted = 0
+        self.starved = 0  # times the consumer found the queue empty
+        self.max_submit_time = 0.0
+
+    def start(self):
+        if self.running:
+            raise RuntimeError('Stream already running')
+        self._stop.clear()
+        self._primed.clear()
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._consumer = threading.Thread(target=self._consume, daemon=True)
+        self._producer.start()
+        self._consumer.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for t in (self._producer, self._consumer):
+            if t is not None:
+                t.join(timeout=timeout)
+
+    def wait(self, timeout=None):
+        """Block until the stream has finished (finite streams only)."""
+        if self._consumer is not None:
+            self._consumer.join(timeout=timeout)
+
+    @property
+    def running(self):
+        return self._consumer is not None and self._consumer.is_alive()
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "blocks_submitted": self.blocks_submitted,
+            "samples_submitted": self.samples_submitted,
+            "queued": self._queue.qsize(),
+            "starved": self.starved,
+            "max_submit_time": self.max_submit_time,
+            "error": self.error,
+        }
+
+    def _produce(self):
+        produced = 0
+        read_into = getattr(self.source, 'read_into', None)
+        stable = getattr(self.source, 'stable', False)
+        try:
+            while not self._stop.is_set():
+                n = self.block_size
+                if self.total_samples is not None:
+                    n = min(n, self.total_samples - produced)
+                    if n <= 0:
+                        break
+                if read_into is not None:
+                    buf = self._pool.acquire()
+                    n = read_into(buf[:n])
+                    if not n:
+                        self._pool.release(buf)
+                        break
+                    item = (buf[:n], buf)
+                else:
+                    block = self.source.read(n)
+                    if block is None or len(block) == 0:
+                        break
+                    n = len(block)
+                    if stable:
+                        item = (np.ascontiguousarray(block, dtype=np.complex64), None)
+                    else:
+                        buf = self._pool.acquire()
+                        buf[:n] = block
+                        item = (buf[:n], buf)
+                produced += n
+                if self.monitor is not None:
+                    self.monitor(item[0])
+                if not self._put(item):
+                    return
+                if self._queue.full():
+                    self._primed.set()
+        except Exception as exc:
+            self.error = str(exc)
+        self._primed.set()
+        self._put(None)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _consume(self):
+        try:
+            # wait for a full queue and send it as one submission, so the device
+            # starts with queue_depth blocks buffered rather than one
+            while not self._primed.wait(0.1):
+                if self._stop.is_set():
+                    return
+            backlog = []
+            while not self._queue.empty():
+                backlog.append(self._queue.get_nowait())
+                if backlog[-1] is None:
+                    break
+            finished = bool(backlog) and backlog[-1] is None
+            blocks = [item for item in backlog if item is not None]
+            if blocks:
+                first = np.concatenate([block for block, _ in blocks])
+                for _, buf in blocks:
+                    if buf is not None:
+                        self._pool.release(buf)
+                if not self._submit(first, len(blocks)):
+                    return
+            while not finished and not self._stop.is_set():
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    if self.blocks_submitted:
+                        self.starved += 1
+                    try:
+                        item = self._queue.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                if item is None:
+                    break
+                block, buf = item
+                ok = self._submit(block, 1)
+                if buf is not None:
+                    self._pool.release(buf)
+                if not ok:
+                    return
+            if self._stop.is_set():
+                self.vsg.vsg_flush(self.handle)
+            else:
+                self.vsg.vsg_flush_and_wait(self.handle)
+        except Exception as exc:
+            self.error = str(exc)
+            self._stop.set()
+
+    def _submit(self, block, blocks):
+        """Send `block` (which holds `blocks` engine blocks); False once the stream has failed."""
+        n = len(block)
+        t0 = time.perf_counter()
+        result = self.vsg.vsg_submit_IQ(self.handle, as_float32(block), n)
+        self.max_submit_time = max(self.max_submit_time, time.perf_counter() - t0)
+        if result.get("status", 0) < 0:
+            self.error = f"vsg_submit_IQ failed: {result}"
+            self._stop.set()
+            return False
+        self.blocks_submitted += blocks
+        self.samples_submitted += n
+        return True
@@ -0,0 +1,183 @@
+"""Precomputed step sweeps run against a monotonic deadline schedule.
+
+The LO sweep used to compute its next frequency on the fly and sleep a fixed
+interval after each step, so every step's command time and scheduling delay
+added to the dwell and the sweep drifted. Here the frequency list is built
+up front (plan_frequencies), and a SweepRunner issues step k at
+start + k * dwell on time.monotonic(), sleeping on an Event until shortly
+before each deadline and spinning the rest. For every step it records how
+late the command was issued and how long it took into fixed-size float32
+rings, so the achievable step rate and its jitter can be measured rather
+than guessed.
+"""
+import threading
+import time
+
+import numpy as np
+
+PLANS = ('linear', 'log', 'list', 'random')
+HISTORY = 4096          # steps of timing kept
+SPIN = 0.0005           # seconds before a deadline to stop sleeping and spin
+
+
+def plan_frequencies(kind, start=None, stop=None, points=None, freqs=None, bounce=False, seed=None):
+    """Frequencies (Hz, float64) for one sweep cycle.
+
+    kind: 'linear' or 'log' (`points` from start to stop), 'list' (`freqs` as
+    given, a non-empty flat list) or 'random' (the linear grid in a random
+    order, no repeats). bounce appends the way back without repeating the end points, giving a
+    triangle sweep when the plan is cycled. Raises ValueError for a plan that
+    would be empty or has non-finite frequencies.
+    """
+    if kind == 'list':
+        if freqs is None:
+            raise ValueError("list sweep needs a list of frequencies")
+        try:
+            plan = np.asarray(freqs, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError("sweep list must contain only frequencies") from None
+        if plan.ndim != 1:
+            raise ValueError("sweep list must be a flat list of frequencies")
+    elif kind in ('linear', 'random'):
+        plan = np.linspace(start, stop, int(points))
+        if kind == 'random':
+            plan = np.random.default_rng(seed).permutation(plan)
+    elif kind == 'log':
+        if start <= 0 or stop <= 0:
+            raise ValueError("log sweep needs positive start and stop frequencies")
+        plan = np.geomspace(start, stop, int(points))
+    else:
+        raise ValueError(f"unknown sweep plan {kind}")
+    if plan.size == 0:
+        raise ValueError("sweep plan is empty")
+    if not np.all(np.isfinite(plan)):
+        raise ValueError("sweep plan has non-finite frequencies")
+    if bounce and plan.size > 2:
+        plan = np.concatenate((plan, plan[-2:0:-1]))
+    return plan
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values.size else 0.0
+
+
+class SweepRunner:
+    """Steps `set_frequency(f)` through a plan on a fixed dwell grid, on its own thread.
+
+    set_frequency should return once the device has been retuned, so the
+    recorded latency is the real per-step cost. cycles=None repeats the plan
+    until stop(). A step that starts more than one dwell late re-anchors the
+    schedule on the current time instead of bursting through the backlog.
+    """
+
+    def __init__(self, plan, dwell, set_frequency, cycles=None, spin=SPIN, history=HISTORY):
+        self.plan = np.asarray(plan, dtype=np.float64)
+        self.dwell = float(dwell)
+        self.set_frequency = set_frequency
+        self.cycles = cycles
+        self.spin = spin
+        self._late = np.zeros(history, dtype=np.float32)      # seconds after the deadline the step began
+        self._latency = np.zeros(history, dtype=np.float32)   # seconds the frequency command took
+        self._issued = np.zeros(history, dtype=np.float64)    # step start, seconds since the sweep began
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.steps = 0
+        self.overruns = 0   # steps whose command ran past the next deadline
+        self.slips = 0      # times the schedule was re-anchored
+        self.current = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self._at = None
+
+    def start(self, at=None):
+        """Run the sweep; `at` (time.monotonic()) anchors step 0, so runners given the
+        same `at` step in lockstep. Defaults to now."""
+        self._stop.clear()
+        self.finished = None
+        self._at = at
+        self._thread = threading.Thread(target=self._run, daemon=True, name='vsg-sweep')
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        n = self.plan.size
+        cycle = 0
+        t0 = self.started = self._at if self._at is not None else time.monotonic()
+        k = 0   # steps since t0
+        try:
+            while not self._stop.is_set():
+                if self.cycles is not None and cycle >= self.cycles:
+                    break
+                # dwell 0 runs free: each step is due as soon as the previous one is done
+                deadline = t0 + k * self.dwell if self.dwell > 0 else time.monotonic()
+                remaining = deadline - time.monotonic()
+                if remaining > self.spin and self._stop.wait(remaining - self.spin):
+                    break
+                while time.monotonic() < deadline:
+                    pass
+                begin = time.monotonic()
+                late = begin - deadline
+                if late > self.dwell > 0:
+                    # too far behind to keep the grid: restart it here
+                    t0, k = begin, 0
+                    self.slips += 1
+                freq = self.plan[self.steps % n]
+                self.set_frequency(freq)
+                end = time.monotonic()
+                with self._lock:
+                    i = self.steps % self._late.size
+                    self._late[i] = late
+                    self._latency[i] = end - begin
+                    self._issued[i] = begin - self.started
+                    self.steps += 1
+                    self.current = float(freq)
+                    if end - begin > self.dwell > 0:
+                        self.overruns += 1
+                k += 1
+                if self.steps % n == 0:
+                    cycle += 1
+        except Exception as exc:
+            self.error = str(exc)
+        self.finished = time.monotonic()
+
+    def history(self, count=None):
+        """(issued, late, latency) of the last `count` steps, oldest first."""
+        with self._lock:
+            held = min(self.steps, self._late.size)
+            count = held if count is None else min(int(count), held)
+            idx = np.arange(self.steps - count, self.steps) % self._late.size
+            return self._issued[idx], self._late[idx], self._latency[idx]
+
+    def stats(self):
+        issued, late, latency = self.history()
+        intervals = np.diff(issued)
+        elapsed = (self.finished or time.monotonic()) - self.started if self.started is not None else 0.0
+        return {
+            "running": self.running,
+            "plan_points": int(self.plan.size),
+            "dwell": self.dwell,
+            "steps": self.steps,
+            "overruns": self.overruns,
+            "slips": self.slips,
+            "frequency": self.current,
+            "step_rate": self.steps / elapsed if elapsed > 0 else 0.0,
+            "late_mean": float(late.mean()) if late.size else 0.0,
+            "late_p99": _percentile(late, 99),
+            "late_max": float(late.max()) if late.size else 0.0,
+            "latency_mean": float(latency.mean()) if latency.size else 0.0,
+            "latency_p99": _percentile(latency, 99),
+            "latency_max": float(latency.max()) if latency.size else 0.0,
+            # spread of the achieved step-to-step interval around its mean
+            "jitter": float(intervals.std()) if intervals.size else 0.0,
+            "error": self.error,
+        }
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLES_PY = os.path.join(ROOT, "vsg60_series", "examples", "python")
+for path in (ROOT, EXAMPLES_PY):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,57 @@
+import types
+
+import pytest
+
+from vsgdevice import backend, vsg_api, vsg_fast
+from vsgdevice.vsg_sim import SimulatedVSG
+
+
+def test_backend_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv('VSG_BACKEND', 'sim')
+    assert isinstance(backend.load_backend(), SimulatedVSG)
+    assert backend.load_backend('sim', serials=(7,)).vsg_get_device_list()["serials"] == [7]
+    with pytest.raises(ValueError):
+        backend.load_backend('usb')
+
+
+def test_dll_is_the_default(monkeypatch):
+    monkeypatch.delenv('VSG_BACKEND', raising=False)
+    monkeypatch.setattr(vsg_api, 'load_error', None)
+    assert backend.load_backend() is vsg_api
+    monkeypatch.setattr(vsg_api, 'load_error', OSError("missing"))
+    with pytest.raises(OSError):
+        backend.load_backend()
+
+
+class FakeCDLL:
+    def __init__(self, path, loadable):
+        if path not in loadable:
+            raise OSError(f"cannot load {path}")
+        self.path = path
+
+    def __getattr__(self, name):
+        fn = types.SimpleNamespace()
+        setattr(self, name, fn)
+        return fn
+
+
+def test_fast_library_falls_back_like_vsg_api(monkeypatch):
+    tried = []
+
+    def cdll(path):
+        tried.append(path)
+        return FakeCDLL(path, {"vsgdevice/vsg_api.dll"})
+
+    monkeypatch.setattr(vsg_fast, 'CDLL', cdll)
+    monkeypatch.setattr(vsg_api, '_dll_path', "/nowhere/vsg_api.so")
+    lib = vsg_fast.load_library()
+    assert tried == ["/nowhere/vsg_api.so", "vsgdevice/vsg_api.dll"]
+    assert lib.path == "vsgdevice/vsg_api.dll"
+    assert lib.vsgOpenDevice.restype is vsg_fast.PROTOTYPES["vsgOpenDevice"][0]
+
+
+def test_fast_library_raises_when_nothing_loads(monkeypatch):
+    monkeypatch.setattr(vsg_fast, 'CDLL', lambda path: FakeCDLL(path, set()))
+    monkeypatch.setattr(vsg_api, '_dll_path', None)
+    with pytest.raises(OSError, match="vsgdevice/vsg_api.dll"):
+        vsg_fast.load_library()
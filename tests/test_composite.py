@@ -0,0 +1,49 @@
+import numpy as np
+
+from composite import IncrementalComposite
+from waveform_cache import WaveformCache
+
+N = 4096
+
+
+def noise_component(sig, sample_rate, num_samples):
+    # unseeded on purpose: a regenerated component differs from the first one
+    rng = np.random.default_rng()
+    return (sig['gain'] * (rng.standard_normal(num_samples)
+                           + 1j * rng.standard_normal(num_samples))).astype(np.complex64)
+
+
+def signals(*gains):
+    return [{'type': 'noise', 'gain': g} for g in gains]
+
+
+def test_add_and_remove_match_a_fresh_sum():
+    comp = IncrementalComposite(noise_component)
+    comp.update(signals(1.0, 2.0, 3.0), 1e6, N)
+    total = comp.update(signals(1.0, 3.0), 1e6, N)
+    parts = [comp.component(k, sig, 1e6, N) for k, (sig, _) in comp._active.items()]
+    assert np.allclose(total, parts[0] + parts[1], atol=1e-5)
+
+
+def test_remove_after_cache_eviction_subtracts_what_was_added():
+    # room for a single component, so every other one is evicted and would be regenerated
+    cache = WaveformCache(max_bytes=N * 8)
+    comp = IncrementalComposite(noise_component, cache=cache)
+    first = comp.update(signals(1.0, 2.0, 3.0), 1e6, N).copy()
+    arrays = {k: iq.copy() for k, (_, iq) in comp._active.items()}
+    assert np.allclose(first, sum(arrays.values()), atol=1e-5)
+    total = comp.update(signals(1.0, 3.0), 1e6, N)
+    kept = [arrays[k] for k in comp._active]
+    assert np.allclose(total, kept[0] + kept[1], atol=1e-5)
+
+
+def test_disabled_signals_are_left_out():
+    comp = IncrementalComposite(noise_component)
+    sigs = signals(1.0, 2.0)
+    full = comp.update(sigs, 1e6, N).copy()
+    sigs[1]['enabled'] = False
+    assert len(comp._active) == 2
+    part = comp.update(sigs, 1e6, N)
+    assert len(comp._active) == 1
+    assert not np.allclose(part, full)
+    assert np.isclose(np.max(np.abs(comp.normalized(sigs, 1e6, N))), 1.0, atol=1e-6)
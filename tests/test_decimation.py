@@ -0,0 +1,20 @@
+import numpy as np
+
+from decimation import lttb, minmax_decimate
+
+
+def test_minmax_keeps_each_channels_extremes():
+    iq = np.zeros((100, 2), dtype=np.float32)
+    iq[10, 0], iq[20, 1] = 5.0, -3.0
+    positions, points = minmax_decimate(iq, 10)
+    assert points.shape == (20, 2)
+    # I's peak and Q's dip sit in different buckets and both survive
+    assert points[:, 0].max() == 5.0 and points[:, 1].min() == -3.0
+    assert positions[2] == 10 and positions[4] == 20
+
+
+def test_lttb_keeps_i_and_q_paired():
+    rng = np.random.default_rng(1)
+    iq = rng.standard_normal((1000, 2)).astype(np.float32)
+    positions, points = lttb(iq, 50)
+    assert np.array_equal(points, iq[positions])
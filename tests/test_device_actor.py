@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from device_actor import DeviceActor, COMMAND_TIMEOUT
+from vsgdevice.vsg_sim import SimulatedVSG
+
+
+class GatedVSG(SimulatedVSG):
+    """Simulator with a command that holds the actor thread, so the next commands land in one batch."""
+
+    def __init__(self):
+        super().__init__(command_latency=0.0)
+        self.gate = threading.Event()
+        self.calls = []
+
+    def hold(self, device):
+        self.gate.wait(COMMAND_TIMEOUT)
+        return {"status": 0}
+
+    def vsg_set_frequency(self, device, frequency):
+        self.calls.append(('vsg_set_frequency', frequency))
+        return super().vsg_set_frequency(device, frequency)
+
+
+@pytest.fixture
+def actor():
+    vsg = GatedVSG()
+    actor = DeviceActor(vsg)
+    actor.open().result(COMMAND_TIMEOUT)
+    yield actor
+    actor.close().result(COMMAND_TIMEOUT)
+
+
+def batch(actor, *cmds):
+    """Queue cmds behind a held command so they run as one actor turn; their futures."""
+    actor.vsg.gate.clear()
+    held = actor.submit('hold')
+    futures = [actor.submit(*cmd) for cmd in cmds]
+    actor.vsg.gate.set()
+    held.result(COMMAND_TIMEOUT)
+    return [f.result(COMMAND_TIMEOUT) for f in futures]
+
+
+def test_setters_coalesce_to_last_value(actor):
+    results = batch(actor, ('vsg_set_frequency', 1.0e9), ('vsg_set_frequency', 2.0e9),
+                    ('vsg_set_frequency', 3.0e9))
+    assert all(r["status"] == 0 for r in results)
+    assert actor.vsg.calls == [('vsg_set_frequency', 3.0e9)]
+    assert actor.call('vsg_get_frequency')["frequency"] == 3.0e9
+
+
+def test_repeated_identical_set_is_skipped(actor):
+    actor.call('vsg_set_frequency', 1.5e9)
+    actor.call('vsg_set_frequency', 1.5e9)
+    assert actor.vsg.calls == [('vsg_set_frequency', 1.5e9)]
+
+
+def test_identical_reads_share_one_result(actor):
+    executed = actor.executed
+    a, b = batch(actor, ('vsg_get_level',), ('vsg_get_level',))
+    assert a == b
+    assert actor.executed - executed == 2   # the held command and one read
+
+
+def test_read_after_coalesced_set_sees_new_value(actor):
+    actor.call('vsg_set_frequency', 1.0e9)
+    before, _, after = batch(actor, ('vsg_get_frequency',), ('vsg_set_frequency', 5.0e9),
+                             ('vsg_get_frequency',))
+    assert before["frequency"] == 1.0e9
+    assert after["frequency"] == 5.0e9
+
+
+def test_failed_set_is_not_recorded_as_applied(actor):
+    vsg = actor.vsg
+    vsg.inject_usb_fault(actor.handle)
+    assert actor.call('vsg_set_frequency', 2.0e9)["status"] < 0
+    vsg._device(actor.handle).usb_fault = False
+    assert actor.call('vsg_set_frequency', 2.0e9)["status"] == 0
+    assert vsg.calls == [('vsg_set_frequency', 2.0e9)] * 2
+    assert actor.call('vsg_get_frequency')["frequency"] == 2.0e9
+
+
+def test_command_without_open_device_fails():
+    actor = DeviceActor(SimulatedVSG(command_latency=0.0))
+    with pytest.raises(RuntimeError):
+        actor.call('vsg_get_frequency')
+
+
+def test_waveform_uploads_get_time_per_sample(monkeypatch):
+    import device_actor
+
+    class SlowUpload(SimulatedVSG):
+        def vsg_repeat_waveform(self, device, iq, length):
+            time.sleep(0.2)
+            return {"status": 0}
+
+        def vsg_preset(self, device):
+            time.sleep(0.2)
+            return {"status": 0}
+
+    monkeypatch.setattr(device_actor, 'COMMAND_TIMEOUT', 0.05)
+    monkeypatch.setattr(device_actor, 'UPLOAD_SECONDS_PER_SAMPLE', 1e-5)
+    assert device_actor.command_timeout('vsg_repeat_waveform', (None, 100_000)) == pytest.approx(1.05)
+    actor = DeviceActor(SlowUpload(command_latency=0.0))
+    actor.open().result(COMMAND_TIMEOUT)
+    assert actor.call('vsg_repeat_waveform', None, 100_000)["status"] == 0
+    with pytest.raises(TimeoutError):
+        actor.call('vsg_preset')
+    actor.close().result(COMMAND_TIMEOUT)
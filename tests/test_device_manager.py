@@ -0,0 +1,43 @@
+import pytest
+
+from device_actor import DeviceActor, COMMAND_TIMEOUT
+from device_manager import DeviceManager, split_span
+from vsgdevice.vsg_sim import SimulatedVSG
+
+SERIALS = (101, 102, 103)
+
+
+@pytest.fixture
+def manager():
+    vsg = SimulatedVSG(serials=SERIALS, command_latency=0.0)
+    manager = DeviceManager(vsg, default=DeviceActor(vsg))
+    yield manager
+    manager.close()
+    manager.default.close().result(COMMAND_TIMEOUT)
+
+
+def test_split_span_is_contiguous():
+    assert split_span(0.0, 30.0, 3) == [(0.0, 10.0), (10.0, 20.0), (20.0, 30.0)]
+
+
+def test_units_get_their_own_actors_and_settings(manager):
+    handles = manager.open(SERIALS)
+    assert sorted(handles) == list(SERIALS)
+    manager.run({s: [('vsg_set_frequency', s * 1e7)] for s in SERIALS})
+    for serial in SERIALS:
+        assert manager.actor(serial).call('vsg_get_frequency')["frequency"] == serial * 1e7
+        assert manager.actor(serial).call('vsg_get_serial_number')["serial"] == serial
+
+
+def test_default_actor_unit_is_shared(manager):
+    manager.default.open().result(COMMAND_TIMEOUT)
+    assert manager.default_serial() == SERIALS[0]
+    assert manager.actor(SERIALS[0]) is manager.default
+    assert manager.open([SERIALS[0]]) == {SERIALS[0]: manager.default.handle}
+
+
+def test_failed_open_closes_the_units_it_opened(manager):
+    with pytest.raises(RuntimeError):
+        manager.open([101, 999])
+    assert manager.handles() == {}
+    assert manager.open([101]) == {101: manager.actor(101).handle}
@@ -0,0 +1,83 @@
+from concurrent.futures import Future
+
+import pytest
+
+from device_actor import DeviceActor
+from device_session import DeviceSession, CLOSED, READY, FAULT
+from vsgdevice.vsg_sim import SimulatedVSG
+
+
+@pytest.fixture
+def session():
+    vsg = SimulatedVSG(command_latency=0.0)
+    session = DeviceSession(DeviceActor(vsg), interval=3600)
+    yield session
+    session.stop_monitor()
+    if session.state != CLOSED:
+        session.close()
+
+
+def test_open_is_lazy_and_kept(session):
+    assert session.state == CLOSED and session.actor.handle is None
+    handle = session.ensure_open()
+    executed = session.actor.executed
+    assert session.ensure_open() == handle
+    assert session.actor.executed == executed   # no device I/O once open
+    assert session.status()["info"]["vsg_get_serial_number"]["serial"] == session.actor.vsg.serials[0]
+
+
+def test_healthy_check_keeps_the_handle(session):
+    handle = session.ensure_open()
+    assert session.check() == READY
+    assert session.actor.handle == handle
+    assert session.health["usb"]["status"] == 0 and session.health["temperature"] is not None
+
+
+def test_failed_check_reopens_and_calls_hook(session):
+    reopened = []
+    session.on_reopen = lambda handle: reopened.append(handle) or "restored"
+    session.actor.vsg.inject_usb_fault(session.ensure_open())
+    assert session.check() == READY
+    assert session.faults == 1 and session.reopens == 1
+    assert reopened == [session.actor.handle]
+    assert session.last_reopen["output"] == "restored" and not session.output_lost
+    assert session.actor.call('vsg_get_USB_status')["status"] == 0
+
+
+def test_failing_hook_reports_output_lost(session):
+    def hook(handle):
+        raise RuntimeError("stream gone")
+    session.on_reopen = hook
+    session.actor.vsg.inject_usb_fault(session.ensure_open())
+    assert session.check() == READY
+    assert session.output_lost and "stream gone" in session.last_reopen["output"]
+
+
+def test_unit_missing_stays_in_fault_until_it_returns(session):
+    vsg = session.actor.vsg
+    serials = vsg.serials
+    vsg.inject_usb_fault(session.ensure_open())
+    vsg.serials = ()
+    assert session.check() == FAULT
+    with pytest.raises(RuntimeError):
+        session.ensure_open()
+    vsg.serials = serials
+    assert session.check() == READY
+
+
+def test_close_during_check_is_not_a_fault(session):
+    session.ensure_open()
+    actor = session.actor
+    read_status = actor.read_status
+
+    def close_then_fail(names):
+        # /stop {"close": true} lands while the health reads are in flight
+        session.close()
+        failed = Future()
+        failed.set_exception(RuntimeError("Device not open"))
+        return failed
+
+    actor.read_status = close_then_fail
+    assert session.check() == CLOSED
+    actor.read_status = read_status
+    assert session.faults == 0 and actor.handle is None
@@ -0,0 +1,25 @@
+import pytest
+
+from fanout_ring import FanoutRing, parse_seq
+
+
+@pytest.mark.parametrize("value, seq", [(None, None), ('', None), ('-1', -1), ('12', 12), (3, 3)])
+def test_parse_seq(value, seq):
+    assert parse_seq(value) == seq
+
+
+@pytest.mark.parametrize("value", ['abc', '1.5', '-2', [1]])
+def test_parse_seq_rejects_bad_values(value):
+    with pytest.raises(ValueError):
+        parse_seq(value)
+
+
+def test_subscriber_resumes_and_counts_drops():
+    ring = FanoutRing(4)
+    for i in range(3):
+        ring.publish(i)
+    sub = ring.subscribe(parse_seq('0') + 1)
+    assert [sub.get(0), sub.get(0)] == [1, 2]
+    for i in range(3, 10):
+        ring.publish(i)
+    assert sub.get(0) == 6 and sub.dropped == 3
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from hopping import HopSchedule, generate_freq_hopping_cw, hopping_oscillator, slot_frequencies
+
+SR = 10e6
+
+
+@pytest.mark.parametrize('hop_rate, jitter, guard', [(1e5, 0.0, 0.0), (3e5, 0.0, 0.0), (1e5, 0.3, 0.0),
+                                                    (7e4, 0.0, 2e-6), (1e3, 0.0, 0.0)])
+def test_one_shot_matches_small_blocks(hop_rate, jitter, guard):
+    # one read fills runs of dwells at once; 64-sample reads go dwell by dwell
+    n = 200_000
+    whole = generate_freq_hopping_cw(1e5, -6, SR, n, 2e6, 16, hop_rate, seed=3, dwell_jitter=jitter,
+                                     guard_time=guard)
+    osc = hopping_oscillator(1e5, 2e6, 16, hop_rate, SR, seed=3, dwell_jitter=jitter, guard_time=guard,
+                             block_size=64, amplitude=10**(-6/20))
+    parts = np.concatenate([osc.read(64).copy() for _ in range(n // 64 + 1)])[:n]
+    assert np.allclose(whole, parts, atol=1e-5)
+
+
+def test_hops_land_on_the_slot_frequencies():
+    n, dwell = 100_000, 1000
+    iq = generate_freq_hopping_cw(0.0, 0.0, SR, n, 2e6, 8, SR / dwell, seed=5)
+    assert np.allclose(np.abs(iq), 1.0, atol=1e-5)
+    freqs = slot_frequencies(0.0, 2e6, 8)
+    # instantaneous frequency inside each dwell is one of the slots
+    inst = np.angle(iq[1:] * np.conj(iq[:-1])) * SR / (2 * np.pi)
+    for d in range(n // dwell):
+        f = np.median(inst[d * dwell + 1:(d + 1) * dwell - 1])
+        assert np.min(np.abs(freqs - f)) < 1.0
+
+
+def test_guard_time_is_silent():
+    schedule = HopSchedule(4, 100, seed=1, guard_samples=10)
+    slots, lengths, guards = schedule.draw(5)
+    assert np.all(lengths == 100) and np.all(guards == 10)
+    iq = generate_freq_hopping_cw(0.0, 0.0, SR, 10_000, 1e6, 4, SR / 100, seed=1, guard_time=10 / SR)
+    assert np.count_nonzero(iq == 0) == 1000
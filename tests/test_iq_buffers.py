@@ -0,0 +1,36 @@
+import queue
+
+import numpy as np
+import pytest
+
+from iq_buffers import ALIGNMENT, BufferPool, aligned_empty, as_float32
+
+
+@pytest.mark.parametrize('n', [1, 7, 4096])
+@pytest.mark.parametrize('dtype', [np.complex64, np.float32, np.int16])
+def test_aligned_empty(n, dtype):
+    buf = aligned_empty(n, dtype)
+    assert buf.ctypes.data % ALIGNMENT == 0
+    assert buf.shape == (n,) and buf.dtype == dtype
+
+
+def test_pooled_buffers_are_aligned_and_reused():
+    pool = BufferPool(3, 1000)
+    taken = [pool.acquire(timeout=0) for _ in range(3)]
+    assert all(b.ctypes.data % ALIGNMENT == 0 and b.size == 1000 for b in taken)
+    assert len({b.ctypes.data for b in taken}) == 3 and pool.available == 0
+    with pytest.raises(queue.Empty):
+        pool.acquire(timeout=0)
+    pool.release(taken[1])
+    assert pool.acquire(timeout=0) is taken[1]
+
+
+def test_float32_view_shares_memory():
+    iq = aligned_empty(4)
+    iq[:] = [1 + 2j, 3 + 4j, 5 + 6j, 7 + 8j]
+    view = as_float32(iq)
+    assert np.shares_memory(view, iq)
+    assert view.tolist() == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert as_float32(view) is view
+    with pytest.raises(TypeError):
+        as_float32(np.zeros(4, dtype=np.complex128))
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from iq_file import IQFile, IQFileSource
+
+
+@pytest.fixture
+def recording(tmp_path):
+    iq = (np.random.default_rng(0).standard_normal((1000, 2)).astype(np.float32)).ravel()
+    path = tmp_path / "rec.iq"
+    # a trailing odd float is not a sample
+    np.concatenate([iq, np.float32([7.0])]).tofile(path)
+    return str(path)
+
+
+def test_memmap_reads_match_fromfile(recording):
+    expected = np.fromfile(recording, dtype=np.float32)[:2000]
+    f = IQFile(recording)
+    assert f.complex_samples == 1000
+    assert np.array_equal(f.interleaved(), expected)
+    assert np.array_equal(f.window(100, 50), expected.view(np.complex64)[100:150])
+    assert np.array_equal(f.interleaved(990, 50), expected[1980:])
+
+
+def test_take_wraps_around_the_end(recording):
+    f = IQFile(recording)
+    iq = np.fromfile(recording, dtype=np.float32)[:2000].view(np.complex64)
+    assert np.array_equal(f.take(990, 20), np.concatenate([iq[990:], iq[:10]]))
+
+
+def test_source_loops_over_the_file(recording):
+    f = IQFile(recording)
+    source = IQFileSource(f, loop=True)
+    blocks = [source.read(400) for _ in range(4)]
+    assert [len(b) for b in blocks] == [400, 400, 200, 400]
+    assert np.array_equal(blocks[3], f.window(0, 400))
+    assert IQFileSource(f, start=900).read(400).size == 100
+
+
+def test_empty_file_is_rejected(tmp_path):
+    path = tmp_path / "empty.iq"
+    path.write_bytes(b"\0\0\0\0")
+    with pytest.raises(ValueError):
+        IQFile(str(path))
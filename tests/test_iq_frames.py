@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+import pytest
+
+from iq_frames import (FMT_FLOAT32, FMT_INT16, HEADER_SIZE, IQBlock, decode_frame, decode_header, encode_frame,
+                       frame_size)
+
+
+def tone(n=500):
+    return (0.7 * np.exp(2j * np.pi * 0.013 * np.arange(n))).astype(np.complex64)
+
+
+def test_float32_frames_round_trip_exactly():
+    iq = tone()
+    buf = encode_frame(iq, 42, 1e6, 123.5)
+    header, out = decode_frame(buf)
+    assert header == {"fmt": FMT_FLOAT32, "seq": 42, "sample_rate": 1e6, "timestamp": 123.5,
+                      "samples": iq.size, "scale": 1.0}
+    assert len(buf) == frame_size(header) == HEADER_SIZE + 8 * iq.size
+    assert np.array_equal(out, iq)
+    # interleaved float32 input frames the same samples
+    assert encode_frame(iq.view(np.float32), 42, 1e6, 123.5) == buf
+
+
+def test_int16_frames_round_trip_within_a_step():
+    iq = tone()
+    buf = encode_frame(iq, 1, 1e6, 0.0, FMT_INT16)
+    header, out = decode_frame(buf)
+    assert header["fmt"] == FMT_INT16 and len(buf) == frame_size(header)
+    assert np.max(np.abs(out - iq)) <= header["scale"] / 32767.0
+
+
+def test_bad_frames_are_rejected():
+    with pytest.raises(ValueError):
+        decode_header(b'XXXX' + encode_frame(tone(4), 0, 1.0, 0.0)[4:])
+    with pytest.raises(ValueError):
+        encode_frame(tone(4), 0, 1.0, 0.0, fmt=7)
+
+
+def test_block_encodes_each_format_once():
+    block = IQBlock(tone(8), 5, 1e6, 0.0)
+    assert block.frame() is block.frame()
+    assert block.frame(FMT_INT16) is block.frame(FMT_INT16)
+    data = json.loads(block.json())
+    assert data["seq"] == 5 and np.allclose(data["i"], block.iq.real)
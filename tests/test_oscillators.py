@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from oscillators import NCO, SweepNCO, TWO_PI, closed_sweep_center, sweep_period_phase
+
+SR = 10e6
+
+
+def turn_residual(phase):
+    turns = phase / TWO_PI
+    return abs(turns - round(turns))
+
+
+@pytest.mark.parametrize('shape', SweepNCO.SHAPES)
+def test_closed_sweep_period_is_a_whole_number_of_turns(shape):
+    nco = SweepNCO(0.0, 2e6, 1e-3, SR, shape=shape, carrier=1e9, closed=True)
+    assert turn_residual(nco.period_phase) < 1e-6
+    # the nudge stays small next to the sweep
+    assert abs(nco.center) < SR / nco.period_samples
+
+
+def test_log_sweep_is_not_closed_without_the_nudge():
+    phase = sweep_period_phase('log', 0.0, 2e6, 10000, SR, 1e9)
+    assert turn_residual(phase) > 1e-4
+    center = closed_sweep_center('log', 0.0, 2e6, 10000, SR, 1e9)
+    assert turn_residual(sweep_period_phase('log', center, 2e6, 10000, SR, 1e9)) < 1e-6
+
+
+@pytest.mark.parametrize('shape', SweepNCO.SHAPES)
+def test_closed_period_loops_without_a_phase_jump(shape):
+    nco = SweepNCO(0.0, 2e6, 1e-3, SR, shape=shape, carrier=1e9, closed=True)
+    first = nco.read(nco.period_samples).copy()
+    second = nco.read(nco.period_samples)
+    assert np.allclose(first, second, atol=1e-4)
+
+
+def test_blocks_join_like_one_read():
+    whole = NCO(1.25e6, SR).read(3000).copy()
+    nco = NCO(1.25e6, SR)
+    parts = np.concatenate([nco.read(1000).copy() for _ in range(3)])
+    assert np.allclose(whole, parts, atol=1e-5)
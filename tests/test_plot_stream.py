@@ -0,0 +1,83 @@
+import socket
+
+import numpy as np
+import pytest
+
+from plot_stream import (FRAME_IQ, FRAME_SHM, FRAME_SHUTDOWN, SHM_SLOTS, FrameReader, FrameSender, PlotMonitor,
+                         ShmSender)
+
+
+@pytest.fixture
+def listener():
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    yield server
+    server.close()
+
+
+def connect(listener, sender_cls, *args):
+    sender = sender_cls(*args, host='127.0.0.1', port=listener.getsockname()[1])
+    conn, _ = listener.accept()
+    return sender, conn, FrameReader(conn)
+
+
+def tone(n, seed=0):
+    return np.exp(1j * np.random.default_rng(seed).uniform(0, 6, n)).astype(np.complex64)
+
+
+def next_frame(reader):
+    ftype, seq, sample_rate, length = reader.read_header()
+    return ftype, sample_rate, reader.read_iq(ftype, length, seq)
+
+
+@pytest.mark.parametrize('sender_cls, args, ftype', [(FrameSender, (), FRAME_IQ), (ShmSender, (4096,), FRAME_SHM)])
+def test_frames_round_trip(listener, sender_cls, args, ftype):
+    sender, conn, reader = connect(listener, sender_cls, *args)
+    try:
+        for seed in range(3):
+            iq = tone(1000 + seed, seed)
+            sender.send_iq(iq, 5e6)
+            got_type, rate, got = next_frame(reader)
+            assert got_type == ftype and rate == 5e6
+            assert np.array_equal(got, iq)
+        sender.shutdown()
+        assert reader.read_header()[0] == FRAME_SHUTDOWN
+    finally:
+        reader.close()
+        sender.close()
+        conn.close()
+
+
+def test_reused_shm_slot_is_dropped_not_shown(listener):
+    sender, conn, reader = connect(listener, ShmSender, 256)
+    try:
+        frames = [tone(256, seed) for seed in range(SHM_SLOTS + 1)]
+        for iq in frames:
+            sender.send_iq(iq, 1e6)    # the last one overwrites the first frame's slot
+        _, _, first = next_frame(reader)
+        assert first.size == 0 and reader.dropped == 1
+        for iq in frames[1:]:
+            assert np.array_equal(next_frame(reader)[2], iq)
+    finally:
+        reader.close()
+        sender.close()
+        conn.close()
+
+
+def test_plot_monitor_throttles_and_survives_a_closed_plotter(listener):
+    sender, conn, reader = connect(listener, ShmSender, 1024)
+    try:
+        monitor = PlotMonitor(sender, 1e6, interval=60.0)
+        monitor(tone(4096))                       # cut to the slot size
+        monitor(tone(1024, 1))                    # inside the interval: not sent
+        assert monitor.frames == 1
+        assert next_frame(reader)[2].size == 1024
+        conn.close()
+        monitor = PlotMonitor(sender, 1e6, interval=0.0)
+        for _ in range(50):                       # the closed socket fails a later send
+            monitor(tone(1024))
+        assert monitor.sender is None and monitor.frames < 50
+    finally:
+        reader.close()
+        sender.close()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from pulse_shaping import PolyphaseShaper, rrc_filter, rrc_taps, shape_symbols
+
+
+def qpsk(n, seed=0):
+    bits = np.random.default_rng(seed).integers(0, 4, n)
+    return np.exp(1j * (np.pi / 4 + np.pi / 2 * bits))
+
+
+def zero_stuffed(symbols, sps, rolloff, span):
+    up = np.zeros(symbols.size * sps, dtype=np.complex128)
+    up[::sps] = symbols
+    return np.convolve(up, rrc_filter(span * sps, rolloff, sps), mode='same')
+
+
+@pytest.mark.parametrize('sps, span', [(4, 11), (8, 41), (4, 81)])   # direct branches, then FFT overlap-save
+def test_matches_the_zero_stuffed_convolution(sps, span):
+    symbols = qpsk(5000)
+    shaped = shape_symbols(symbols, sps, 0.35, span)
+    assert shaped.size == symbols.size * sps
+    assert np.allclose(shaped, zero_stuffed(symbols, sps, 0.35, span), atol=1e-5)
+
+
+@pytest.mark.parametrize('rolloff', [0.0, 0.1, 0.2, 0.25, 0.3, 0.35, 0.5, 1.0])
+@pytest.mark.parametrize('sps', range(2, 17))
+def test_rrc_taps_are_finite(rolloff, sps):
+    # t = +/-1/(4 rolloff) lands on a tap for many pairs
+    assert np.all(np.isfinite(rrc_filter(11 * sps, rolloff, sps)))
+
+
+def test_streaming_equals_full_shaping():
+    symbols = qpsk(3000, seed=1)
+    shaper = PolyphaseShaper(8, 0.35, 41)
+    parts = np.concatenate([shaper.process(symbols[i:i + 700]) for i in range(0, symbols.size, 700)])
+    full = shape_symbols(symbols, 8, 0.35, 41, mode='full')
+    assert np.allclose(parts, full[:parts.size], atol=1e-5)
+
+
+def test_designs_are_cached_and_read_only():
+    assert rrc_taps(0.35, 8, 41) is rrc_taps(0.35, 8, 41)
+    with pytest.raises(ValueError):
+        rrc_taps(0.35, 8, 41)[0] = 0.0
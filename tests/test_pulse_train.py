@@ -0,0 +1,19 @@
+import numpy as np
+
+from pulse_train import apply_pulse_envelope
+
+
+def test_apply_pulse_envelope_leaves_its_input_alone():
+    iq = np.ones(1000, dtype=np.complex64)
+    gated = apply_pulse_envelope(iq, 1e6, 100e-6, 2e3)
+    assert np.all(iq == 1)
+    assert gated is not iq
+    # 100 us on every 500 us
+    assert np.count_nonzero(gated) == 200
+    assert np.all(gated[:100] == 1) and np.all(gated[100:500] == 0)
+
+
+def test_other_dtypes_are_gated_the_same():
+    iq = np.ones(1000, dtype=np.complex128)
+    assert np.array_equal(apply_pulse_envelope(iq, 1e6, 100e-6, 2e3),
+                          apply_pulse_envelope(iq.astype(np.complex64), 1e6, 100e-6, 2e3))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from resampler import RationalResampler, lowpass, resample, shaping_sps
+
+
+def noise(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(n) + 1j * rng.standard_normal(n)).astype(np.complex64)
+
+
+def upfirdn(x, up, down):
+    """Zero-stuff, filter, keep every down-th sample, with the filter delay removed."""
+    h = lowpass(up, down)
+    stuffed = np.zeros(x.size * up, dtype=np.complex128)
+    stuffed[::up] = x
+    return np.convolve(stuffed, h)[(h.size - 1) // 2::down]
+
+
+@pytest.mark.parametrize('up, down', [(27, 14), (7, 6), (3, 2), (2, 3), (49, 54)])
+def test_matches_the_upfirdn_reference(up, down):
+    x = noise(4000)
+    y = RationalResampler(up, down).process(x)
+    ref = upfirdn(x, up, down)
+    assert y.size > 0.9 * x.size * up / down
+    assert np.allclose(y, ref[:y.size], atol=1e-4)
+
+
+@pytest.mark.parametrize('block', [1, 37, 7777])
+def test_block_wise_streaming_equals_one_shot(block):
+    x = noise(6000, seed=1)
+    whole = RationalResampler(27, 14).process(x)
+    r = RationalResampler(27, 14)
+    parts = np.concatenate([r.process(x[i:i + block]) for i in range(0, x.size, block)])
+    assert parts.size == whole.size
+    assert np.allclose(parts, whole, atol=1e-5)
+
+
+def test_one_shot_resample_length():
+    assert resample(noise(1000), 14e6, 27e6).size == round(1000 * 27 / 14)
+
+
+@pytest.mark.parametrize('sample_rate, symrate, expected', [
+    (54e6, 7e6, (7, False)),       # ratio 7.71: shape at 7, interpolate by 1.10
+    (10e6, 3e6, (3, False)),
+    (10e6, 2.5e6, (4, True)),
+    (54e6, 36e6, (2, False)),      # ratio below min_sps has to decimate
+])
+def test_shaping_sps_leaves_an_interpolation(sample_rate, symrate, expected):
+    assert shaping_sps(sample_rate, symrate) == expected
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from spectrum import SpectrumService, enbw_bins, nfft_for_rbw, welch_psd
+
+SR = 1e6
+
+
+def tone(freq, n=16384, amplitude=1.0):
+    return (amplitude * np.exp(2j * np.pi * freq / SR * np.arange(n))).astype(np.complex64)
+
+
+@pytest.mark.parametrize('window', ['hann', 'blackman', 'flattop', 'rect'])
+def test_tone_peaks_in_its_bin_at_full_scale(window):
+    freq = -SR * 100 / 1024     # on a bin centre, below the carrier
+    mean, peak = welch_psd(tone(freq), 1024, window)
+    freqs = np.fft.fftshift(np.fft.fftfreq(1024, 1 / SR))
+    assert freqs[np.argmax(mean)] == pytest.approx(freq)
+    assert 10 * np.log10(mean.max()) == pytest.approx(0.0, abs=0.01)
+    assert np.all(peak >= mean * (1 - 1e-5))
+
+
+def test_rbw_sets_the_fft_size():
+    nfft = nfft_for_rbw(SR, 1e3)
+    assert nfft == 2048 and enbw_bins('hann') * SR / nfft <= 1e3
+    assert enbw_bins('hann') == pytest.approx(1.5, abs=1e-3)
+    assert SpectrumService(SR, rbw=1e3).nfft == nfft
+
+
+def test_service_modes():
+    freq = SR * 50 / 1024
+    quiet, loud = tone(freq, amplitude=0.1), tone(freq)
+    hold = SpectrumService(SR, nfft=1024, mode='maxhold')
+    hold.update(loud)
+    assert hold.update(quiet).max() == pytest.approx(1.0, rel=1e-3)
+    avg = SpectrumService(SR, nfft=1024, mode='average', avg_count=2)
+    avg.update(loud)
+    trace = avg.update(quiet)
+    assert trace.max() == pytest.approx((1.0 + 0.01) / 2, rel=1e-3)
+    freqs, db = avg.trace_db(width=64)
+    assert len(freqs) == len(db) <= 128 and freqs[np.argmax(db)] == pytest.approx(freq, abs=SR / 64)
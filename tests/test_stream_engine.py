@@ -0,0 +1,79 @@
+import numpy as np
+
+from oscillators import NCO
+from stream_engine import CompositeBlockSource, StreamingEngine
+from vsgdevice.vsg_sim import IQTap, SimulatedVSG
+
+
+class ArraySource:
+    """Plays an array once; no read_into, so the engine copies each block."""
+
+    def __init__(self, iq):
+        self.iq = iq
+        self.pos = 0
+
+    def read(self, n):
+        block = self.iq[self.pos:self.pos + n]
+        self.pos += len(block)
+        return block
+
+
+def open_sim(tap):
+    vsg = SimulatedVSG(command_latency=0.0, usb_rate=1e12, tap=tap)
+    return vsg, vsg.vsg_open_device()["handle"]
+
+
+def test_pooled_stream_reaches_the_device_unchanged():
+    tap = IQTap()
+    vsg, handle = open_sim(tap)
+    engine = StreamingEngine(vsg, handle, NCO(1.25e6, 10e6), block_size=4096, total_samples=100_000)
+    engine.start()
+    engine.wait(5.0)
+    assert engine.error is None and engine.samples_submitted == 100_000
+    nco = NCO(1.25e6, 10e6)
+    expected = np.concatenate([nco.read(4096).copy() for _ in range(25)])[:100_000]
+    assert np.array_equal(tap.samples(handle), expected)
+
+
+def test_source_that_runs_out_ends_the_stream():
+    tap = IQTap()
+    vsg, handle = open_sim(tap)
+    iq = (np.random.default_rng(2).standard_normal(10_000) * 0.1).astype(np.complex64)
+    engine = StreamingEngine(vsg, handle, ArraySource(iq), block_size=3000)
+    engine.start()
+    engine.wait(5.0)
+    assert not engine.running and engine.error is None
+    assert engine.blocks_submitted == 4
+    assert np.array_equal(tap.samples(handle), iq)
+
+
+def test_device_error_stops_the_stream():
+    vsg, handle = open_sim(None)
+    engine = StreamingEngine(vsg, handle, NCO(1e6, 10e6), block_size=4096)
+    engine.start()
+    vsg.inject_usb_fault(handle)
+    engine.wait(5.0)
+    assert not engine.running
+    assert "vsg_submit_IQ failed" in engine.error
+
+
+def test_primed_queue_goes_out_as_the_first_submission():
+    vsg, handle = open_sim(None)
+    lengths = []
+    submit = vsg.vsg_submit_IQ
+    vsg.vsg_submit_IQ = lambda device, iq, length: lengths.append(length) or submit(device, iq, length)
+    engine = StreamingEngine(vsg, handle, NCO(1e6, 10e6), block_size=1000, queue_depth=4,
+                             total_samples=20_000)
+    engine.start()
+    engine.wait(5.0)
+    assert engine.error is None and engine.blocks_submitted == 20
+    assert lengths[0] >= 4000 and sum(lengths) == 20_000
+
+
+def test_composite_gains_are_folded_into_the_components():
+    signals = [{"type": "cw", "freq_offset": 1e6, "gain_dbm": 0.0},
+               {"type": "psk", "mod_type": "qpsk", "freq_offset": -2e6, "symrate": 1e6, "gain_dbm": -6.0}]
+    iq = CompositeBlockSource(signals, 10e6, seed=3).read(50_000)
+    assert np.max(np.abs(iq)) <= 1.0
+    cw_only = CompositeBlockSource(signals[:1], 10e6).read(1000)
+    assert np.allclose(np.abs(cw_only), 1.0, atol=1e-5)
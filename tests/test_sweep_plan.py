@@ -0,0 +1,72 @@
+import time
+
+import numpy as np
+import pytest
+
+from sweep_plan import SweepRunner, plan_frequencies
+
+
+def test_linear_and_log_plans():
+    assert np.allclose(plan_frequencies('linear', 1e9, 2e9, 3), [1e9, 1.5e9, 2e9])
+    assert np.allclose(plan_frequencies('log', 1e6, 1e8, 3), [1e6, 1e7, 1e8])
+
+
+def test_bounce_does_not_repeat_end_points():
+    plan = plan_frequencies('linear', 1.0, 4.0, 4, bounce=True)
+    assert plan.tolist() == [1.0, 2.0, 3.0, 4.0, 3.0, 2.0]
+
+
+def test_random_plan_is_a_permutation():
+    plan = plan_frequencies('random', 1.0, 10.0, 10, seed=1)
+    assert sorted(plan.tolist()) == plan_frequencies('linear', 1.0, 10.0, 10).tolist()
+
+
+@pytest.mark.parametrize("freqs", [None, [], [[1e9, 2e9]], ["a"], [1e9, float("nan")], 1e9])
+def test_bad_list_plans_raise_value_error(freqs):
+    with pytest.raises(ValueError):
+        plan_frequencies('list', freqs=freqs)
+
+
+def finish(runner, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while runner.running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not runner.running
+
+
+@pytest.fixture
+def actor():
+    from device_actor import DeviceActor
+    from vsgdevice.vsg_sim import SimulatedVSG
+
+    actor = DeviceActor(SimulatedVSG())   # the default 250 us command latency
+    actor.open().result(5.0)
+    yield actor
+    actor.close().result(5.0)
+
+
+def test_runner_steps_on_the_dwell_grid(actor):
+    plan = plan_frequencies('linear', 1e9, 1.1e9, 10)
+    runner = SweepRunner(plan, 0.01, lambda f: actor.call('vsg_set_frequency', f), cycles=2)
+    runner.start()
+    finish(runner)
+    stats = runner.stats()
+    assert stats["error"] is None and stats["steps"] == 20 and stats["slips"] == 0
+    issued, late, latency = runner.history()
+    # step k is due at k * dwell: command time does not push later steps back
+    assert np.allclose(issued - late, 0.01 * np.arange(20), atol=1e-6)
+    assert latency.min() >= 250e-6
+    assert actor.call('vsg_get_frequency')["frequency"] == plan[-1]
+
+
+def test_runners_started_at_one_time_share_the_grid():
+    plan = plan_frequencies('linear', 1e9, 1.1e9, 5)
+    at = time.monotonic() + 0.01
+    runners = [SweepRunner(plan, 0.02, lambda f: None, cycles=1) for _ in range(2)]
+    for runner in runners:
+        runner.start(at)
+    for runner in runners:
+        finish(runner)
+        issued, late, _ = runner.history()
+        assert runner.started == at and runner.slips == 0
+        assert np.allclose(issued - late, 0.02 * np.arange(5), atol=1e-6)
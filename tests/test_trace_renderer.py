@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+pytest.importorskip('PIL')
+import trace_renderer  # noqa: E402
+from trace_renderer import SHRINK_AFTER, TraceRenderer  # noqa: E402
+
+X = np.arange(100.0)
+
+
+def test_updates_within_the_limits_blit():
+    r = TraceRenderer()
+    r.update(X, np.sin(X))
+    for k in range(5):
+        r.update(X, 0.9 * np.sin(X + k))
+    assert r.full_redraws == 1 and r.blits == 5
+    assert r.png().startswith(b'\x89PNG')
+
+
+def test_limits_grow_for_a_peak_then_decay():
+    r = TraceRenderer()
+    r.update(X, np.sin(X))
+    r.update(X, 100 * np.sin(X))
+    assert r.ax.get_ylim()[1] > 100 and r.full_redraws == 2
+    for _ in range(SHRINK_AFTER - 1):
+        r.update(X, np.sin(X))
+    assert r.ax.get_ylim()[1] > 100
+    r.update(X, np.sin(X))
+    assert r.ax.get_ylim()[1] == pytest.approx(1.0 + 2 * trace_renderer.Y_MARGIN, abs=0.01)
+    assert r.full_redraws == 3
+
+
+def test_a_large_trace_resets_the_decay_count():
+    r = TraceRenderer()
+    r.update(X, 100 * np.sin(X))
+    for k in range(3 * SHRINK_AFTER):
+        r.update(X, (100 if k % 10 == 0 else 1) * np.sin(X))
+    assert r.full_redraws == 1
@@ -0,0 +1,30 @@
+import numpy as np
+
+from oscillators import NCO
+from stream_engine import StreamingEngine
+from vsgdevice.vsg_sim import SimulatedVSG
+from waterfall import Waterfall
+
+
+def test_tone_lands_in_its_column_and_rows_resume():
+    wf = Waterfall(1e6, nfft=256, rows=16, width=128, row_rate=100.0)
+    assert wf.feed(NCO(250e3, 1e6).read(50000)) == 5
+    first, rows = wf.rows_since(None)
+    assert first == 0 and rows.shape == (5, 128)
+    assert abs(wf.freqs[rows[-1].argmax()] - 250e3) < 1e6 / 128
+    assert wf.rows_since(3)[0] == 4 and len(wf.rows_since(3)[1]) == 1
+
+
+def test_engine_monitor_sees_the_streamed_samples():
+    vsg = SimulatedVSG(command_latency=0.0, usb_rate=1e12)
+    handle = vsg.vsg_open_device()["handle"]
+    vsg.vsg_set_sample_rate(handle, 50e6)
+    wf = Waterfall(50e6, nfft=256, rows=64, width=64, row_rate=5000.0)
+    engine = StreamingEngine(vsg, handle, NCO(-5e6, 50e6), block_size=10000, total_samples=100000,
+                             monitor=wf.feed)
+    engine.start()
+    engine.wait(5.0)
+    assert engine.error is None and engine.samples_submitted == 100000
+    first, rows = wf.rows_since(None)
+    assert len(rows) == 10
+    assert abs(wf.freqs[rows[-1].argmax()] + 5e6) < 50e6 / 64
@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+
+import waveform_cache
+from waveform_cache import WaveformCache, waveform_key
+
+N = 1024   # complex samples per waveform, N * 8 bytes cached
+
+
+def wave(seed):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(N) + 1j * rng.standard_normal(N)).astype(np.complex64)
+
+
+def test_key_ignores_dict_order_and_number_spelling():
+    a = waveform_key([{"type": "cw", "freq_offset": 1, "gain_dbm": 0}], 10e6)
+    b = waveform_key([{"gain_dbm": 0.0, "type": "cw", "freq_offset": 1.0}], 10000000)
+    assert a == b
+    assert a != waveform_key([{"type": "cw", "freq_offset": 2, "gain_dbm": 0}], 10e6)
+
+
+def test_put_keeps_a_read_only_copy():
+    cache = WaveformCache()
+    iq = wave(0)
+    stored = cache.put("k", iq)
+    iq[:] = 0
+    assert np.array_equal(stored.view(np.complex64), wave(0))
+    assert not stored.flags.writeable
+    assert cache.get("k") is stored
+
+
+def test_concurrent_misses_generate_once():
+    cache = WaveformCache()
+    calls = []
+    gate = threading.Event()
+
+    def factory():
+        calls.append(1)
+        gate.wait(1.0)
+        return wave(1)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create("k", factory)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    gate.set()
+    for t in threads:
+        t.join(2.0)
+    assert len(calls) == 1 and len(results) == 4
+    assert all(r is results[0] for r in results)
+
+
+def test_evicted_waveforms_spill_to_disk_and_come_back(tmp_path):
+    cache = WaveformCache(max_bytes=2 * N * 8, spill_dir=str(tmp_path), max_spill_bytes=1 << 20)
+    for i in range(3):
+        cache.put(f"k{i}", wave(i))
+    assert cache.stats()["spilled"] == 1
+    assert np.array_equal(cache.get("k0").view(np.complex64), wave(0))
+    assert cache.stats()["spilled"] == 1   # k0 back in memory, k1 pushed out
+    assert cache.get("missing") is None
+
+
+def test_spill_is_written_outside_the_lock(tmp_path, monkeypatch):
+    cache = WaveformCache(max_bytes=N * 8, spill_dir=str(tmp_path), max_spill_bytes=1 << 20)
+    cache.put("k0", wave(0))
+    writing, release = threading.Event(), threading.Event()
+    save = np.save
+
+    def slow_save(path, arr):
+        if "k0" in path:
+            writing.set()
+            release.wait(2.0)
+        save(path, arr)
+
+    monkeypatch.setattr(waveform_cache.np, "save", slow_save)
+    spiller = threading.Thread(target=cache.put, args=("k1", wave(1)))
+    spiller.start()
+    assert writing.wait(2.0)
+    # other callers are not held up by the write, and the waveform being written is still served
+    assert cache.stats()["spilled"] == 0
+    assert np.array_equal(cache.get("k0").view(np.complex64), wave(0))
+    release.set()
+    spiller.join(2.0)
+    # k0 was served again mid-write, so its stale file is dropped; k1 went to disk instead
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["spilled"] == 1
+    assert sorted(p.name.split(".")[0] for p in tmp_path.iterdir()) == ["k1"]
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+os.environ['VSG_BACKEND'] = 'sim'
+web_vsg = pytest.importorskip('web_vsg')
+
+
+@pytest.fixture
+def client():
+    client = web_vsg.app.test_client()
+    yield client
+    client.post('/stop_scenario', json={})
+    client.post('/stop', json={"close": True})
+
+
+def test_cw_scenario_unit_owns_its_output(client):
+    serial = web_vsg.device_manager.enumerate()[0]
+    assert client.post('/start_scenario', json={"units": [{"serial": serial, "mode": "cw"}]}).status_code == 200
+    assert client.get('/scenario_status').json["units"][str(serial)]["running"] is True
+    again = client.post('/start_scenario', json={"units": [{"serial": serial, "mode": "iq"}]})
+    assert again.status_code == 400
+    client.post('/stop_scenario', json={})
+    assert client.get('/scenario_status').json["units"] == {}
+
+
+@pytest.mark.parametrize('mode', ['cw', 'iq'])
+def test_single_output_holds_the_unit_until_stop(client, mode):
+    assert client.post('/start', json={"mode": mode}).status_code == 200
+    serial = web_vsg.device_manager.default_serial()
+    busy = client.post('/start_scenario', json={"units": [{"serial": serial, "mode": "cw"}]})
+    assert busy.status_code == 400
+    client.post('/stop', json={})
+    assert client.post('/start_scenario', json={"units": [{"serial": serial, "mode": "cw"}]}).status_code == 200
+
+
+@pytest.mark.parametrize('mode', ['digital', 'lo'])
+@pytest.mark.parametrize('speed', [0, -1e6])
+def test_sweep_rejects_a_speed_that_is_not_positive(client, mode, speed):
+    resp = client.post('/start', json={"mode": "sweep", "sweep_mode": mode, "sweep_speed": speed})
+    assert resp.status_code == 400
+    assert "sweep_speed" in resp.json["message"]
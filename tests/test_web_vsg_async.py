@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ['VSG_BACKEND'] = 'sim'
+pytest.importorskip('aiohttp')
+web_vsg_async = pytest.importorskip('web_vsg_async')
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+
+from iq_frames import HEADER_SIZE, decode_frame, decode_header, frame_size  # noqa: E402
+
+
+def run_client(test):
+    """Run `test(client, app)` against a fresh app, then clean the app up."""
+    async def main():
+        app = web_vsg_async.make_app()
+        async with TestClient(TestServer(app)) as client:
+            await test(client, app)
+        return app
+    return asyncio.run(main())
+
+
+def test_mirrored_route_answers_like_flask():
+    async def test(client, app):
+        resp = await client.post('/start', json={"mode": "cw", "frequency": 2.0e9})
+        assert resp.status == 200
+        assert await resp.json() == {"status": "ok", "mode": "cw"}
+        resp = await client.post('/start', json={"mode": "nope"})
+        assert resp.status == 400
+        assert (await client.post('/stop', json={"close": True})).status == 200
+
+    app = run_client(test)
+    # on_cleanup ended the device worker
+    with pytest.raises(RuntimeError):
+        app[web_vsg_async.DEVICE_EXECUTOR].submit(print)
+
+
+def test_binary_stream_delivers_published_blocks():
+    async def test(client, app):
+        start = await client.post('/start_iq_stream', json={"length": 256, "interval": 0.01})
+        assert start.status == 200
+        try:
+            resp = await client.get('/iq_stream_bin')
+            assert resp.status == 200
+            seqs = []
+            for _ in range(3):
+                head = await asyncio.wait_for(resp.content.readexactly(HEADER_SIZE), 5.0)
+                rest = await resp.content.readexactly(frame_size(decode_header(head)) - HEADER_SIZE)
+                header, iq = decode_frame(head + rest)
+                assert iq.size == 256
+                seqs.append(header['seq'])
+            assert seqs == list(range(seqs[0], seqs[0] + 3))
+            resp.close()
+        finally:
+            await client.post('/stop_iq_stream')
+
+    run_client(test)
@@ -0,0 +1,97 @@
+"""Persistent matplotlib canvases for continuously updated traces.
+
+Building a pyplot figure, plotting and savefig-ing it on every refresh spends
+almost all of its time constructing and laying out the figure. A
+TraceRenderer builds one Agg figure up front, caches the rendered axes
+background, and per update only restores the background and redraws the line
+artist (blitting) before encoding the canvas buffer. A full redraw happens
+only when the data leaves the current axis limits, or when it has used a
+small part of the y range for a while (so the limits come back down after a
+transient peak).
+"""
+import io
+import threading
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+Y_MARGIN = 0.1  # fraction of the y span added above and below on rescale
+# the y limits shrink back to the data once it has used less than SHRINK_FRACTION of
+# the y span for SHRINK_AFTER updates in a row
+SHRINK_FRACTION = 0.5
+SHRINK_AFTER = 25
+
+
+class TraceRenderer:
+    """One line plot rendered into a persistent Agg canvas."""
+
+    def __init__(self, title='', xlabel='', ylabel='', figsize=(8, 4), dpi=100, label=None):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_title(title)
+        self.ax.set_xlabel(xlabel)
+        self.ax.set_ylabel(ylabel)
+        self.ax.grid(True)
+        (self.line,) = self.ax.plot([], [], label=label, animated=True)
+        if label:
+            self.ax.legend(loc='upper right')
+        self.fig.tight_layout()
+        self._background = None
+        self._small = 0
+        self._lock = threading.Lock()
+        self.full_redraws = 0
+        self.blits = 0
+
+    def _fits(self, x, y):
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        return x0 <= x[0] and x[-1] <= x1 and y0 <= y.min() and y.max() <= y1
+
+    def _shrinks(self, y):
+        """Count an update whose data uses a small part of the y span; True when it is time to shrink."""
+        y0, y1 = self.ax.get_ylim()
+        if float(np.max(y)) - float(np.min(y)) < SHRINK_FRACTION * (y1 - y0):
+            self._small += 1
+        else:
+            self._small = 0
+        return self._small >= SHRINK_AFTER
+
+    def _rescale(self, x, y):
+        lo, hi = float(np.min(y)), float(np.max(y))
+        pad = (hi - lo) * Y_MARGIN or 1.0
+        self.ax.set_xlim(float(x[0]), float(x[-1]) if x[-1] > x[0] else float(x[0]) + 1)
+        self.ax.set_ylim(lo - pad, hi + pad)
+        self.canvas.draw()
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._small = 0
+        self.full_redraws += 1
+
+    def update(self, x, y):
+        """Redraw the trace with new data."""
+        x = np.asarray(x)
+        y = np.asarray(y)
+        with self._lock:
+            self.line.set_data(x, y)
+            if x.size == 0:
+                return
+            if self._background is None or not self._fits(x, y) or self._shrinks(y):
+                self._rescale(x, y)
+            else:
+                self.canvas.restore_region(self._background)
+                self.blits += 1
+            self.ax.draw_artist(self.line)
+
+    def png(self):
+        """Current canvas as PNG bytes."""
+        with self._lock:
+            if self._background is None:
+                self.canvas.draw()
+            buf = self.canvas.buffer_rgba()
+            out = io.BytesIO()
+            image = Image.frombuffer('RGBA', (buf.shape[1], buf.shape[0]), buf, 'raw', 'RGBA', 0, 1)
+            # fast zlib level: these images are regenerated constantly
+            image.save(out, 'png', compress_level=1)
+        return out.getvalue()
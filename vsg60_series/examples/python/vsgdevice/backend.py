@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+"""Selects the object the applications make device calls on.
+
+A backend is anything with the vsg_api function names and signatures:
+'dll' is the vsg_api module itself (the real library), 'fast' a
+vsg_fast.FastVSG on the same library (declared prototypes, errors raised as
+VsgError rather than exiting) and 'sim' a vsg_sim.SimulatedVSG. The choice
+comes from the argument or the VSG_BACKEND environment variable, defaulting
+to 'dll' until vsg_fast_bench.py shows 'fast' to be worth switching to.
+
+Errors differ by backend: 'dll' prints and exits the process on a negative
+status, 'fast' raises VsgError and 'sim' returns the negative status in the
+result dict. 'fast' saves well under a microsecond a call over 'dll', which
+is small beside a DeviceActor round trip (tens of microseconds); code that
+owns a handle on one thread gets the full saving from vsg_fast.VsgDevice.
+"""
+import os
+
+BACKENDS = ('dll', 'fast', 'sim')
+
+
+def load_backend(name=None, **options):
+    """The device backend; `options` are passed to the simulator.
+
+    Raises OSError for 'dll' and 'fast' when the library cannot be loaded.
+    """
+    name = name or os.environ.get('VSG_BACKEND', 'dll')
+    if name == 'sim':
+        from .vsg_sim import SimulatedVSG
+        return SimulatedVSG(**options)
+    if name == 'fast':
+        from .vsg_fast import FastVSG
+        return FastVSG()
+    if name == 'dll':
+        from . import vsg_api
+        if vsg_api.load_error is not None:
+            raise OSError(f"VSG API library not loaded: {vsg_api.load_error}")
+        return vsg_api
+    raise ValueError(f"unknown VSG backend '{name}', expected one of {', '.join(BACKENDS)}")
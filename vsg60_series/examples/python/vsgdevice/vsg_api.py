@@ -10,10 +10,14 @@ import os
 
 # Try to locate the vsg_api DLL in common library locations relative to the project
 def _find_vsg_dll():
+    # 0) explicit override
+    if os.environ.get('VSG_API_LIB'):
+        return os.environ['VSG_API_LIB']
     # 1) next to this Python module in the vsgdevice folder
     base = os.path.dirname(__file__)
     candidates = [
         os.path.join(base, 'vsg_api.dll'),
+        os.path.join(base, 'vsg_api.so'),
         # 2) project level vsg60_series lib win folders (vs2019 x64 prioritized)
         os.path.abspath(os.path.join(base, '..', '..', '..', 'lib', 'win', 'vs2019', 'x64', 'vsg_api.dll')),
         os.path.abspath(os.path.join(base, '..', '..', '..', 'lib', 'win', 'vs2019', 'x86', 'vsg_api.dll')),
@@ -25,15 +29,47 @@ def _find_vsg_dll():
             return c
     return None
 
+
+class _MissingFunction:
+    """Stands in for a library function when the library could not be loaded."""
+
+    def __init__(self, name, error):
+        self.__name__ = name
+        self.error = error
+
+    def __call__(self, *args):
+        raise OSError(f"{self.__name__}: VSG API library not loaded ({self.error})")
+
+
+class _MissingLibrary:
+    """Lets this module import without the library (e.g. on hosts without the
+    device, to use the simulated backend); calls raise OSError instead."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def __getattr__(self, name):
+        return _MissingFunction(name, self.error)
+
+
+def _library_candidates(path):
+    # fallback to default name
+    return ((path,) if path else ()) + ("vsgdevice/vsg_api.dll",)
+
+
+def _load_vsg_lib(path):
+    error = None
+    for candidate in _library_candidates(path):
+        try:
+            return CDLL(candidate)
+        except OSError as exc:
+            error = error or exc
+    return _MissingLibrary(error)
+
+
 _dll_path = _find_vsg_dll()
-if _dll_path:
-    try:
-        vsglib = CDLL(_dll_path)
-    except Exception:
-        # fallback to default name
-        vsglib = CDLL("vsgdevice/vsg_api.dll")
-else:
-    vsglib = CDLL("vsgdevice/vsg_api.dll")
+vsglib = _load_vsg_lib(_dll_path)
+load_error = vsglib.error if isinstance(vsglib, _MissingLibrary) else None
 
 
 # ---------------------------------- Defines -----------------------------------
@@ -61,6 +97,7 @@ VSG_MAX_TRIGGER_LENGTH = 1.0 # 100ms
 vsgGetAPIVersion = vsglib.vsgGetAPIVersion
 vsgGetAPIVersion.restype = c_char_p
 
+vsgGetDeviceList = vsglib.vsgGetDeviceList
 vsgOpenDevice = vsglib.vsgOpenDevice
 vsgOpenDeviceBySerial = vsglib.vsgOpenDeviceBySerial
 vsgCloseDevice = vsglib.vsgCloseDevice
@@ -148,12 +185,29 @@ def error_check(func):
     return print_status_if_error
 
 
+def _float_iq(iq):
+    # complex64 samples have the interleaved float32 layout: pass a view, no copy
+    if iq.dtype == numpy.complex64:
+        return iq.view(numpy.float32)
+    return iq
+
+
 # --------------------------------- Functions ---------------------------------
 def vsg_get_API_version():
     return {
         "api_version": vsgGetAPIVersion()
     }
 
+@error_check
+def vsg_get_device_list():
+    serials = (c_int * VSG_MAX_DEVICES)()
+    count = c_int(VSG_MAX_DEVICES)
+    status = vsgGetDeviceList(serials, byref(count))
+    return {
+        "status": status,
+        "serials": list(serials[:count.value])
+    }
+
 @error_check
 def vsg_open_device():
     device = c_int(-1)
@@ -387,7 +441,7 @@ def vsg_get_trigger_length(device):
 @error_check
 def vsg_submit_IQ(device, iq, length):
     return {
-        "status": vsgSubmitIQ(device, iq, length)
+        "status": vsgSubmitIQ(device, _float_iq(iq), length)
     }
 
 @error_check
@@ -411,13 +465,13 @@ def vsg_flush_and_wait(device):
 @error_check
 def vsg_output_waveform(device, iq, length):
     return {
-        "status": vsgOutputWaveform(device, iq, length)
+        "status": vsgOutputWaveform(device, _float_iq(iq), length)
     }
 
 @error_check
 def vsg_repeat_waveform(device, iq, length):
     return {
-        "status": vsgRepeatWaveform(device, iq, length)
+        "status": vsgRepeatWaveform(device, _float_iq(iq), length)
     }
 
 @error_check
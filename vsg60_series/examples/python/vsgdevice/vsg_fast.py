@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+
+"""Low-overhead ctypes binding of the VSG API.
+
+vsg_api.py leaves most prototypes undeclared (ctypes converts each argument
+by inspecting it), allocates new c_int/c_double out-parameters and a result
+dict on every call, and its error_check decorator exit()s the process on an
+error. Here every function gets argtypes and restype from vsg_api.h, on a
+library instance of its own so vsg_api is unaffected, and errors raise
+VsgError.
+
+VsgDevice is the fast path: one object per open handle with the library
+functions and byref() out-parameters resolved once, so a setter is a single
+foreign call plus a status test, getters return plain values, and
+settings()/info() read several values in one Python call. FastVSG keeps the
+vsg_api function names and result dicts (for code written against
+vsg_api, e.g. backend.load_backend('fast')) on the same prototypes.
+"""
+from ctypes import CDLL, POINTER, byref, c_char_p, c_double, c_float, c_int, c_int16, c_uint32, c_void_p
+
+import numpy
+
+from . import vsg_api
+
+VSG_MAX_DEVICES = vsg_api.VSG_MAX_DEVICES
+
+_pint = POINTER(c_int)
+_pdouble = POINTER(c_double)
+PROTOTYPES = {
+    # name: (restype, argtypes); enums and VsgBool are ints, float* arrays are passed as addresses
+    'vsgGetAPIVersion': (c_char_p, []),
+    'vsgGetDeviceList': (c_int, [_pint, _pint]),
+    'vsgOpenDevice': (c_int, [_pint]),
+    'vsgOpenDeviceBySerial': (c_int, [_pint, c_int]),
+    'vsgCloseDevice': (c_int, [c_int]),
+    'vsgPreset': (c_int, [c_int]),
+    'vsgRecal': (c_int, [c_int]),
+    'vsgAbort': (c_int, [c_int]),
+    'vsgGetSerialNumber': (c_int, [c_int, _pint]),
+    'vsgGetFirmwareVersion': (c_int, [c_int, _pint]),
+    'vsgGetCalDate': (c_int, [c_int, POINTER(c_uint32)]),
+    'vsgReadTemperature': (c_int, [c_int, POINTER(c_float)]),
+    'vsgSetRFOutputState': (c_int, [c_int, c_int]),
+    'vsgGetRFOutputState': (c_int, [c_int, _pint]),
+    'vsgSetTimebase': (c_int, [c_int, c_int]),
+    'vsgGetTimebase': (c_int, [c_int, _pint]),
+    'vsgSetTimebaseOffset': (c_int, [c_int, c_double]),
+    'vsgGetTimebaseOffset': (c_int, [c_int, _pdouble]),
+    'vsgSetFrequency': (c_int, [c_int, c_double]),
+    'vsgGetFrequency': (c_int, [c_int, _pdouble]),
+    'vsgSetSampleRate': (c_int, [c_int, c_double]),
+    'vsgGetSampleRate': (c_int, [c_int, _pdouble]),
+    'vsgSetLevel': (c_int, [c_int, c_double]),
+    'vsgGetLevel': (c_int, [c_int, _pdouble]),
+    'vsgSetAtten': (c_int, [c_int, c_int]),
+    'vsgGetIQScale': (c_int, [c_int, _pdouble]),
+    'vsgSetIQOffset': (c_int, [c_int, c_int16, c_int16]),
+    'vsgGetIQOffset': (c_int, [c_int, POINTER(c_int16), POINTER(c_int16)]),
+    'vsgSetDigitalTuning': (c_int, [c_int, c_int]),
+    'vsgGetDigitalTuning': (c_int, [c_int, _pint]),
+    'vsgSetTriggerLength': (c_int, [c_int, c_double]),
+    'vsgGetTriggerLength': (c_int, [c_int, _pdouble]),
+    'vsgSubmitIQ': (c_int, [c_int, c_void_p, c_int]),
+    'vsgSubmitTrigger': (c_int, [c_int]),
+    'vsgFlush': (c_int, [c_int]),
+    'vsgFlushAndWait': (c_int, [c_int]),
+    'vsgOutputWaveform': (c_int, [c_int, c_void_p, c_int]),
+    'vsgRepeatWaveform': (c_int, [c_int, c_void_p, c_int]),
+    'vsgOutputCW': (c_int, [c_int]),
+    'vsgIsWaveformActive': (c_int, [c_int, _pint]),
+    'vsgGetUSBStatus': (c_int, [c_int]),
+    'vsgGetErrorString': (c_char_p, [c_int]),
+}
+
+
+class VsgError(RuntimeError):
+    """A VSG API call returned a negative status."""
+
+    def __init__(self, status, function, message=''):
+        super().__init__(f"{function} failed with status {status}: {message}")
+        self.status = status
+        self.function = function
+
+
+def load_library(path=None):
+    """A library instance with every prototype declared.
+
+    By default the library is looked up as vsg_api does it: VSG_API_LIB, the
+    library folders, then the plain vsgdevice/vsg_api.dll name.
+    """
+    lib, error = None, None
+    for candidate in vsg_api._library_candidates(path or vsg_api._dll_path):
+        try:
+            lib = CDLL(candidate)
+            break
+        except OSError as exc:
+            error = error or exc
+    if lib is None:
+        raise OSError(f"VSG API library not loaded ({error})")
+    for name, (restype, argtypes) in PROTOTYPES.items():
+        fn = getattr(lib, name)
+        fn.restype = restype
+        fn.argtypes = argtypes
+    return lib
+
+
+_library = None
+
+
+def default_library():
+    """The shared library instance, loaded on first use."""
+    global _library
+    if _library is None:
+        _library = load_library()
+    return _library
+
+
+def error_string(status, lib=None):
+    text = (lib or default_library()).vsgGetErrorString(status)
+    return text.decode(errors='replace') if text else ''
+
+
+def _raise(lib, status, function):
+    raise VsgError(status, function, error_string(status, lib))
+
+
+def _iq_address(iq, length):
+    """Address of a complex64 (or float32 interleaved) array holding at least `length` samples."""
+    if iq.dtype == numpy.complex64:
+        samples = iq.size
+    elif iq.dtype == numpy.float32:
+        samples = iq.size // 2
+    else:
+        raise ValueError("iq must be complex64 or float32 interleaved")
+    if not iq.flags.c_contiguous:
+        raise ValueError("iq must be C-contiguous")
+    if length is None:
+        length = samples
+    elif length > samples:
+        raise ValueError(f"iq holds {samples} samples, {length} requested")
+    return iq.ctypes.data, length
+
+
+def get_device_list(lib=None):
+    """Serial numbers of the connected devices."""
+    lib = lib or default_library()
+    serials = (c_int * VSG_MAX_DEVICES)()
+    count = c_int(VSG_MAX_DEVICES)
+    status = lib.vsgGetDeviceList(serials, byref(count))
+    if status < 0:
+        _raise(lib, status, 'vsgGetDeviceList')
+    return list(serials[:count.value])
+
+
+class VsgDevice:
+    """An open device. Negative statuses raise VsgError; the last positive
+    status (a warning such as a clamped setting) is kept in `warning`."""
+
+    def __init__(self, handle, lib=None):
+        self.lib = lib = lib or default_library()
+        self.handle = handle
+        self.warning = 0
+        self._int = c_int()
+        self._double = c_double()
+        self._float = c_float()
+        self._uint = c_uint32()
+        self._i16 = c_int16()
+        self._q16 = c_int16()
+        self._p_int = byref(self._int)
+        self._p_double = byref(self._double)
+        self._p_float = byref(self._float)
+        self._p_uint = byref(self._uint)
+        # resolved once: a call is then one attribute load and the foreign call
+        self._set_frequency = lib.vsgSetFrequency
+        self._get_frequency = lib.vsgGetFrequency
+        self._set_level = lib.vsgSetLevel
+        self._get_level = lib.vsgGetLevel
+        self._set_sample_rate = lib.vsgSetSampleRate
+        self._get_sample_rate = lib.vsgGetSampleRate
+        self._set_rf = lib.vsgSetRFOutputState
+        self._get_rf = lib.vsgGetRFOutputState
+        self._submit = lib.vsgSubmitIQ
+        self._submit_trigger = lib.vsgSubmitTrigger
+
+    @classmethod
+    def open(cls, serial=None, lib=None):
+        """Open the first device, or the one with `serial`."""
+        lib = lib or default_library()
+        handle = c_int(-1)
+        if serial is None:
+            status = lib.vsgOpenDevice(byref(handle))
+        else:
+            status = lib.vsgOpenDeviceBySerial(byref(handle), int(serial))
+        if status < 0:
+            _raise(lib, status, 'vsgOpenDevice')
+        return cls(handle.value, lib)
+
+    def _status(self, status, function):
+        if status < 0:
+            _raise(self.lib, status, function)
+        self.warning = status
+
+    def _call(self, function, *args):
+        status = getattr(self.lib, function)(self.handle, *args)
+        if status:
+            self._status(status, function)
+
+    # ---- hot path ----
+
+    def set_frequency(self, frequency):
+        status = self._set_frequency(self.handle, frequency)
+        if status:
+            self._status(status, 'vsgSetFrequency')
+
+    def get_frequency(self):
+        status = self._get_frequency(self.handle, self._p_double)
+        if status:
+            self._status(status, 'vsgGetFrequency')
+        return self._double.value
+
+    def set_level(self, level):
+        status = self._set_level(self.handle, level)
+        if status:
+            self._status(status, 'vsgSetLevel')
+
+    def get_level(self):
+        status = self._get_level(self.handle, self._p_double)
+        if status:
+            self._status(status, 'vsgGetLevel')
+        return self._double.value
+
+    def set_sample_rate(self, sample_rate):
+        status = self._set_sample_rate(self.handle, sample_rate)
+        if status:
+            self._status(status, 'vsgSetSampleRate')
+
+    def get_sample_rate(self):
+        status = self._get_sample_rate(self.handle, self._p_double)
+        if status:
+            self._status(status, 'vsgGetSampleRate')
+        return self._double.value
+
+    def set_rf_output(self, enabled):
+        status = self._set_rf(self.handle, 1 if enabled else 0)
+        if status:
+            self._status(status, 'vsgSetRFOutputState')
+
+    def get_rf_output(self):
+        status = self._get_rf(self.handle, self._p_int)
+        if status:
+            self._status(status, 'vsgGetRFOutputState')
+        return bool(self._int.value)
+
+    def submit_iq(self, iq, length=None):
+        """Queue complex64 or float32 interleaved samples (all of `iq` unless `length` is given)."""
+        address, length = _iq_address(iq, length)
+        status = self._submit(self.handle, address, length)
+        if status:
+            self._status(status, 'vsgSubmitIQ')
+
+    def submit_trigger(self):
+        status = self._submit_trigger(self.handle)
+        if status:
+            self._status(status, 'vsgSubmitTrigger')
+
+    # ---- bulk reads ----
+
+    def settings(self):
+        """frequency, level, sample_rate and rf_output in one call."""
+        return {"frequency": self.get_frequency(), "level": self.get_level(),
+                "sample_rate": self.get_sample_rate(), "rf_output": self.get_rf_output()}
+
+    def info(self):
+        """serial, firmware, cal_date, temperature and usb_status in one call."""
+        lib = self.lib
+        self._status(lib.vsgGetSerialNumber(self.handle, self._p_int), 'vsgGetSerialNumber')
+        serial = self._int.value
+        self._status(lib.vsgGetFirmwareVersion(self.handle, self._p_int), 'vsgGetFirmwareVersion')
+        firmware = self._int.value
+        self._status(lib.vsgGetCalDate(self.handle, self._p_uint), 'vsgGetCalDate')
+        self._status(lib.vsgReadTemperature(self.handle, self._p_float), 'vsgReadTemperature')
+        usb = lib.vsgGetUSBStatus(self.handle)
+        return {"serial": serial, "firmware": firmware, "cal_date": self._uint.value,
+                "temperature": self._float.value, "usb_status": usb}
+
+    # ---- everything else ----
+
+    def close(self):
+        self._call('vsgCloseDevice')
+
+    def preset(self):
+        self._call('vsgPreset')
+
+    def recal(self):
+        self._call('vsgRecal')
+
+    def abort(self):
+        self._call('vsgAbort')
+
+    def flush(self):
+        self._call('vsgFlush')
+
+    def flush_and_wait(self):
+        self._call('vsgFlushAndWait')
+
+    def output_cw(self):
+        self._call('vsgOutputCW')
+
+    def output_waveform(self, iq, length=None):
+        self._call('vsgOutputWaveform', *_iq_address(iq, length))
+
+    def repeat_waveform(self, iq, length=None):
+        self._call('vsgRepeatWaveform', *_iq_address(iq, length))
+
+    def is_waveform_active(self):
+        self._call('vsgIsWaveformActive', self._p_int)
+        return bool(self._int.value)
+
+    def set_trigger_length(self, seconds):
+        self._call('vsgSetTriggerLength', seconds)
+
+    def set_iq_offset(self, i_offset, q_offset):
+        self._call('vsgSetIQOffset', i_offset, q_offset)
+
+    def get_iq_offset(self):
+        self._call('vsgGetIQOffset', byref(self._i16), byref(self._q16))
+        return self._i16.value, self._q16.value
+
+
+# vsg_api names -> (library function, result key, out-parameter type) for FastVSG
+_ACTIONS = {
+    'vsg_close_device': 'vsgCloseDevice', 'vsg_preset': 'vsgPreset', 'vsg_recal': 'vsgRecal',
+    'vsg_abort': 'vsgAbort', 'vsg_set_RF_output_state': 'vsgSetRFOutputState',
+    'vsg_set_timebase': 'vsgSetTimebase', 'vsg_set_timebase_offset': 'vsgSetTimebaseOffset',
+    'vsg_set_frequency': 'vsgSetFrequency', 'vsg_set_sample_rate': 'vsgSetSampleRate',
+    'vsg_set_level': 'vsgSetLevel', 'vsg_set_atten': 'vsgSetAtten', 'vsg_set_IQ_offset': 'vsgSetIQOffset',
+    'vsg_set_digital_tuning': 'vsgSetDigitalTuning', 'vsg_set_trigger_length': 'vsgSetTriggerLength',
+    'vsg_submit_trigger': 'vsgSubmitTrigger', 'vsg_flush': 'vsgFlush', 'vsg_flush_and_wait': 'vsgFlushAndWait',
+    'vsg_output_CW': 'vsgOutputCW', 'vsg_get_USB_status': 'vsgGetUSBStatus',
+}
+_GETTERS = {
+    'vsg_get_serial_number': ('vsgGetSerialNumber', 'serial', c_int),
+    'vsg_get_firmware_version': ('vsgGetFirmwareVersion', 'version', c_int),
+    'vsg_get_cal_date': ('vsgGetCalDate', 'last_cal_date', c_uint32),
+    'vsg_read_temperature': ('vsgReadTemperature', 'temp', c_float),
+    'vsg_get_RF_output_state': ('vsgGetRFOutputState', 'enabled', c_int),
+    'vsg_get_timebase': ('vsgGetTimebase', 'state', c_int),
+    'vsg_get_timebase_offset': ('vsgGetTimebaseOffset', 'ppm', c_double),
+    'vsg_get_frequency': ('vsgGetFrequency', 'frequency', c_double),
+    'vsg_get_sample_rate': ('vsgGetSampleRate', 'sample_rate', c_double),
+    'vsg_get_level': ('vsgGetLevel', 'level', c_double),
+    'vsg_get_IQ_scale': ('vsgGetIQScale', 'iq_scale', c_double),
+    'vsg_get_digital_tuning': ('vsgGetDigitalTuning', 'enabled', c_int),
+    'vsg_get_trigger_length': ('vsgGetTriggerLength', 'seconds', c_double),
+    'vsg_is_waveform_active': ('vsgIsWaveformActive', 'active', c_int),
+}
+_ARRAYS = {'vsg_submit_IQ': 'vsgSubmitIQ', 'vsg_output_waveform': 'vsgOutputWaveform',
+           'vsg_repeat_waveform': 'vsgRepeatWaveform'}
+
+
+def _action(function):
+    def call(self, device, *args):
+        status = self._fn[function](device, *args)
+        if status < 0:
+            _raise(self.lib, status, function)
+        return {"status": status}
+    return call
+
+
+def _getter(function, key, ctype):
+    def call(self, device):
+        value = ctype()
+        status = self._fn[function](device, byref(value))
+        if status < 0:
+            _raise(self.lib, status, function)
+        return {"status": status, key: value.value}
+    return call
+
+
+def _array(function):
+    def call(self, device, iq, length):
+        status = self._fn[function](device, *_iq_address(iq, int(length)))
+        if status < 0:
+            _raise(self.lib, status, function)
+        return {"status": status}
+    return call
+
+
+class FastVSG:
+    """vsg_api-compatible calls (same names and result dicts) on declared
+    prototypes; negative statuses raise VsgError instead of exiting."""
+
+    def __init__(self, lib=None):
+        self.lib = lib or default_library()
+        self._fn = {name: getattr(self.lib, name) for name in PROTOTYPES}
+
+    def vsg_get_API_version(self):
+        return {"api_version": self.lib.vsgGetAPIVersion()}
+
+    def vsg_get_device_list(self):
+        return {"status": 0, "serials": get_device_list(self.lib)}
+
+    def vsg_open_device(self):
+        return {"status": 0, "handle": VsgDevice.open(lib=self.lib).handle}
+
+    def vsg_open_device_by_serial(self, serial_number):
+        return {"status": 0, "handle": VsgDevice.open(serial_number, lib=self.lib).handle}
+
+    def vsg_get_IQ_offset(self, device):
+        i_offset, q_offset = c_int16(), c_int16()
+        status = self._fn['vsgGetIQOffset'](device, byref(i_offset), byref(q_offset))
+        if status < 0:
+            _raise(self.lib, status, 'vsgGetIQOffset')
+        return {"status": status, "i_offset": i_offset.value, "q_offset": q_offset.value}
+
+    def vsg_get_error_string(self, status):
+        return {"error_string": self.lib.vsgGetErrorString(status)}
+
+
+for _name, _function in _ACTIONS.items():
+    setattr(FastVSG, _name, _action(_function))
+for _name, _spec in _GETTERS.items():
+    setattr(FastVSG, _name, _getter(*_spec))
+for _name, _function in _ARRAYS.items():
+    setattr(FastVSG, _name, _array(_function))
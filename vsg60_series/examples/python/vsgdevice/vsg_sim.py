@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+
+"""Pure-Python simulated VSG60 with the vsg_api function surface.
+
+SimulatedVSG has a method for each vsg_api function, with the same
+arguments and the same returned dicts, so an instance can be used wherever
+the vsg_api module is (see backend.load_backend). Differences from the
+wrapper: negative statuses are returned rather than ending the process, and
+no hardware or library is needed.
+
+Streaming is modelled in real time. Submitted samples cross a USB link of
+`usb_rate` bytes/s (USB_BYTES_PER_SAMPLE per sample on the wire) into a
+device buffer of `buffer_samples`, which the DAC drains at the current
+sample rate. vsg_submit_IQ blocks while the buffer is full, and a buffer
+that runs dry before it is flushed counts as an underrun, with the length of
+the gap. Control calls take `command_latency` seconds. A `tap` callable, if
+given, receives (handle, complex64 samples) for everything that would be
+transmitted, e.g. an IQTap to check the output; the samples are a view of the
+caller's array, so a tap must copy whatever it keeps. Sample arrays may be float32
+interleaved (as vsg_api takes them) or complex64.
+"""
+import threading
+import time
+
+import numpy
+
+# Status codes (VsgStatus in vsg_api.h)
+vsgFileIOErr = -1000
+vsgMemErr = -999
+vsgInvalidOperationErr = -11
+vsgWaveformAlreadyActiveErr = -10
+vsgWaveformNotActiveErr = -9
+vsgUsbXferErr = -5
+vsgInvalidParameterErr = -4
+vsgNullPtrErr = -3
+vsgInvalidDeviceErr = -2
+vsgDeviceNotFoundErr = -1
+vsgNoError = 0
+vsgAlreadyFlushed = 1
+vsgSettingClamped = 2
+vsgInvalidCalData = 3
+
+ERROR_STRINGS = {
+    vsgFileIOErr: "File IO error",
+    vsgMemErr: "Memory allocation error",
+    vsgInvalidOperationErr: "Invalid operation",
+    vsgWaveformAlreadyActiveErr: "Waveform already active",
+    vsgWaveformNotActiveErr: "Waveform not active",
+    vsgUsbXferErr: "USB transfer error",
+    vsgInvalidParameterErr: "Invalid parameter",
+    vsgNullPtrErr: "Null pointer",
+    vsgInvalidDeviceErr: "Invalid device",
+    vsgDeviceNotFoundErr: "Device not found",
+    vsgNoError: "No error",
+    vsgAlreadyFlushed: "Already flushed",
+    vsgSettingClamped: "Setting clamped",
+    vsgInvalidCalData: "Invalid calibration data",
+}
+
+VSG_MAX_DEVICES = 8
+VSG60_MIN_FREQ = 30.0e6
+VSG60_MAX_FREQ = 6.0e9
+VSG_MIN_SAMPLE_RATE = 12.5e3
+VSG_MAX_SAMPLE_RATE = 54.0e6
+VSG_MIN_LEVEL = -120.0
+VSG_MAX_LEVEL = 10.0
+VSG_MIN_TRIGGER_LENGTH = 0.1e-6
+VSG_MAX_TRIGGER_LENGTH = 0.1
+
+SIM_SERIALS = (20000001,)
+USB_RATE = 320.0e6            # bytes/s across the link
+USB_BYTES_PER_SAMPLE = 4      # 16-bit I and Q on the wire
+BUFFER_SAMPLES = 1 << 20      # device-side sample buffer
+COMMAND_LATENCY = 250e-6      # seconds per control call
+SIM_FIRMWARE = 6
+SIM_CAL_DATE = 1672531200     # 2023-01-01, seconds since the epoch
+MAX_TRIGGERS = 1024
+
+
+def _clamp(value, lo, hi):
+    clamped = min(max(value, lo), hi)
+    return clamped, vsgNoError if clamped == value else vsgSettingClamped
+
+
+def _complex_iq(iq):
+    """complex64 view of float32 interleaved samples (complex64 passes through)."""
+    iq = numpy.asarray(iq)
+    if iq.dtype == numpy.complex64:
+        return iq
+    return numpy.ascontiguousarray(iq, dtype=numpy.float32).view(numpy.complex64)
+
+
+class IQTap:
+    """Collects up to max_samples of transmitted IQ per handle, for verification."""
+
+    def __init__(self, max_samples=1 << 22):
+        self.max_samples = int(max_samples)
+        self._buffers = {}
+        self._counts = {}
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, handle, iq):
+        with self._lock:
+            buf = self._buffers.get(handle)
+            if buf is None:
+                # zeroed up front so the first pages are not faulted in mid-stream
+                buf = self._buffers[handle] = numpy.empty(self.max_samples, dtype=numpy.complex64)
+                buf.fill(0)
+                self._counts[handle] = 0
+            count = self._counts[handle]
+            take = min(len(iq), self.max_samples - count)
+            if take:
+                buf[count:count + take] = iq[:take]
+            self._counts[handle] = count + take
+            self.dropped += len(iq) - take
+
+    def samples(self, handle):
+        """The samples captured so far for `handle` (a copy)."""
+        with self._lock:
+            buf = self._buffers.get(handle)
+            if buf is None:
+                return numpy.zeros(0, dtype=numpy.complex64)
+            return buf[:self._counts[handle]].copy()
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+            self._counts.clear()
+            self.dropped = 0
+
+
+class _SimDevice:
+    def __init__(self, serial):
+        self.serial = serial
+        self.lock = threading.Lock()
+        self.reset()
+        # stream statistics survive presets
+        self.samples_submitted = 0
+        self.blocks_submitted = 0
+        self.underruns = 0
+        self.underrun_samples = 0
+        self.max_fill = 0
+        self.usb_time = 0.0
+        self.blocked_time = 0.0
+        self.triggers = []
+        self.usb_fault = False    # set by SimulatedVSG.inject_usb_fault
+
+    def reset(self):
+        self.frequency = 1.0e9
+        self.level = -20.0
+        self.sample_rate = 50.0e6
+        self.rf_output = 0
+        self.timebase = 0
+        self.timebase_offset = 0.0
+        self.atten = 0
+        self.iq_offset = (0, 0)
+        self.digital_tuning = 0
+        self.trigger_length = 1.0e-6
+        self.mode = 'idle'        # idle, cw, waveform, stream
+        self.waveform = None
+        self.fill = 0.0           # samples buffered at time `mark`
+        self.mark = time.monotonic()
+        self.empty_since = None   # when the buffer ran dry, None while it has data
+        self.flushed = True       # a dry buffer after a flush is not an underrun
+        self.usb_free_at = 0.0
+
+    def drain(self, now):
+        """Advance the DAC to `now`."""
+        if self.mode == 'stream' and self.fill > 0:
+            played = (now - self.mark) * self.sample_rate
+            if played >= self.fill:
+                self.empty_since = self.mark + self.fill / self.sample_rate
+                self.fill = 0.0
+            else:
+                self.fill -= played
+        self.mark = now
+
+
+class SimulatedVSG:
+    """Simulated devices behind the vsg_api calls; handles index into the device list."""
+
+    def __init__(self, serials=SIM_SERIALS, usb_rate=USB_RATE, buffer_samples=BUFFER_SAMPLES,
+                 command_latency=COMMAND_LATENCY, tap=None):
+        self.serials = tuple(serials)
+        self.usb_rate = float(usb_rate)
+        self.buffer_samples = int(buffer_samples)
+        self.command_latency = float(command_latency)
+        self.tap = tap
+        self._devices = {}        # handle -> _SimDevice
+        self._lock = threading.Lock()
+
+    # ---- helpers ----
+
+    def _device(self, handle):
+        return self._devices.get(handle)
+
+    def _command(self, handle, apply):
+        """Run apply(dev) -> status or dict under the device lock, after the command latency."""
+        dev = self._device(handle)
+        if dev is None:
+            return {"status": vsgInvalidDeviceErr}
+        if dev.usb_fault:
+            return {"status": vsgUsbXferErr}
+        if self.command_latency:
+            time.sleep(self.command_latency)
+        with dev.lock:
+            result = apply(dev)
+        return result if isinstance(result, dict) else {"status": result}
+
+    def _stop_stream(self, dev):
+        dev.mode = 'idle'
+        dev.fill = 0.0
+        dev.empty_since = None
+        dev.flushed = True
+        dev.waveform = None
+
+    def _tap(self, handle, iq, length):
+        if self.tap is not None:
+            self.tap(handle, _complex_iq(iq)[:length])
+
+    def inject_usb_fault(self, handle):
+        """Make every further call on `handle` fail with a USB transfer error, as if
+        the unit was unplugged; reopening the serial gives a working device (simulator only)."""
+        dev = self._device(handle)
+        if dev is not None:
+            dev.usb_fault = True
+
+    def stats(self, handle):
+        """Streaming counters for a device (simulator only)."""
+        dev = self._device(handle)
+        if dev is None:
+            return {"status": vsgInvalidDeviceErr}
+        with dev.lock:
+            dev.drain(time.monotonic())
+            return {"status": vsgNoError, "mode": dev.mode, "buffered": int(dev.fill),
+                    "buffer_samples": self.buffer_samples, "samples_submitted": dev.samples_submitted,
+                    "blocks_submitted": dev.blocks_submitted, "underruns": dev.underruns,
+                    "underrun_samples": dev.underrun_samples, "max_fill": dev.max_fill,
+                    "usb_time": dev.usb_time, "blocked_time": dev.blocked_time,
+                    "triggers": list(dev.triggers)}
+
+    # ---- vsg_api surface ----
+
+    def vsg_get_API_version(self):
+        return {"api_version": b"simulated"}
+
+    def vsg_get_device_list(self):
+        return {"status": vsgNoError, "serials": list(self.serials)}
+
+    def vsg_open_device(self):
+        with self._lock:
+            opened = {dev.serial for dev in self._devices.values()}
+            free = [s for s in self.serials if s not in opened]
+        if not free:
+            return {"status": vsgDeviceNotFoundErr, "handle": -1}
+        return self.vsg_open_device_by_serial(free[0])
+
+    def vsg_open_device_by_serial(self, serial_number):
+        with self._lock:
+            if serial_number not in self.serials or any(
+                    dev.serial == serial_number for dev in self._devices.values()):
+                return {"status": vsgDeviceNotFoundErr, "handle": -1}
+            handle = next(h for h in range(VSG_MAX_DEVICES) if h not in self._devices)
+            self._devices[handle] = _SimDevice(serial_number)
+        return {"status": vsgNoError, "handle": handle}
+
+    def vsg_close_device(self, device):
+        with self._lock:
+            if self._devices.pop(device, None) is None:
+                return {"status": vsgInvalidDeviceErr}
+        return {"status": vsgNoError}
+
+    def vsg_preset(self, device):
+        return self._command(device, lambda dev: dev.reset() or vsgNoError)
+
+    def vsg_recal(self, device):
+        return self._command(device, lambda dev: vsgNoError)
+
+    def vsg_abort(self, device):
+        return self._command(device, lambda dev: self._stop_stream(dev) or vsgNoError)
+
+    def vsg_get_serial_number(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "serial": dev.serial})
+
+    def vsg_get_firmware_version(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "version": SIM_FIRMWARE})
+
+    def vsg_get_cal_date(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "last_cal_date": SIM_CAL_DATE})
+
+    def vsg_read_temperature(self, device):
+        # warms up towards 45 C with the RF output on
+        def read(dev):
+            return {"status": vsgNoError, "temp": 38.0 + 7.0 * dev.rf_output + 0.1 * numpy.random.randn()}
+        return self._command(device, read)
+
+    def vsg_set_RF_output_state(self, device, enabled):
+        def apply(dev):
+            dev.rf_output = 1 if enabled else 0
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_get_RF_output_state(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "enabled": dev.rf_output})
+
+    def vsg_set_timebase(self, device, state):
+        def apply(dev):
+            dev.timebase = int(state)
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_get_timebase(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "state": dev.timebase})
+
+    def vsg_set_timebase_offset(self, device, ppm):
+        def apply(dev):
+            dev.timebase_offset, status = _clamp(float(ppm), -2.0, 2.0)
+            return status
+        return self._command(device, apply)
+
+    def vsg_get_timebase_offset(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "ppm": dev.timebase_offset})
+
+    def vsg_set_frequency(self, device, frequency):
+        def apply(dev):
+            dev.frequency, status = _clamp(float(frequency), VSG60_MIN_FREQ, VSG60_MAX_FREQ)
+            return status
+        return self._command(device, apply)
+
+    def vsg_get_frequency(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "frequency": dev.frequency})
+
+    def vsg_set_sample_rate(self, device, sample_rate):
+        rate, status = _clamp(float(sample_rate), VSG_MIN_SAMPLE_RATE, VSG_MAX_SAMPLE_RATE)
+        dev = self._device(device)
+        if dev is not None and rate != dev.sample_rate:
+            # the API flushes and waits for the stream before changing rate
+            self.vsg_flush_and_wait(device)
+        def apply(dev):
+            dev.drain(time.monotonic())
+            dev.sample_rate = rate
+            return status
+        return self._command(device, apply)
+
+    def vsg_get_sample_rate(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "sample_rate": dev.sample_rate})
+
+    def vsg_set_level(self, device, level):
+        def apply(dev):
+            dev.level, status = _clamp(float(level), VSG_MIN_LEVEL, VSG_MAX_LEVEL)
+            return status
+        return self._command(device, apply)
+
+    def vsg_get_level(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "level": dev.level})
+
+    def vsg_set_atten(self, device, atten):
+        def apply(dev):
+            dev.atten = int(atten)
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_get_IQ_scale(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "iq_scale": 1.0})
+
+    def vsg_set_IQ_offset(self, device, i_offset, q_offset):
+        def apply(dev):
+            dev.iq_offset = (int(i_offset), int(q_offset))
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_get_IQ_offset(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "i_offset": dev.iq_offset[0],
+                                                  "q_offset": dev.iq_offset[1]})
+
+    def vsg_set_digital_tuning(self, device, enabled):
+        def apply(dev):
+            dev.digital_tuning = 1 if enabled else 0
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_get_digital_tuning(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "enabled": dev.digital_tuning})
+
+    def vsg_set_trigger_length(self, device, seconds):
+        def apply(dev):
+            dev.trigger_length, status = _clamp(float(seconds), VSG_MIN_TRIGGER_LENGTH, VSG_MAX_TRIGGER_LENGTH)
+            return status
+        return self._command(device, apply)
+
+    def vsg_get_trigger_length(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError, "seconds": dev.trigger_length})
+
+    def vsg_submit_IQ(self, device, iq, length):
+        dev = self._device(device)
+        if dev is None:
+            return {"status": vsgInvalidDeviceErr}
+        if dev.usb_fault:
+            return {"status": vsgUsbXferErr}
+        length = int(length)
+        iq = _complex_iq(iq)
+        if length <= 0 or len(iq) < length:
+            return {"status": vsgInvalidParameterErr}
+        if length > self.buffer_samples:
+            # the API splits large submissions; so does the simulation
+            for start in range(0, length, self.buffer_samples):
+                n = min(self.buffer_samples, length - start)
+                result = self.vsg_submit_IQ(device, iq[start:start + n], n)
+                if result["status"] < 0:
+                    return result
+            return {"status": vsgNoError}
+        with dev.lock:
+            now = time.monotonic()
+            if dev.mode in ('cw', 'waveform'):
+                self._stop_stream(dev)
+            dev.drain(now)
+            # wait for room in the device buffer
+            wait = (dev.fill + length - self.buffer_samples) / dev.sample_rate
+            # and for the link: transfers are serialized
+            usb = length * USB_BYTES_PER_SAMPLE / self.usb_rate
+            start = max(now + max(wait, 0.0), dev.usb_free_at)
+            done = start + usb
+            dev.usb_free_at = done
+            dev.usb_time += usb
+            dev.blocked_time += start - now
+        delay = done - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._tap(device, iq, length)
+        with dev.lock:
+            dev.drain(time.monotonic())
+            if dev.mode == 'stream' and not dev.flushed and dev.empty_since is not None:
+                dev.underruns += 1
+                dev.underrun_samples += int((dev.mark - dev.empty_since) * dev.sample_rate)
+            dev.mode = 'stream'
+            dev.flushed = False
+            dev.empty_since = None
+            dev.fill += length
+            dev.max_fill = max(dev.max_fill, int(dev.fill))
+            dev.samples_submitted += length
+            dev.blocks_submitted += 1
+        return {"status": vsgNoError}
+
+    def vsg_submit_trigger(self, device):
+        def apply(dev):
+            if len(dev.triggers) >= MAX_TRIGGERS:
+                dev.triggers.pop(0)
+            # sample position in the stream where the trigger pulse starts
+            dev.triggers.append(dev.samples_submitted)
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_flush(self, device):
+        def apply(dev):
+            if dev.flushed:
+                return vsgAlreadyFlushed
+            dev.flushed = True
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_flush_and_wait(self, device):
+        result = self.vsg_flush(device)
+        dev = self._device(device)
+        if dev is None:
+            return result
+        with dev.lock:
+            dev.drain(time.monotonic())
+            remaining = dev.fill / dev.sample_rate if dev.mode == 'stream' else 0.0
+        if remaining > 0:
+            time.sleep(remaining)
+        with dev.lock:
+            dev.drain(time.monotonic())
+            if dev.mode == 'stream':
+                dev.mode = 'idle'
+        return {"status": vsgNoError}
+
+    def vsg_output_waveform(self, device, iq, length):
+        result = self.vsg_submit_IQ(device, iq, length)
+        if result["status"] < 0:
+            return result
+        return self.vsg_flush_and_wait(device)
+
+    def vsg_repeat_waveform(self, device, iq, length):
+        dev = self._device(device)
+        if dev is None:
+            return {"status": vsgInvalidDeviceErr}
+        if dev.usb_fault:
+            return {"status": vsgUsbXferErr}
+        length = int(length)
+        iq = _complex_iq(iq)
+        if length <= 0 or len(iq) < length:
+            return {"status": vsgInvalidParameterErr}
+        # a full copy is made and transferred before generation starts
+        waveform = numpy.array(iq[:length])
+        time.sleep(length * USB_BYTES_PER_SAMPLE / self.usb_rate)
+        with dev.lock:
+            self._stop_stream(dev)
+            dev.mode = 'waveform'
+            dev.waveform = waveform
+        self._tap(device, waveform, length)
+        return {"status": vsgNoError}
+
+    def vsg_output_CW(self, device):
+        def apply(dev):
+            self._stop_stream(dev)
+            dev.mode = 'cw'
+            return vsgNoError
+        return self._command(device, apply)
+
+    def vsg_is_waveform_active(self, device):
+        return self._command(device, lambda dev: {"status": vsgNoError,
+                                                  "active": 1 if dev.mode == 'waveform' else 0})
+
+    def vsg_get_USB_status(self, device):
+        return self._command(device, lambda dev: vsgNoError)
+
+    def vsg_get_error_string(self, status):
+        return {"error_string": ERROR_STRINGS.get(status, "Unknown error").encode()}
@@ -0,0 +1,79 @@
+"""Per-call overhead of the vsg_api wrapper against the vsg_fast binding.
+
+Opens the first device and times tight loops of the same calls through
+vsg_api (decorated wrapper, undeclared prototypes), FastVSG (vsg_api names
+on declared prototypes) and VsgDevice (the fast path). Only the frequency
+setter touches the hardware state; it alternates between two frequencies.
+Set VSG_API_LIB to benchmark against another build of the library.
+
+    python vsg_fast_bench.py --calls 20000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+EXAMPLES_PY = os.path.join(os.path.dirname(__file__), "vsg60_series", "examples", "python")
+if EXAMPLES_PY not in sys.path:
+    sys.path.insert(0, EXAMPLES_PY)
+
+from vsgdevice import vsg_api  # noqa: E402
+from vsgdevice.vsg_fast import FastVSG, VsgDevice  # noqa: E402
+
+
+def per_call(fn, calls):
+    """Mean microseconds per fn(i) over `calls` calls."""
+    start = time.perf_counter()
+    for i in range(calls):
+        fn(i)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark vsg_api call overhead")
+    p.add_argument("--calls", type=int, default=20000)
+    p.add_argument("--f1", type=float, default=1.0e9)
+    p.add_argument("--f2", type=float, default=1.001e9)
+    args = p.parse_args()
+    if vsg_api.load_error is not None:
+        sys.exit(f"VSG API library not loaded: {vsg_api.load_error}")
+
+    dev = VsgDevice.open()
+    fast = FastVSG(dev.lib)
+    handle = dev.handle
+    freqs = (args.f1, args.f2)
+    iq = np.zeros(2 * 1024, dtype=np.float32)
+    n = args.calls
+
+    rows = [
+        ("set_frequency", lambda i: vsg_api.vsg_set_frequency(handle, freqs[i & 1]),
+         lambda i: fast.vsg_set_frequency(handle, freqs[i & 1]),
+         lambda i: dev.set_frequency(freqs[i & 1])),
+        ("get_frequency", lambda i: vsg_api.vsg_get_frequency(handle),
+         lambda i: fast.vsg_get_frequency(handle),
+         lambda i: dev.get_frequency()),
+        ("submit_IQ (1024)", lambda i: vsg_api.vsg_submit_IQ(handle, iq, 1024),
+         lambda i: fast.vsg_submit_IQ(handle, iq, 1024),
+         lambda i: dev.submit_iq(iq)),
+        ("4 settings", lambda i: (vsg_api.vsg_get_frequency(handle), vsg_api.vsg_get_level(handle),
+                                  vsg_api.vsg_get_sample_rate(handle), vsg_api.vsg_get_RF_output_state(handle)),
+         lambda i: (fast.vsg_get_frequency(handle), fast.vsg_get_level(handle),
+                    fast.vsg_get_sample_rate(handle), fast.vsg_get_RF_output_state(handle)),
+         lambda i: dev.settings()),
+    ]
+    print(f"{'us per call':18}{'vsg_api':>10}{'FastVSG':>10}{'VsgDevice':>11}")
+    for name, *fns in rows:
+        if name.startswith("submit"):
+            vsg_api.vsg_abort(handle)
+        times = [per_call(fn, n) for fn in fns]
+        if name.startswith("submit"):
+            dev.flush()
+        print(f"{name:18}" + "".join(f"{t:10.2f}" for t in times[:2]) + f"{times[2]:11.2f}")
+    dev.abort()
+    dev.close()
+
+
+if __name__ == '__main__':
+    main()
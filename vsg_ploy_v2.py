@@ -7,12 +7,15 @@ import struct
 import threading
 import sys
 
+from waterfall import Waterfall, DEFAULT_FLOOR_DB, DEFAULT_CEIL_DB
+from plot_stream import FrameReader, recv_exact_into, FRAME_MAGIC, FRAME_IQ, FRAME_SHM, FRAME_SHUTDOWN
+
 HOST = '127.0.0.1'
 PORT = 56789
 
 class SpectrumPlotter:
     def __init__(self):
-        self.fig, self.ax = plt.subplots(figsize=(10, 6))
+        self.fig, (self.ax, self.wf_ax) = plt.subplots(2, 1, figsize=(10, 8))
         self.line, = self.ax.plot([], [], lw=2)
         self.ax.set_title('Transmitted IQ Spectrum')
         self.ax.set_xlabel('Frequency (MHz)')
@@ -20,39 +23,83 @@ class SpectrumPlotter:
         self.ax.grid(True)
         self.ax.set_xlim(-5, 5)
         self.ax.set_ylim(-140, 10)
+        # waterfall of the streamed IQ, newest row at the top
+        self.waterfall = None
+        self.wf_image = None
+        self.wf_ax.set_xlabel('Frequency (MHz)')
+        self.wf_ax.set_ylabel('Rows (newest at top)')
+        self.fig.tight_layout()
         self.running = True
         self.thread = threading.Thread(target=self.listen_for_data, daemon=True)
         self.thread.start()
 
     def listen_for_data(self):
         import threading
+        def shutdown():
+            print('[vsg_plot] Shutdown signal received')
+            import matplotlib.pyplot as plt
+            plt.close(self.fig)
+            self.running = False
+
+        def handle_stream(reader, prefix):
+            # persistent framed connection (see plot_stream.py); frames are read into one buffer
+            frames = 0
+            while self.running:
+                header = reader.read_header(prefix)
+                prefix = b''
+                if header is None:
+                    break
+                ftype, seq, sample_rate, length = header
+                if ftype == FRAME_SHUTDOWN:
+                    shutdown()
+                    break
+                if ftype not in (FRAME_IQ, FRAME_SHM):
+                    # unknown frame type: skip its payload
+                    if reader.read_payload(length) is None:
+                        break
+                    continue
+                iq = reader.read_iq(ftype, length, seq)
+                if iq is None:
+                    print('[vsg_plot] Connection closed before all data received')
+                    break
+                if not iq.size:
+                    # shm slot reused before we got to it; the next frame is newer anyway
+                    continue
+                self.update_plot(iq, sample_rate)
+                frames += 1
+            print(f'[vsg_plot] Stream closed after {frames} frames ({reader.dropped} dropped)')
+
         def handle_client(conn):
             with conn:
                 print('[vsg_plot] Connection received')
-                # Receive header: 8 bytes for sample_rate, 4 bytes for N
-                header = conn.recv(12)
-                if len(header) < 12:
-                    print('[vsg_plot] Incomplete header received')
-                    return
-                sample_rate, N = struct.unpack('dI', header)
-                if sample_rate == 0.0 and N == 0:
-                    print('[vsg_plot] Shutdown signal received')
-                    import matplotlib.pyplot as plt
-                    plt.close(self.fig)
-                    self.running = False
-                    return
-                # Receive IQ data (N complex64)
-                iq_bytes = b''
-                while len(iq_bytes) < N * 8:
-                    chunk = conn.recv(N * 8 - len(iq_bytes))
-                    if not chunk:
+                reader = FrameReader(conn)
+                try:
+                    magic = bytearray(4)
+                    if not recv_exact_into(conn, memoryview(magic)):
+                        print('[vsg_plot] Incomplete header received')
+                        return
+                    if bytes(magic) == FRAME_MAGIC:
+                        handle_stream(reader, bytes(magic))
+                        return
+                    # Legacy one-shot update: 8 bytes for sample_rate, 4 bytes for N
+                    header = bytearray(12)
+                    header[:4] = magic
+                    if not recv_exact_into(conn, memoryview(header)[4:]):
+                        print('[vsg_plot] Incomplete header received')
+                        return
+                    sample_rate, N = struct.unpack('dI', header)
+                    if sample_rate == 0.0 and N == 0:
+                        shutdown()
+                        return
+                    # Receive IQ data (N complex64)
+                    payload = reader.read_payload(N * 8)
+                    if payload is None:
                         print('[vsg_plot] Connection closed before all data received')
                         return
-                    iq_bytes += chunk
-                if len(iq_bytes) == N * 8:
                     print(f'[vsg_plot] Received IQ data, N={N}')
-                    iq = np.frombuffer(iq_bytes, dtype=np.complex64)
-                    self.update_plot(iq, sample_rate)
+                    self.update_plot(np.frombuffer(payload, dtype=np.complex64), sample_rate)
+                finally:
+                    reader.close()
 
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -85,8 +132,22 @@ class SpectrumPlotter:
             self.ax.set_ylim(np.max(power)-100, np.max(power)+10)
         else:
             self.ax.set_ylim(-140, 10)
+        self.update_waterfall(iq, sample_rate)
         self.fig.canvas.draw_idle()
 
+    def update_waterfall(self, iq, sample_rate):
+        if self.waterfall is None or self.waterfall.sample_rate != sample_rate:
+            # one row per ~20 ms of signal, at most 8 FFTs per row, whatever the rate
+            self.waterfall = Waterfall(sample_rate, nfft=1024, rows=200, width=512, row_rate=50, ffts_per_row=8)
+            f0, f1 = self.waterfall.freqs[0] / 1e6, self.waterfall.freqs[-1] / 1e6
+            if self.wf_image is not None:
+                self.wf_image.remove()
+            self.wf_image = self.wf_ax.imshow(self.waterfall.image()[::-1], aspect='auto', origin='upper',
+                                              extent=(f0, f1, 0, self.waterfall.rows), cmap='viridis',
+                                              vmin=DEFAULT_FLOOR_DB, vmax=DEFAULT_CEIL_DB)
+        if self.waterfall.feed(iq):
+            self.wf_image.set_data(self.waterfall.image()[::-1])
+
     def show(self):
         plt.show()
         self.running = False
@@ -0,0 +1,121 @@
+"""Streaming waterfall (spectrogram) engine.
+
+IQ blocks of any size are fed in; every `samples_per_row` input samples
+become one waterfall row. A row is the average power of up to `ffts_per_row`
+windowed FFT frames taken evenly across that span (so at high sample rates
+most of the input is skipped rather than transformed: decimation in time),
+peak-binned down to `width` frequency columns (decimation in frequency). Rows
+go into a preallocated rolling (rows, width) history addressed by a row
+sequence number, so viewers can ask for just the rows they have not seen.
+"""
+import threading
+
+import numpy as np
+
+from decimation import bucket_edges
+from spectrum import spectral_window
+
+DEFAULT_FLOOR_DB = -120.0
+DEFAULT_CEIL_DB = 0.0
+
+
+class Waterfall:
+    """Rolling spectrogram of a continuous IQ stream.
+
+    sample_rate: Hz
+    nfft: FFT length per frame
+    rows: rows of history kept
+    width: frequency columns per row (<= nfft)
+    row_rate: rows per second of signal time
+    ffts_per_row: FFT frames averaged into each row
+    """
+
+    def __init__(self, sample_rate, nfft=1024, rows=256, width=512, row_rate=50.0, ffts_per_row=4,
+                 window='hann'):
+        self.sample_rate = float(sample_rate)
+        self.nfft = int(nfft)
+        self.width = min(int(width), self.nfft)
+        self.rows = int(rows)
+        self.samples_per_row = max(self.nfft, int(round(self.sample_rate / row_rate)))
+        self.ffts_per_row = max(1, min(int(ffts_per_row), self.samples_per_row // self.nfft))
+        # frame start offsets within a row span
+        self._offsets = np.linspace(0, self.samples_per_row - self.nfft, self.ffts_per_row).astype(np.int64)
+        w = spectral_window(window, self.nfft)
+        self._window = w / np.float32(np.sum(w))  # full-scale tone reads 0 dB
+        self._edges = bucket_edges(self.nfft, self.width)
+        self.freqs = np.fft.fftshift(np.fft.fftfreq(self.nfft, d=1.0 / self.sample_rate))[self._edges]
+        self.history = np.full((self.rows, self.width), DEFAULT_FLOOR_DB, dtype=np.float32)
+        self.head = 0  # sequence number of the next row
+        self._pending = np.empty(self.samples_per_row, dtype=np.complex64)
+        self._fill = 0
+        self._lock = threading.Lock()
+
+    def feed(self, iq):
+        """Consume an IQ block; returns the number of rows completed."""
+        iq = np.asarray(iq, dtype=np.complex64)
+        done = 0
+        pos = 0
+        n = iq.size
+        span = self.samples_per_row
+        if self._fill:
+            take = min(span - self._fill, n)
+            self._pending[self._fill:self._fill + take] = iq[:take]
+            self._fill += take
+            pos = take
+            if self._fill == span:
+                self._add_rows(self._pending[None, :])
+                self._fill = 0
+                done += 1
+        whole = (n - pos) // span
+        if whole:
+            # whole row spans straight from the input, no copy
+            self._add_rows(iq[pos:pos + whole * span].reshape(whole, span))
+            pos += whole * span
+            done += whole
+        rest = n - pos
+        if rest:
+            self._pending[:rest] = iq[pos:]
+            self._fill = rest
+        return done
+
+    def _add_rows(self, spans):
+        frames = spans[:, self._offsets[:, None] + np.arange(self.nfft)]  # (rows, ffts, nfft)
+        spec = np.fft.fft(frames * self._window, axis=2)
+        power = (spec.real ** 2 + spec.imag ** 2).mean(axis=1)
+        power = np.fft.fftshift(power, axes=1)
+        binned = np.maximum.reduceat(power, self._edges, axis=1)
+        db = 10 * np.log10(binned + 1e-20)
+        with self._lock:
+            # rows beyond the history length would be overwritten straight away
+            self.head += max(0, len(db) - self.rows)
+            for row in db[-self.rows:]:
+                self.history[self.head % self.rows] = row
+                self.head += 1
+
+    def rows_since(self, seq=None):
+        """(first_seq, rows) of the rows after `seq` that are still held (all held rows when None)."""
+        with self._lock:
+            oldest = max(0, self.head - self.rows)
+            start = oldest if seq is None else min(max(int(seq) + 1, oldest), self.head)
+            idx = np.arange(start, self.head) % self.rows
+            return start, self.history[idx]
+
+    def image(self):
+        """The full (rows, width) history, oldest row first; rows not yet filled read the floor."""
+        with self._lock:
+            return np.roll(self.history, -(self.head % self.rows), axis=0)
+
+
+def quantize_db(rows, floor_db=DEFAULT_FLOOR_DB, ceil_db=DEFAULT_CEIL_DB):
+    """dB rows -> uint8 palette indices (0 = floor, 255 = ceiling)."""
+    scaled = (np.asarray(rows, dtype=np.float32) - floor_db) * (255.0 / (ceil_db - floor_db))
+    return np.clip(scaled, 0, 255).astype(np.uint8)
+
+
+def colormap_lut(name='viridis'):
+    """256x3 uint8 colour table; greyscale if matplotlib is not installed."""
+    try:
+        from matplotlib import colormaps
+        return (colormaps[name](np.arange(256))[:, :3] * 255).astype(np.uint8)
+    except ImportError:
+        return np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
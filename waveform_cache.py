@@ -0,0 +1,210 @@
+"""Content-addressed cache of generated IQ waveforms.
+
+A waveform is identified by a hash of everything that defines it (the signal
+list, sample rate, duration, seed, ...), so repeated transmits, previews and
+spectrum refreshes of an unchanged scenario reuse the same buffer instead of
+regenerating it. Buffers are stored as read-only float32 interleaved I/Q (the
+layout vsg_repeat_waveform takes) and evicted least-recently-used once the
+in-memory budget is exceeded, optionally spilling to .npy files on disk.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def waveform_key(signals, sample_rate, duration=None, seed=None, **extra):
+    """Stable hash of a waveform definition; dict order and int/float spelling do not matter."""
+    def canon(v):
+        if isinstance(v, dict):
+            return {str(k): canon(x) for k, x in v.items()}
+        if isinstance(v, (list, tuple)):
+            return [canon(x) for x in v]
+        if isinstance(v, (bool, str)) or v is None:
+            return v
+        if isinstance(v, (int, float, np.integer, np.floating)):
+            return float(v)
+        return repr(v)
+    desc = {"signals": canon(signals), "sample_rate": canon(sample_rate), "duration": canon(duration),
+            "seed": canon(seed), "extra": canon(extra)}
+    return hashlib.sha1(json.dumps(desc, sort_keys=True).encode()).hexdigest()
+
+
+def to_interleaved(iq):
+    """complex array -> float32 interleaved I/Q (no copy if already complex64)."""
+    return np.ascontiguousarray(iq, dtype=np.complex64).view(np.float32)
+
+
+class WaveformCache:
+    """Thread-safe LRU of float32 interleaved waveforms with optional disk spill.
+
+    Evicted waveforms are written to disk outside the lock; until the write
+    has finished they are still served from memory.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, spill_dir=None, max_spill_bytes=0):
+        self.max_bytes = int(max_bytes)
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = int(max_spill_bytes)
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._mem = OrderedDict()    # key -> array
+        self._disk = OrderedDict()   # key -> (path, nbytes)
+        self._spilling = {}          # key -> array evicted but not yet on disk
+        self._spills = 0             # numbers spill files, so a rewrite never shares a path
+        self._bytes = 0
+        self._spill_bytes = 0
+        self._lock = threading.Lock()
+        self._pending = {}           # key -> Event, so one caller generates and the rest wait
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            arr, evicted = self._lookup(key)
+        self._spill(evicted)
+        return arr
+
+    def _lookup(self, key):
+        """(array or None, evicted entries to spill); call with the lock held."""
+        arr = self._mem.get(key)
+        if arr is not None:
+            self._mem.move_to_end(key)
+            self.hits += 1
+            return arr, []
+        arr = self._spilling.pop(key, None)
+        if arr is not None:
+            self.hits += 1
+            return arr, self._store(key, arr)
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            path, nbytes = entry
+            self._spill_bytes -= nbytes
+            try:
+                arr = np.load(path)
+                os.remove(path)
+            except OSError:
+                return None, []
+            arr.setflags(write=False)
+            self.hits += 1
+            return arr, self._store(key, arr)
+        return None, []
+
+    def put(self, key, iq):
+        """Store a copy of a waveform (complex or float32 interleaved); returns the cached array."""
+        arr = iq if iq.dtype == np.float32 else to_interleaved(iq)
+        if np.may_share_memory(arr, iq):
+            arr = arr.copy()
+        return self._insert(key, arr)
+
+    def _insert(self, key, arr):
+        arr = np.ascontiguousarray(arr)
+        arr.setflags(write=False)
+        with self._lock:
+            evicted = self._store(key, arr)
+        self._spill(evicted)
+        return arr
+
+    def get_or_create(self, key, factory):
+        """Return the cached waveform for key, calling factory() once on a miss.
+
+        The cache takes over the array factory() returns (it is made read-only
+        and not copied), so the factory must hand over a new array that nothing
+        else writes to.
+        """
+        while True:
+            owner = False
+            with self._lock:
+                arr, evicted = self._lookup(key)
+                if arr is None:
+                    event = self._pending.get(key)
+                    if event is None:
+                        event = self._pending[key] = threading.Event()
+                        self.misses += 1
+                        owner = True
+            self._spill(evicted)
+            if arr is not None:
+                return arr
+            if owner:
+                break
+            event.wait()
+        try:
+            iq = factory()
+            return self._insert(key, iq if iq.dtype == np.float32 else to_interleaved(iq))
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
+
+    def clear(self):
+        with self._lock:
+            paths = [path for path, _ in self._disk.values()]
+            self._mem.clear()
+            self._disk.clear()
+            self._spilling.clear()
+            self._bytes = self._spill_bytes = 0
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._mem) + len(self._spilling), "bytes": self._bytes,
+                    "spilled": len(self._disk), "spill_bytes": self._spill_bytes, "hits": self.hits,
+                    "misses": self.misses}
+
+    def _store(self, key, arr):
+        """Add arr under the lock; returns the evicted (key, array) pairs for _spill()."""
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._mem[key] = arr
+        self._bytes += arr.nbytes
+        evicted = []
+        while self._bytes > self.max_bytes and len(self._mem) > 1:
+            old_key, old = self._mem.popitem(last=False)
+            self._bytes -= old.nbytes
+            if self.spill_dir and old.nbytes <= self.max_spill_bytes:
+                self._spilling[old_key] = old
+                evicted.append((old_key, old))
+        return evicted
+
+    def _spill(self, evicted):
+        """Write evicted waveforms to disk; call without the lock."""
+        for key, arr in evicted:
+            with self._lock:
+                self._spills += 1
+                path = os.path.join(self.spill_dir, f"{key}.{self._spills}.npy")
+            try:
+                np.save(path, arr)
+                saved = True
+            except OSError:
+                saved = False
+            stale = []
+            with self._lock:
+                if self._spilling.get(key) is not arr:
+                    # looked up again (or cleared) while it was being written
+                    saved = False
+                else:
+                    del self._spilling[key]
+                if saved:
+                    self._disk[key] = (path, arr.nbytes)
+                    self._spill_bytes += arr.nbytes
+                    while self._spill_bytes > self.max_spill_bytes and self._disk:
+                        _, (old_path, nbytes) = self._disk.popitem(last=False)
+                        self._spill_bytes -= nbytes
+                        stale.append(old_path)
+                else:
+                    stale.append(path)
+            for old_path in stale:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
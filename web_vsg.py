@@ -8,6 +8,19 @@ import json
 import numpy as np
 from werkzeug.utils import secure_filename
 
+from stream_engine import CompositeBlockSource, StreamingEngine, DEFAULT_BLOCK_SIZE
+from oscillators import NCO, SweepNCO, closed_sweep_center, sweep_frequency
+from iq_file import IQFile, IQFileSource
+from decimation import minmax_decimate, lttb
+from iq_frames import IQBlock, FMT_FLOAT32, FMT_INT16
+from fanout_ring import FanoutRing, parse_seq
+from sweep_plan import PLANS, SweepRunner, plan_frequencies
+from waterfall import Waterfall, quantize_db, colormap_lut
+from device_actor import DeviceActor, COMMAND_TIMEOUT
+from device_manager import DeviceManager, split_span
+from device_session import DeviceSession
+from waveform_cache import WaveformCache, waveform_key, to_interleaved
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
 
 # workspace root
@@ -23,12 +36,6 @@ EXAMPLES_PY = os.path.join(ROOT, "vsg60_series", "examples", "python")
 if EXAMPLES_PY not in sys.path:
     sys.path.insert(0, EXAMPLES_PY)
 
-try:
-    from vsgdevice import vsg_api as vsg
-except Exception as exc:
-    vsg = None
-    print("Warning: could not import vsg API wrapper:", exc)
-
 # Add DLL search path if present (matches vsg_test.py)
 DLL_DIR = os.path.join(ROOT, "vsg60_series", "lib", "win", "vs2019", "x64")
 if os.path.exists(DLL_DIR):
@@ -37,101 +44,232 @@ if os.path.exists(DLL_DIR):
     except Exception:
         pass
 
-# Global device state
-device_handle = None
-device_lock = threading.Lock()
+# VSG_BACKEND=sim runs everything against the simulated device
+try:
+    from vsgdevice.backend import load_backend
+    vsg = load_backend()
+except Exception as exc:
+    vsg = None
+    print("Warning: could not import vsg API wrapper:", exc)
 
-# Sweep thread state
-sweep_thread = None
-sweep_stop = None
-sweep_current_freq = None
+# Global device state: one actor thread owns the handle and runs every device call
+device_actor = DeviceActor(vsg)
+# opened on first use and kept open across /start and /stop; reopened if a health check fails,
+# after which restore_output puts the running output back
+device_session = DeviceSession(device_actor, on_reopen=lambda handle: restore_output(handle))
+# device calls that configured the current output (name -> args, in order of the last call),
+# replayed on a reopened device; cleared by /stop
+output_setup = {}
+output_lock = threading.RLock()
+# calls that select what the device plays; the last one replaces the others
+OUTPUT_MODES = ('vsg_output_CW', 'vsg_repeat_waveform')
+# Further units are opened by serial, each with its own actor; /start_scenario drives them
+device_manager = DeviceManager(vsg, default=device_actor)
+# serial -> {"mode", "runner", "engine"} of the units the scenario routes are driving
+scenario_units = {}
+scenario_lock = threading.Lock()
+# lead time before lockstep sweep segments take their first step
+SCENARIO_START_DELAY = 0.05
+
+# Sweep state: the LO sweep runner (kept after it finishes so its timing stays readable)
+sweep_runner = None
 sweep_lock = threading.Lock()
+# parameters of the running digital sweep (None when the LO sweep or nothing runs)
+sweep_digital = None
+# mode of the output the device holds by itself ("cw", "iq", "sweep" for a looped digital sweep,
+# "file"), from /start or /play_iq_file until /stop; None while streaming or sweeping the LO
+held_output = None
+
+# Digital sweeps are synthesized in IQ when the span fits this fraction of the
+# sample rate (the rest is the DAC filter roll-off); wider spans hop the LO.
+SWEEP_USABLE_BANDWIDTH = 0.8
+MAX_SAMPLE_RATE = 54.0e6
+# one sweep period up to this many samples is looped with vsg_repeat_waveform, longer ones are streamed
+MAX_LOOP_SAMPLES = 1 << 24
+MAX_SWEEP_POINTS = 1000000
+SWEEP_SHAPES = {"linear": "sawtooth", "sawtooth": "sawtooth", "triangle": "triangle", "log": "log",
+                "sine": "sine"}
 
 # IQ stream state
 iq_stream_thread = None
 iq_stream_stop = None
-iq_latest = None
-iq_lock = threading.Condition()
+# recent blocks with a read cursor per client; slow clients skip ahead and count drops
+IQ_RING_BLOCKS = 64
+iq_ring = FanoutRing(IQ_RING_BLOCKS)
+# spectrogram of the live stream, rebuilt on each /start_iq_stream
+iq_waterfall = None
+# spectrogram of what the device transmits (None for CW and LO sweeps), rebuilt per output
+tx_waterfall = None
+# rows drawn from a repeated waveform, one period per row
+LOOP_WATERFALL_ROWS = 32
+
+# Streaming (vsg_submit_IQ) state
+stream_engine = None
+
+# Generated waveforms keyed by their definition; evicted entries spill to disk
+CACHE_DIR = os.path.join(ROOT, 'cache')
+waveform_cache = WaveformCache(max_bytes=256 * 1024 * 1024, spill_dir=CACHE_DIR,
+                               max_spill_bytes=2 * 1024 * 1024 * 1024)
 
 
 def open_device():
-    global device_handle
-    with device_lock:
-        if device_handle is not None:
-            return device_handle
-        if vsg is None:
-            raise RuntimeError("VSG API not available")
-        result = vsg.vsg_open_device()
-        if result.get("status", -1) != 0:
-            raise RuntimeError(f"Failed to open device: {result}")
-        device_handle = result["handle"]
-        return device_handle
+    return device_session.ensure_open()
 
 
 def close_device():
-    global device_handle
-    with device_lock:
-        if device_handle is None:
-            return
-        try:
-            vsg.vsg_abort(device_handle)
-        except Exception:
-            pass
-        vsg.vsg_close_device(device_handle)
-        device_handle = None
+    device_session.close()
+
+
+def device_call(name, *args):
+    """Run vsg.<name>(handle, *args) on the device actor and wait for the result.
+
+    A negative status raises RuntimeError, as the 'fast' backend's VsgError does,
+    so a failed call is an error with every backend rather than a silent dict.
+    """
+    result = device_actor.call(name, *args)
+    if isinstance(result, dict) and result.get("status", 0) < 0:
+        raise RuntimeError(f"{name} failed: {result}")
+    return result
+
+
+def watch_output(sample_rate, iq=None):
+    """Start a new transmit waterfall and return it (None, and no waterfall, for sample_rate None).
+
+    `iq` is a repeated waveform (float32 interleaved or complex64): the rows
+    are one loop period each. Streams feed the returned waterfall as they go.
+    """
+    global tx_waterfall
+    if sample_rate is None:
+        tx_waterfall = None
+        return None
+    if iq is None:
+        wf = Waterfall(sample_rate)
+    else:
+        iq = np.asarray(iq)
+        if iq.dtype == np.float32:
+            iq = iq.view(np.complex64)
+        wf = Waterfall(sample_rate, row_rate=sample_rate / max(iq.size, 1))
+        for _ in range(LOOP_WATERFALL_ROWS):
+            wf.feed(iq)
+    tx_waterfall = wf
+    return wf
+
+
+def setup_call(name, *args):
+    """device_call() for a call that configures the output, remembered for restore_output()."""
+    result = device_call(name, *args)
+    with output_lock:
+        for other in OUTPUT_MODES if name in OUTPUT_MODES else (name,):
+            output_setup.pop(other, None)
+        output_setup[name] = args
+    return result
+
+
+def hold_output(mode):
+    """Record the output the device now holds by itself (None when a stream or LO sweep took over)."""
+    global held_output
+    with output_lock:
+        held_output = mode
+
+
+def played_rate():
+    """Sample rate the device is set to."""
+    return float(device_call('vsg_get_sample_rate')["sample_rate"])
+
+
+def restore_output(handle):
+    """Put the output back on a reopened device (a DeviceSession hook); returns what was restored.
+
+    The remembered setup calls are replayed, a stream is restarted on the new
+    handle from where its source had got to, and an LO sweep that died on the
+    fault is restarted (one that is still running already retunes through the
+    actor, which has the new handle).
+    """
+    global stream_engine, sweep_runner
+    with output_lock:
+        calls = list(output_setup.items())
+        if not calls:
+            return "idle"
+        engine = stream_engine
+        streaming = engine is not None and (engine.running or engine.error is not None)
+        for name, args in calls:
+            # a stream replaces CW or a repeated waveform started before it
+            if not (streaming and name in OUTPUT_MODES):
+                device_call(name, *args)
+        restored = ["settings"]
+        if streaming:
+            engine.stop()
+            total = engine.total_samples
+            if total is not None:
+                total -= engine.samples_submitted
+            if total is None or total > 0:
+                stream_engine = StreamingEngine(vsg, handle, engine.source, block_size=engine.block_size,
+                                                total_samples=total, monitor=engine.monitor)
+                stream_engine.start()
+                restored.append("stream")
+        runner = sweep_runner
+        if runner is not None and runner.error is not None:
+            cycles = runner.cycles
+            if cycles is not None:
+                cycles -= runner.steps // runner.plan.size
+            if cycles is None or cycles > 0:
+                sweep_runner = SweepRunner(runner.plan, runner.dwell, runner.set_frequency, cycles=cycles)
+                sweep_runner.start()
+                restored.append("sweep")
+        elif runner is not None and runner.running:
+            restored.append("sweep")
+        return "restored: " + ", ".join(restored)
 
 
 def stop_output():
-    global device_handle
-    with device_lock:
-        if device_handle is None:
-            return
-        try:
-            vsg.vsg_abort(device_handle)
-            vsg.vsg_set_RF_output_state(device_handle, 0)
-        except Exception:
-            pass
+    if device_actor.handle is None:
+        return
+    abort = device_actor.submit('vsg_abort')
+    rf_off = device_actor.submit('vsg_set_RF_output_state', 0)
+    try:
+        abort.result(COMMAND_TIMEOUT)
+        rf_off.result(COMMAND_TIMEOUT)
+    except Exception:
+        pass
 
 
 def generate_iq(tone_freq_hz, sample_rate_hz, num_samples):
-    t = np.arange(num_samples) / float(sample_rate_hz)
-    i = np.cos(2 * np.pi * tone_freq_hz * t).astype(np.float32)
-    q = np.sin(2 * np.pi * tone_freq_hz * t).astype(np.float32)
-    # interleave I/Q
-    iq = np.empty(num_samples * 2, dtype=np.float32)
-    iq[0::2] = i
-    iq[1::2] = q
-    return iq
+    """Tone as float32 interleaved I/Q: a view of the NCO's complex64 output, no interleave pass."""
+    nco = NCO(tone_freq_hz, sample_rate_hz, block_size=num_samples)
+    return to_interleaved(nco.read(num_samples))
+
+
+def sweep_period(shape, bandwidth, speed):
+    """Seconds per sweep period for a sweep rate in Hz/s (up and down for triangle and sine)."""
+    return (2.0 if shape in ('triangle', 'sine') else 1.0) * bandwidth / speed
+
+
+def generate_sweep(shape, bandwidth, period, sample_rate, carrier):
+    """One period of a digital sweep around baseband 0 Hz, closed so it loops seamlessly."""
+    nco = SweepNCO(0.0, bandwidth, period, sample_rate, shape=shape, carrier=carrier, closed=True)
+    return to_interleaved(nco.read(nco.period_samples))
 
 
 def load_iq_file(path):
     """Load raw interleaved float32 IQ file and return (arr, complex_samples).
 
-    `arr` is a 1-D float32 NumPy array containing interleaved I,Q samples.
+    `arr` is a 1-D float32 NumPy array containing interleaved I,Q samples,
+    memory-mapped from the file (read-only, paged in on access).
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(path)
-    with open(path, 'rb') as f:
-        data = f.read()
-    arr = np.frombuffer(data, dtype=np.float32)
-    # make even length
-    if arr.size % 2:
-        arr = arr[:-1]
-    complex_samples = arr.size // 2
-    return arr, complex_samples
+    iq_file = IQFile(path)
+    return iq_file.interleaved(), iq_file.complex_samples
 
 
 def iq_producer(sample_rate, tone_freq, length, interval=0.1):
-    global iq_latest, iq_stream_stop
+    global iq_stream_stop
+    # keep one oscillator so consecutive blocks continue in phase
+    nco = NCO(tone_freq, sample_rate, block_size=length)
     while not iq_stream_stop.is_set():
-        # generate interleaved IQ but we'll send separate lists i and q
-        iq = generate_iq(tone_freq, sample_rate, length)
-        # split
-        i = iq[0::2].tolist()
-        q = iq[1::2].tolist()
-        with iq_lock:
-            iq_latest = {"i": i, "q": q}
-            iq_lock.notify_all()
+        # each block is encoded at most once per wire format, however many clients read it
+        block = IQBlock(nco.read(length).copy(), iq_ring.head, sample_rate, time.time())
+        iq_ring.publish(block)
+        if iq_waterfall is not None:
+            iq_waterfall.feed(block.iq)
         time.sleep(interval)
 
 
@@ -142,9 +280,14 @@ def start_iq_stream():
     tone_freq = float(data.get('tone_freq', 100e3))
     length = int(data.get('length', 1024))
     interval = float(data.get('interval', 0.1))
-    global iq_stream_thread, iq_stream_stop
+    global iq_stream_thread, iq_stream_stop, iq_waterfall
     if iq_stream_thread and iq_stream_thread.is_alive():
         return jsonify({"status": "error", "message": "IQ stream already running"}), 400
+    nfft = int(data.get('waterfall_nfft', 256))
+    # one waterfall row per block by default
+    iq_waterfall = Waterfall(sample_rate, nfft=nfft, rows=int(data.get('waterfall_rows', 256)),
+                             width=int(data.get('waterfall_width', nfft)),
+                             row_rate=float(data.get('waterfall_row_rate', sample_rate / max(length, nfft))))
     iq_stream_stop = threading.Event()
     iq_stream_thread = threading.Thread(target=iq_producer, args=(sample_rate, tone_freq, length, interval), daemon=True)
     iq_stream_thread.start()
@@ -161,26 +304,119 @@ def stop_iq_stream():
     return jsonify({"status": "ok"})
 
 
-def iq_stream_generator():
-    # SSE generator that yields latest IQ whenever available
-    def format_sse(data):
-        return f"data: {data}\n\n"
+def iq_stream_generator(sub):
+    # SSE generator that yields every IQ block in order
+    def format_sse(data, seq=None):
+        if seq is None:
+            return f"data: {data}\n\n"
+        # the id lets EventSource resume with Last-Event-ID after a reconnect
+        return f"id: {seq}\ndata: {data}\n\n"
 
-    while True:
-        with iq_lock:
-            iq_lock.wait(timeout=5.0)
-            data = iq_latest
-        if data is None:
-            # keep-alive
-            yield format_sse(json.dumps({"keep": True}))
-            continue
-        # send i and q as JSON
-        yield format_sse(json.dumps(data))
+    try:
+        while True:
+            block = sub.get(timeout=5.0)
+            if block is None:
+                # keep-alive
+                yield format_sse(json.dumps({"keep": True, "lag": sub.lag, "dropped": sub.dropped}))
+                continue
+            # send i and q as JSON
+            yield format_sse(block.json(), block.seq)
+    finally:
+        sub.close()
+
+
+def iq_frame_generator(sub, fmt):
+    # chunked binary stream of IQ frames (see iq_frames.py for the layout)
+    try:
+        while True:
+            block = sub.get(timeout=5.0)
+            if block is not None:
+                yield block.frame(fmt)
+    finally:
+        sub.close()
+
+
+def subscribe_iq(resume):
+    """Ring cursor for a client; resume is the last sequence number it received, if any."""
+    if resume is None:
+        return iq_ring.subscribe(name=request.remote_addr)
+    return iq_ring.subscribe(resume + 1, name=request.remote_addr)
+
+
+def resume_seq(since, last_event_id=None):
+    """Sequence to resume after: a bad ?since= raises ValueError, a bad Last-Event-ID
+    (sent back by the browser from another server run) is ignored."""
+    seq = parse_seq(since)
+    if seq is None:
+        try:
+            seq = parse_seq(last_event_id)
+        except ValueError:
+            seq = None
+    return seq
 
 
 @app.route('/iq_stream')
 def iq_stream():
-    return Response(stream_with_context(iq_stream_generator()), mimetype='text/event-stream')
+    try:
+        resume = resume_seq(request.args.get('since'), request.headers.get('Last-Event-ID'))
+    except ValueError as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 400
+    sub = subscribe_iq(resume)
+    return Response(stream_with_context(iq_stream_generator(sub)), mimetype='text/event-stream')
+
+
+@app.route('/iq_stream_bin')
+def iq_stream_bin():
+    """Binary IQ stream: consecutive frames, ?format=float32 (default) or int16, ?since=<seq> to resume."""
+    fmt = FMT_INT16 if request.args.get('format') == 'int16' else FMT_FLOAT32
+    try:
+        resume = parse_seq(request.args.get('since'))
+    except ValueError as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 400
+    sub = subscribe_iq(resume)
+    return Response(stream_with_context(iq_frame_generator(sub, fmt)), mimetype='application/octet-stream')
+
+
+@app.route('/waterfall')
+def waterfall_rows():
+    """Waterfall rows newer than ?since=<row seq> as binary.
+
+    ?format=db (float32 dB, default), u8 (palette index between ?floor and
+    ?ceil dB) or rgb (u8 through the viridis colour table). ?source=tx is the
+    signal the device transmits (streams, repeated waveforms and file
+    playback), ?source=stream the /start_iq_stream test stream; the default
+    is tx while there is one. Row layout and range are given in the X-* headers.
+    """
+    source = request.args.get('source', 'tx' if tx_waterfall is not None else 'stream')
+    if source not in ('tx', 'stream'):
+        return jsonify({"status": "error", "message": "source must be tx or stream"}), 400
+    wf = tx_waterfall if source == 'tx' else iq_waterfall
+    if wf is None:
+        message = "no IQ output running" if source == 'tx' else "IQ stream not started"
+        return jsonify({"status": "error", "message": message}), 400
+    try:
+        since = parse_seq(request.args.get('since'))
+        floor, ceil = float(request.args.get('floor', -120)), float(request.args.get('ceil', 0))
+    except ValueError as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 400
+    fmt = request.args.get('format', 'db')
+    first, rows = wf.rows_since(since)
+    if fmt == 'db':
+        body = rows.astype('<f4').tobytes()
+    elif fmt in ('u8', 'rgb'):
+        idx = quantize_db(rows, floor, ceil)
+        body = (colormap_lut()[idx] if fmt == 'rgb' else idx).tobytes()
+    else:
+        return jsonify({"status": "error", "message": "format must be db, u8 or rgb"}), 400
+    headers = {"X-First-Row": str(first), "X-Rows": str(len(rows)), "X-Width": str(wf.width),
+               "X-Freq-Start": str(float(wf.freqs[0])), "X-Freq-Stop": str(float(wf.freqs[-1])),
+               "X-Source": source}
+    return Response(body, mimetype='application/octet-stream', headers=headers)
+
+
+@app.route('/iq_stream_status')
+def iq_stream_status():
+    return jsonify(iq_ring.stats())
 
 
 @app.route("/")
@@ -200,69 +436,132 @@ def start():
 
     try:
         dev = open_device()
-        vsg.vsg_set_level(dev, level)
+        busy = default_unit_in_scenario()
+        if busy:
+            return busy
+        setup_call('vsg_set_level', level)
         # enable RF output
-        vsg.vsg_set_RF_output_state(dev, 1)
+        setup_call('vsg_set_RF_output_state', 1)
 
         if mode == "cw":
-            vsg.vsg_set_frequency(dev, freq)
-            vsg.vsg_output_CW(dev)
+            setup_call('vsg_set_frequency', freq)
+            setup_call('vsg_output_CW')
+            watch_output(None)
+            hold_output("cw")
             return jsonify({"status": "ok", "mode": "cw"})
 
         if mode == "iq":
             # IQ mode: generate waveform and repeat it on the device
-            vsg.vsg_set_frequency(dev, freq)
-            iq = generate_iq(tone_freq, sample_rate, iq_length)
+            setup_call('vsg_set_frequency', freq)
+            key = waveform_key([{"type": "tone", "tone_freq": tone_freq}], sample_rate, iq_length)
+            iq = waveform_cache.get_or_create(key, lambda: generate_iq(tone_freq, sample_rate, iq_length))
             # send waveform to device and request repeat
-            vsg.vsg_repeat_waveform(dev, iq, iq_length)
+            setup_call('vsg_repeat_waveform', iq, iq_length)
+            watch_output(sample_rate, iq)
+            hold_output("iq")
             return jsonify({"status": "ok", "mode": "iq", "samples": iq_length})
 
         if mode == "sweep":
-            # start a background sweep thread that updates frequency
+            # "sweep_mode": "digital" synthesizes the sweep in IQ, "lo" retunes the LO from a
+            # background thread; "auto" (default) goes digital when the span fits the sample rate
             bandwidth = float(data.get("bandwidth", 1e6))
             sweep_speed = float(data.get("sweep_speed", 1e6))  # Hz per second
-            global sweep_thread, sweep_stop
-            if sweep_thread and sweep_thread.is_alive():
+            if not sweep_speed > 0:
+                return jsonify({"status": "error", "message": "sweep_speed must be positive"}), 400
+            sweep_mode = data.get("sweep_mode", "auto")
+            shape = SWEEP_SHAPES.get(data.get("sweep_shape", "triangle"))
+            if shape is None:
+                return jsonify({"status": "error", "message": "sweep_shape must be one of "
+                                + ", ".join(SWEEP_SHAPES)}), 400
+            global sweep_runner, sweep_digital, stream_engine
+            if sweep_runner is not None and sweep_runner.running or sweep_digital is not None:
                 return jsonify({"status": "error", "message": "Sweep already running"}), 400
 
-            sweep_stop = threading.Event()
-
-            def sweep_worker(handle, center_freq, bw, speed, stop_event):
-                half = bw / 2.0
-                f_min = center_freq - half
-                f_max = center_freq + half
-                # update every 50 ms
-                interval = 0.05
-                step = speed * interval
-                current = f_min
-                direction = 1
-                try:
-                    vsg.vsg_set_frequency(handle, current)
-                    vsg.vsg_set_RF_output_state(handle, 1)
-                    vsg.vsg_output_CW(handle)
-                except Exception:
-                    pass
-                while not stop_event.is_set():
-                    try:
-                        vsg.vsg_set_frequency(handle, current)
-                        # update shared current frequency for UI polling
-                        with sweep_lock:
-                            global sweep_current_freq
-                            sweep_current_freq = current
-                    except Exception:
-                        pass
-                    time.sleep(interval)
-                    current += direction * step
-                    if current >= f_max:
-                        current = f_max
-                        direction = -1
-                    elif current <= f_min:
-                        current = f_min
-                        direction = 1
-
-            sweep_thread = threading.Thread(target=sweep_worker, args=(dev, freq, bandwidth, sweep_speed, sweep_stop), daemon=True)
-            sweep_thread.start()
-            return jsonify({"status": "ok", "mode": "sweep", "bandwidth": bandwidth, "sweep_speed": sweep_speed})
+            if "sample_rate" not in data:
+                sample_rate = min(MAX_SAMPLE_RATE, max(sample_rate, bandwidth / SWEEP_USABLE_BANDWIDTH))
+            fits = bandwidth <= SWEEP_USABLE_BANDWIDTH * sample_rate
+            if sweep_mode == "digital" and not fits:
+                return jsonify({"status": "error", "message": "bandwidth exceeds the usable bandwidth of the "
+                                "sample rate; use sweep_mode lo"}), 400
+            if sweep_mode != "lo" and fits:
+                if stream_engine is not None and stream_engine.running:
+                    return jsonify({"status": "error", "message": "Stream already running"}), 400
+                period = float(data.get("sweep_period", sweep_period(shape, bandwidth, sweep_speed)))
+                samples = max(1, int(round(period * sample_rate)))
+                output = data.get("sweep_output", "loop" if samples <= MAX_LOOP_SAMPLES else "stream")
+                setup_call('vsg_set_frequency', freq)
+                setup_call('vsg_set_sample_rate', sample_rate)
+                if output == "loop":
+                    key = waveform_key([{"type": "sweep", "shape": shape, "bandwidth": bandwidth}],
+                                       sample_rate, samples, carrier=freq)
+                    iq = waveform_cache.get_or_create(
+                        key, lambda: generate_sweep(shape, bandwidth, period, sample_rate, freq))
+                    setup_call('vsg_repeat_waveform', iq, samples)
+                    watch_output(sample_rate, iq)
+                    hold_output("sweep")
+                else:
+                    source = SweepNCO(0.0, bandwidth, period, sample_rate, shape=shape, carrier=freq)
+                    stream_engine = StreamingEngine(vsg, dev, source, monitor=watch_output(sample_rate).feed)
+                    stream_engine.start()
+                    hold_output(None)
+                with sweep_lock:
+                    # a looped period is closed by nudging its centre off the carrier
+                    center = freq
+                    if output == "loop":
+                        center += closed_sweep_center(shape, 0.0, bandwidth, samples, sample_rate, freq)
+                    sweep_digital = {"shape": shape, "center": center, "carrier": freq, "bandwidth": bandwidth,
+                                     "period": period, "sample_rate": sample_rate, "output": output,
+                                     "started": time.monotonic()}
+                return jsonify({"status": "ok", "mode": "sweep", "sweep_mode": "digital", "shape": shape,
+                                "bandwidth": bandwidth, "sample_rate": sample_rate, "period": period,
+                                "samples": samples, "output": output})
+
+            # LO sweep: a precomputed plan stepped on a monotonic deadline grid
+            kind = data.get("sweep_plan", "log" if shape == "log" else "linear")
+            if kind not in PLANS:
+                return jsonify({"status": "error", "message": "sweep_plan must be one of " + ", ".join(PLANS)}), 400
+            dwell = float(data.get("sweep_dwell", 0.05))
+            # default step: the distance sweep_speed covers in one dwell (in 50 ms when free running)
+            step = sweep_speed * (dwell or 0.05)
+            points = int(data.get("sweep_points") or max(2, round(bandwidth / step) + 1))
+            if points > MAX_SWEEP_POINTS:
+                return jsonify({"status": "error", "message": f"sweep plan exceeds {MAX_SWEEP_POINTS} points"}), 400
+            try:
+                plan = plan_frequencies(kind, freq - bandwidth / 2, freq + bandwidth / 2, points,
+                                        freqs=data.get("sweep_list"), bounce=shape in ("triangle", "sine"),
+                                        seed=data.get("seed"))
+            except ValueError as exc:
+                return jsonify({"status": "error", "message": str(exc)}), 400
+            if plan.size > MAX_SWEEP_POINTS:
+                return jsonify({"status": "error", "message": f"sweep plan exceeds {MAX_SWEEP_POINTS} points"}), 400
+            cycles = data.get("sweep_cycles")
+            setup_call('vsg_set_frequency', float(plan[0]))
+            setup_call('vsg_output_CW')
+            watch_output(None)
+            sweep_runner = SweepRunner(plan, dwell, lambda f: device_call('vsg_set_frequency', f),
+                                       cycles=int(cycles) if cycles is not None else None)
+            sweep_runner.start()
+            hold_output(None)
+            return jsonify({"status": "ok", "mode": "sweep", "sweep_mode": "lo", "bandwidth": bandwidth,
+                            "sweep_speed": sweep_speed, "sweep_plan": kind, "points": int(plan.size),
+                            "dwell": dwell})
+
+        if mode == "stream":
+            # Stream a composite of data['signals'] in blocks via vsg_submit_IQ
+            if stream_engine is not None and stream_engine.running:
+                return jsonify({"status": "error", "message": "Stream already running"}), 400
+            signals = data.get("signals") or [{"type": "cw", "freq_offset": tone_freq, "gain_dbm": 0.0}]
+            duration = data.get("duration")
+            total = int(float(duration) * sample_rate) if duration is not None else None
+            block_size = int(data.get("block_size", DEFAULT_BLOCK_SIZE))
+            setup_call('vsg_set_frequency', freq)
+            setup_call('vsg_set_sample_rate', sample_rate)
+            source = CompositeBlockSource(signals, sample_rate, seed=data.get("seed"))
+            stream_engine = StreamingEngine(vsg, dev, source, block_size=block_size, total_samples=total,
+                                            monitor=watch_output(sample_rate).feed)
+            stream_engine.start()
+            hold_output(None)
+            return jsonify({"status": "ok", "mode": "stream", "block_size": block_size, "samples": total})
 
         return jsonify({"status": "error", "message": "Unknown mode"}), 400
 
@@ -272,26 +571,53 @@ def start():
 
 @app.route('/play_iq_file', methods=['POST'])
 def play_iq_file():
-    """Play an IQ file (raw interleaved float32) on the device in repeat mode.
+    """Play an IQ file (raw interleaved float32) on the device.
 
-    JSON body: {"path": "relative/or/absolute/path/to/file.iq", "frequency": <Hz>, "level": <dBm>}
+    JSON body: {"path": "relative/or/absolute/path/to/file.iq", "frequency": <Hz>, "level": <dBm>,
+                "mode": "repeat"|"stream", "sample_rate": <Hz>, "loop": <bool>, "block_size": <samples>}
+
+    "repeat" (default) hands the whole file to vsg_repeat_waveform. "stream"
+    submits the memory-mapped file in blocks through vsg_submit_IQ, so files
+    larger than RAM play without being loaded; "loop" restarts at the end.
     """
+    global stream_engine
     data = request.json or {}
     path = data.get('path')
     if not path:
         return jsonify({"status": "error", "message": "path required"}), 400
     freq = float(data.get('frequency', 1e9))
     level = float(data.get('level', -10.0))
+    mode = data.get('mode', 'repeat')
     try:
         dev = open_device()
+        busy = default_unit_in_scenario()
+        if busy:
+            return busy
         # set level and enable RF
-        vsg.vsg_set_level(dev, level)
-        vsg.vsg_set_RF_output_state(dev, 1)
-        vsg.vsg_set_frequency(dev, freq)
+        setup_call('vsg_set_level', level)
+        setup_call('vsg_set_RF_output_state', 1)
+        setup_call('vsg_set_frequency', freq)
+
+        if mode == 'stream':
+            if stream_engine is not None and stream_engine.running:
+                return jsonify({"status": "error", "message": "Stream already running"}), 400
+            iq_file = IQFile(path)
+            if data.get('sample_rate') is not None:
+                setup_call('vsg_set_sample_rate', float(data['sample_rate']))
+            block_size = int(data.get('block_size', DEFAULT_BLOCK_SIZE))
+            source = IQFileSource(iq_file, loop=bool(data.get('loop', False)))
+            stream_engine = StreamingEngine(vsg, dev, source, block_size=block_size,
+                                            monitor=watch_output(played_rate()).feed)
+            stream_engine.start()
+            hold_output(None)
+            return jsonify({"status": "ok", "path": path, "mode": "stream",
+                            "samples": iq_file.complex_samples, "block_size": block_size})
 
         arr, complex_samples = load_iq_file(path)
         # vsg wrapper expects array and sample count (complex samples)
-        result = vsg.vsg_repeat_waveform(dev, arr, int(complex_samples))
+        result = setup_call('vsg_repeat_waveform', arr, int(complex_samples))
+        watch_output(played_rate(), arr)
+        hold_output("file")
         # include API result for diagnosis
         return jsonify({"status": "ok", "path": path, "samples": int(complex_samples), "vsg_result": result})
     except Exception as exc:
@@ -316,44 +642,69 @@ def upload_iq():
 
 @app.route('/preview_iq', methods=['POST'])
 def preview_iq():
-    """Return a short preview (I and Q lists) for a given uploaded IQ file.
+    """Return a preview (I and Q) of a window of an uploaded IQ file.
+
+    JSON body: {"path": "<path>", "length": <complex samples>, "offset": <start sample>,
+                "width": <points>, "method": "minmax"|"lttb", "format": "json"|"binary"}
 
-    JSON body: {"path": "<path>", "length": <complex samples>}
+    The window wraps around the end of the file. With "width" the window is
+    decimated to about that many points (min/max per column by default), and
+    "index" gives each point's sample position within the window. The binary
+    format returns uint32 positions followed by float32 interleaved I/Q.
     """
     data = request.json or {}
     path = data.get('path')
     length = int(data.get('length', 4096))
     offset = int(data.get('offset', 0))
+    width = int(data.get('width', 0))
+    method = data.get('method', 'minmax')
     if not path:
         return jsonify({"status":"error", "message":"path required"}), 400
+    if method not in ('minmax', 'lttb'):
+        return jsonify({"status":"error", "message":"method must be minmax or lttb"}), 400
     try:
-        arr, complex_samples = load_iq_file(path)
-        n = min(complex_samples, length)
-        # compute start index (complex sample index) with wrap
-        start = offset % complex_samples
-        # create lists by wrapping around file if needed
-        i_list = []
-        q_list = []
-        for k in range(n):
-            idx = (start + k) % complex_samples
-            i_list.append(float(arr[2*idx]))
-            q_list.append(float(arr[2*idx+1]))
-        return jsonify({"status":"ok", "i": i_list, "q": q_list, "samples": n})
+        iq_file = IQFile(path)
+        n = min(iq_file.complex_samples, length)
+        start = offset % iq_file.complex_samples
+        if start + n <= iq_file.complex_samples:
+            window = iq_file.interleaved(start, n).reshape(n, 2)
+        else:
+            window = iq_file.take(start, n).view(np.float32).reshape(n, 2)
+        if width and method == 'lttb':
+            index, points = lttb(window, width)
+        else:
+            index, points = minmax_decimate(window, width)
+        if data.get('format') == 'binary':
+            body = (np.asarray(index, dtype=np.uint32).tobytes()
+                    + np.ascontiguousarray(points, dtype=np.float32).tobytes())
+            return Response(body, mimetype='application/octet-stream',
+                            headers={"X-Samples": str(n), "X-Points": str(len(index))})
+        return jsonify({"status":"ok", "i": points[:, 0].tolist(), "q": points[:, 1].tolist(),
+                        "index": np.asarray(index).tolist(), "samples": n})
     except Exception as exc:
         return jsonify({"status":"error", "message": str(exc)}), 500
 
 
 @app.route("/stop", methods=["POST"])
 def stop():
+    """Stop all output and turn RF off. The device stays open for the next /start
+    unless the body has {"close": true}."""
+    data = request.get_json(silent=True) or {}
     try:
         # stop sweep if running
-        global sweep_thread, sweep_stop
-        if sweep_stop is not None:
-            sweep_stop.set()
-        if sweep_thread is not None:
-            sweep_thread.join(timeout=1.0)
+        global sweep_digital
+        if sweep_runner is not None:
+            sweep_runner.stop()
+        if stream_engine is not None:
+            stream_engine.stop()
+        with sweep_lock:
+            sweep_digital = None
+        with output_lock:
+            output_setup.clear()
+        hold_output(None)
         stop_output()
-        close_device()
+        if data.get("close"):
+            close_device()
         return jsonify({"status": "ok"})
     except Exception as exc:
         return jsonify({"status": "error", "message": str(exc)}), 500
@@ -361,37 +712,278 @@ def stop():
 
 @app.route('/sweep_status')
 def sweep_status():
+    """Sweep state. For LO sweeps this includes step timing statistics (seconds);
+    ?steps=<n> adds the issue time, lateness and command latency of the last n steps.
+    """
     with sweep_lock:
-        f = sweep_current_freq
-    return jsonify({"sweep_active": sweep_thread is not None and sweep_thread.is_alive(), "frequency": f})
+        digital = sweep_digital
+    if digital is not None:
+        # the sweep runs in the waveform, so its position is estimated from the time since it started
+        x = (time.monotonic() - digital["started"]) / digital["period"] % 1.0
+        carrier = digital["carrier"]
+        f = carrier + float(sweep_frequency(digital["shape"], digital["center"] - carrier, digital["bandwidth"], x,
+                                            carrier))
+        return jsonify({"sweep_active": True, "sweep_mode": "digital", "frequency": f,
+                        **{k: v for k, v in digital.items() if k != "started"}})
+    if sweep_runner is None:
+        return jsonify({"sweep_active": False, "frequency": None})
+    out = {"sweep_active": sweep_runner.running, "sweep_mode": "lo", **sweep_runner.stats()}
+    if request.args.get('steps'):
+        issued, late, latency = sweep_runner.history(int(request.args['steps']))
+        out.update(issued=issued.tolist(), late=late.tolist(), latency=latency.tolist())
+    return jsonify(out)
+
+
+@app.route('/stream_status')
+def stream_status():
+    if stream_engine is None:
+        return jsonify({"running": False})
+    out = stream_engine.stats()
+    if hasattr(vsg, 'stats') and device_actor.handle is not None:
+        # simulated backend: device-side buffer and underrun counters
+        out["device"] = vsg.stats(device_actor.handle)
+    return jsonify(out)
+
+
+@app.route('/devices')
+def devices():
+    """Connected units by serial, with the handle and actor statistics of the open ones."""
+    try:
+        return jsonify({"status": "ok", "serials": device_manager.enumerate(),
+                        "open": device_manager.handles(), "actors": device_manager.stats()})
+    except Exception as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 500
+
+
+def scenario_running(unit):
+    """True while a scenario unit owns its output: a sweep or stream while it runs,
+    CW and a repeated waveform until /stop_scenario."""
+    if unit is None:
+        return False
+    workers = [x for x in (unit["runner"], unit["engine"]) if x is not None]
+    return any(x.running for x in workers) if workers else True
+
+
+def default_unit_in_scenario():
+    """The 400 response for /start and /play_iq_file while a scenario owns the default unit, else None."""
+    serial = device_manager.default_serial()
+    with scenario_lock:
+        if scenario_running(scenario_units.get(serial)):
+            return jsonify({"status": "error", "message": f"unit {serial} is running a scenario; "
+                            "stop it with /stop_scenario first"}), 400
+    return None
+
+
+def single_output_running():
+    """True while /start or /play_iq_file owns the default actor's unit: CW and repeated
+    waveforms until /stop, streams and sweeps while they run."""
+    return (held_output is not None or stream_engine is not None and stream_engine.running
+            or sweep_runner is not None and sweep_runner.running or sweep_digital is not None)
+
+
+@app.route('/start_scenario', methods=['POST'])
+def start_scenario():
+    """Drive several units at once.
+
+    JSON body: {"units": [{"serial": <int>, "mode": "cw"|"iq"|"stream"|"sweep", "frequency": <Hz>,
+                           "level": <dBm>, ...}, ...],
+                "sweep": {"serials": [...], "start": <Hz>, "stop": <Hz>, "points": <n>, "dwell": <s>,
+                          "plan": "linear"|"log"|"random", "cycles": <n>, "level": <dBm>}}
+
+    Unit entries take the /start parameters of their mode; a "sweep" unit steps
+    its LO from "sweep_start" to "sweep_stop". The top-level "sweep" splits one
+    span into contiguous segments, one per serial (all connected units by
+    default). The setup commands of all units are queued together and run in
+    parallel on the units' actors, and all sweep segments share one start time.
+    """
+    data = request.json or {}
+    units = [dict(u) for u in data.get("units") or []]
+    try:
+        split = data.get("sweep")
+        if split:
+            serials = split.get("serials") or device_manager.enumerate()
+            points = max(2, int(split.get("points", 101)) // max(1, len(serials)))
+            for serial, (lo, hi) in zip(serials, split_span(float(split["start"]), float(split["stop"]),
+                                                            len(serials))):
+                units.append({"serial": serial, "mode": "sweep", "level": split.get("level", -10.0),
+                              "sweep_start": lo, "sweep_stop": hi, "sweep_points": points,
+                              "sweep_dwell": split.get("dwell", 0.05), "sweep_plan": split.get("plan", "linear"),
+                              "sweep_cycles": split.get("cycles")})
+        if not units:
+            return jsonify({"status": "error", "message": "no units given"}), 400
+        serials = [int(u["serial"]) for u in units]
+    except (KeyError, TypeError, ValueError) as exc:
+        return jsonify({"status": "error", "message": f"bad scenario: {exc}"}), 400
+    except Exception as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 500
+    if len(set(serials)) != len(serials):
+        return jsonify({"status": "error", "message": "each serial may appear once"}), 400
+
+    locks = [device_manager.lock(s) for s in serials]
+    taken = []
+    try:
+        for lock in locks:
+            if not lock.acquire(blocking=False):
+                return jsonify({"status": "error", "message": "a unit is being set up by another request"}), 400
+            taken.append(lock)
+        with scenario_lock:
+            busy = [s for s in serials if scenario_running(scenario_units.get(s))]
+        if single_output_running() and device_manager.default_serial() in serials:
+            busy.append(device_manager.default_serial())
+        if busy:
+            return jsonify({"status": "error", "message": f"units already running: {busy}"}), 400
+
+        commands, outputs = {}, {}
+        for serial, u in zip(serials, units):
+            mode = u.get("mode", "cw")
+            freq = float(u.get("frequency", 1.0e9))
+            sample_rate = float(u.get("sample_rate", 1e6))
+            cmds = [('vsg_set_level', float(u.get("level", -10.0))), ('vsg_set_RF_output_state', 1)]
+            if mode == "cw":
+                cmds += [('vsg_set_frequency', freq), ('vsg_output_CW',)]
+            elif mode == "iq":
+                tone_freq = float(u.get("tone_freq", 100e3))
+                iq_length = int(u.get("iq_length", 16384))
+                key = waveform_key([{"type": "tone", "tone_freq": tone_freq}], sample_rate, iq_length)
+                iq = waveform_cache.get_or_create(
+                    key, lambda: generate_iq(tone_freq, sample_rate, iq_length))
+                cmds += [('vsg_set_frequency', freq), ('vsg_set_sample_rate', sample_rate),
+                         ('vsg_repeat_waveform', iq, iq_length)]
+            elif mode == "stream":
+                signals = u.get("signals") or [{"type": "cw", "freq_offset": float(u.get("tone_freq", 100e3)),
+                                                "gain_dbm": 0.0}]
+                duration = u.get("duration")
+                outputs[serial] = (CompositeBlockSource(signals, sample_rate, seed=u.get("seed")),
+                                   int(u.get("block_size", DEFAULT_BLOCK_SIZE)),
+                                   int(float(duration) * sample_rate) if duration is not None else None)
+                cmds += [('vsg_set_frequency', freq), ('vsg_set_sample_rate', sample_rate)]
+            elif mode == "sweep":
+                kind = u.get("sweep_plan", "linear")
+                if kind not in PLANS:
+                    return jsonify({"status": "error", "message": "sweep_plan must be one of "
+                                    + ", ".join(PLANS)}), 400
+                bandwidth = float(u.get("bandwidth", 1e6))
+                points = int(u.get("sweep_points", 101))
+                if points > MAX_SWEEP_POINTS:
+                    return jsonify({"status": "error",
+                                    "message": f"sweep plan exceeds {MAX_SWEEP_POINTS} points"}), 400
+                try:
+                    plan = plan_frequencies(kind, float(u.get("sweep_start", freq - bandwidth / 2)),
+                                            float(u.get("sweep_stop", freq + bandwidth / 2)), points,
+                                            freqs=u.get("sweep_list"), seed=u.get("seed"))
+                except ValueError as exc:
+                    return jsonify({"status": "error", "message": f"unit {serial}: {exc}"}), 400
+                cycles = u.get("sweep_cycles")
+                outputs[serial] = (plan, float(u.get("sweep_dwell", 0.05)),
+                                   int(cycles) if cycles is not None else None)
+                cmds += [('vsg_set_frequency', float(plan[0])), ('vsg_output_CW',)]
+            else:
+                return jsonify({"status": "error", "message": f"unknown mode '{mode}' for unit {serial}"}), 400
+            commands[serial] = cmds
+
+        handles = device_manager.open(serials)
+        device_manager.run(commands)
+
+        started = {}
+        at = time.monotonic() + SCENARIO_START_DELAY
+        for serial, u in zip(serials, units):
+            unit = {"mode": u.get("mode", "cw"), "runner": None, "engine": None}
+            if unit["mode"] == "sweep":
+                plan, dwell, cycles = outputs[serial]
+                actor = device_manager.actor(serial)
+                unit["runner"] = SweepRunner(plan, dwell, lambda f, a=actor: a.call('vsg_set_frequency', f),
+                                             cycles=cycles)
+                unit["runner"].start(at)
+            elif unit["mode"] == "stream":
+                source, block_size, total = outputs[serial]
+                unit["engine"] = StreamingEngine(vsg, handles[serial], source, block_size=block_size,
+                                                 total_samples=total)
+                unit["engine"].start()
+            started[serial] = unit
+        with scenario_lock:
+            scenario_units.update(started)
+        return jsonify({"status": "ok", "units": {str(s): u["mode"] for s, u in started.items()}})
+    except Exception as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 500
+    finally:
+        for lock in taken:
+            lock.release()
+
+
+@app.route('/stop_scenario', methods=['POST'])
+def stop_scenario():
+    """Stop the scenario on {"serials": [...]} (all scenario units by default), turn their
+    RF off in parallel and close them unless "close" is false."""
+    data = request.json or {}
+    with scenario_lock:
+        serials = [int(s) for s in data.get("serials") or scenario_units]
+        units = [scenario_units.pop(s, None) for s in serials]
+    try:
+        for unit in units:
+            if unit is None:
+                continue
+            for x in (unit["runner"], unit["engine"]):
+                if x is not None:
+                    x.stop()
+        open_units = device_manager.handles()
+        serials = [s for s in serials if s in open_units]
+        device_manager.run({s: [('vsg_abort',), ('vsg_set_RF_output_state', 0)] for s in serials})
+        if data.get("close", True):
+            device_manager.close(serials)
+        return jsonify({"status": "ok", "stopped": serials})
+    except Exception as exc:
+        return jsonify({"status": "error", "message": str(exc)}), 500
+
+
+@app.route('/scenario_status')
+def scenario_status():
+    """Per-unit sweep timing or stream statistics of the scenario units."""
+    with scenario_lock:
+        units = dict(scenario_units)
+    handles = device_manager.handles()
+    out = {}
+    for serial, unit in units.items():
+        entry = {"mode": unit["mode"], "running": scenario_running(unit)}
+        if unit["runner"] is not None:
+            entry["sweep"] = unit["runner"].stats()
+        if unit["engine"] is not None:
+            entry["stream"] = unit["engine"].stats()
+        if hasattr(vsg, 'stats') and serial in handles:
+            entry["device"] = vsg.stats(handles[serial])
+        out[str(serial)] = entry
+    return jsonify({"units": out, "actors": {str(s): v for s, v in device_manager.stats().items()}})
+
+
+@app.route('/cache_status')
+def cache_status():
+    return jsonify(waveform_cache.stats())
 
 
 @app.route('/device_status')
 def device_status():
-    """Return basic device status information to help debugging."""
+    """Device state from the session's cache, so polling it does no device I/O.
+
+    ?open=1 opens the device if it is closed; ?check=1 runs a health check first.
+    """
     if vsg is None:
         return jsonify({"status": "no_vsg_wrapper"})
     try:
-        dev = None
-        try:
-            dev = open_device()
-        except Exception:
-            dev = None
-        info = {}
-        if dev is not None:
+        if request.args.get('open'):
             try:
-                info['serial'] = vsg.vsg_get_serial_number(dev)
+                open_device()
             except Exception:
-                info['serial'] = None
-            try:
-                info['firmware'] = vsg.vsg_get_firmware_version(dev)
-            except Exception:
-                info['firmware'] = None
-            try:
-                info['usb'] = vsg.vsg_get_USB_status(dev)
-            except Exception:
-                info['usb'] = None
-        return jsonify({"status": "ok", "device": info})
+                pass    # the failure is in the session's last_error
+        if request.args.get('check'):
+            device_session.check()
+        session = device_session.status()
+        info = {}
+        if session["info"]:
+            info['serial'] = session["info"].get('vsg_get_serial_number')
+            info['firmware'] = session["info"].get('vsg_get_firmware_version')
+        if session["health"]:
+            info['usb'] = session["health"]["usb"]
+            info['temperature'] = session["health"]["temperature"]
+        return jsonify({"status": "ok", "device": info, "session": session, "actor": device_actor.stats()})
     except Exception as exc:
         return jsonify({"status": "error", "message": str(exc)}), 500
 
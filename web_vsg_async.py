@@ -0,0 +1,197 @@
+"""asyncio (aiohttp) server mode for web_vsg.
+
+The Flask dev server pins one thread per open /iq_stream connection. This
+serves the same routes from a single event loop: live streams are coroutines
+reading their own cursor into web_vsg.iq_ring, woken by one bridge thread, so
+each subscriber costs a socket and a small object rather than a thread.
+
+Control routes run the existing Flask views unchanged on a one-thread device
+executor, so device calls never block the loop and stay serialized, and
+behaviour matches web_vsg.py exactly; each app shuts its executor down on
+cleanup. Preview/status routes use the default executor.
+
+Run: python web_vsg_async.py [port]
+"""
+import asyncio
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+import web_vsg
+from fanout_ring import parse_seq
+from iq_frames import FMT_FLOAT32, FMT_INT16
+
+KEEPALIVE = 5.0  # seconds between SSE keep-alives on an idle stream
+
+
+class RingWaker:
+    """Turns ring publishes (producer thread) into an asyncio wake-up for every stream."""
+
+    def __init__(self, ring, loop):
+        self.ring = ring
+        self.loop = loop
+        self.event = asyncio.Event()
+        self._sub = ring.subscribe(name='async-bridge')
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._sub.closed:
+            if self._sub.get(timeout=1.0) is not None:
+                self.loop.call_soon_threadsafe(self._wake)
+
+    def close(self):
+        self._sub.close()
+
+    def _wake(self):
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    async def next_block(self, sub, timeout):
+        """Next block for sub, or None after timeout."""
+        block = sub.get(timeout=0)
+        if block is not None:
+            return block
+        event = self.event
+        # re-check after taking the event so a publish in between is not missed
+        block = sub.get(timeout=0)
+        if block is not None:
+            return block
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return sub.get(timeout=0)
+
+
+def call_flask_view(view, method='GET', body=None, query=None):
+    """Run a web_vsg Flask view in a request context; returns the Flask response."""
+    with web_vsg.app.test_request_context(method=method, json=body, query_string=query):
+        return web_vsg.app.make_response(view())
+
+
+def to_aiohttp(resp):
+    headers = {k: v for k, v in resp.headers.items() if k.startswith('X-')}
+    return web.Response(body=resp.get_data(), status=resp.status_code,
+                        content_type=resp.mimetype, headers=headers)
+
+
+def flask_route(view, executor=None):
+    """aiohttp handler running `view` off the event loop."""
+    async def handler(request):
+        body = None
+        if request.can_read_body:
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+        loop = asyncio.get_running_loop()
+        resp = await loop.run_in_executor(executor, call_flask_view, view, request.method, body,
+                                          request.query_string)
+        return to_aiohttp(resp)
+    return handler
+
+
+def subscribe(request, resume):
+    if resume is None:
+        return web_vsg.iq_ring.subscribe(name=request.remote)
+    return web_vsg.iq_ring.subscribe(resume + 1, name=request.remote)
+
+
+def bad_request(exc):
+    return web.json_response({"status": "error", "message": str(exc)}, status=400)
+
+
+async def iq_stream(request):
+    try:
+        resume = web_vsg.resume_seq(request.query.get('since'), request.headers.get('Last-Event-ID'))
+    except ValueError as exc:
+        return bad_request(exc)
+    sub = subscribe(request, resume)
+    resp = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+    await resp.prepare(request)
+    waker = request.app[WAKER]
+    try:
+        while True:
+            block = await waker.next_block(sub, KEEPALIVE)
+            if block is None:
+                data = json.dumps({"keep": True, "lag": sub.lag, "dropped": sub.dropped})
+                await resp.write(f"data: {data}\n\n".encode())
+                continue
+            await resp.write(f"id: {block.seq}\ndata: {block.json()}\n\n".encode())
+    except ConnectionResetError:
+        pass
+    finally:
+        sub.close()
+    return resp
+
+
+async def iq_stream_bin(request):
+    fmt = FMT_INT16 if request.query.get('format') == 'int16' else FMT_FLOAT32
+    try:
+        resume = parse_seq(request.query.get('since'))
+    except ValueError as exc:
+        return bad_request(exc)
+    sub = subscribe(request, resume)
+    resp = web.StreamResponse(headers={'Content-Type': 'application/octet-stream'})
+    await resp.prepare(request)
+    waker = request.app[WAKER]
+    try:
+        while True:
+            block = await waker.next_block(sub, KEEPALIVE)
+            if block is not None:
+                await resp.write(block.frame(fmt))
+    except ConnectionResetError:
+        pass
+    finally:
+        sub.close()
+    return resp
+
+
+WAKER = web.AppKey('waker', RingWaker)
+DEVICE_EXECUTOR = web.AppKey('device_executor', ThreadPoolExecutor)
+
+
+async def on_startup(app):
+    app[WAKER] = RingWaker(web_vsg.iq_ring, asyncio.get_running_loop())
+
+
+async def on_cleanup(app):
+    app[WAKER].close()
+    # lets a running control route finish, then ends the worker thread
+    app[DEVICE_EXECUTOR].shutdown(wait=True)
+
+
+def make_app():
+    app = web.Application()
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    # one worker: control routes run one at a time (device calls themselves go through web_vsg.device_actor)
+    device = app[DEVICE_EXECUTOR] = ThreadPoolExecutor(max_workers=1, thread_name_prefix='vsg-device')
+    app.router.add_post('/start', flask_route(web_vsg.start, device))
+    app.router.add_post('/stop', flask_route(web_vsg.stop, device))
+    app.router.add_post('/play_iq_file', flask_route(web_vsg.play_iq_file, device))
+    app.router.add_get('/device_status', flask_route(web_vsg.device_status))
+    app.router.add_get('/devices', flask_route(web_vsg.devices))
+    app.router.add_post('/start_scenario', flask_route(web_vsg.start_scenario, device))
+    app.router.add_post('/stop_scenario', flask_route(web_vsg.stop_scenario, device))
+    app.router.add_get('/scenario_status', flask_route(web_vsg.scenario_status))
+    app.router.add_post('/start_iq_stream', flask_route(web_vsg.start_iq_stream))
+    app.router.add_post('/stop_iq_stream', flask_route(web_vsg.stop_iq_stream))
+    app.router.add_post('/preview_iq', flask_route(web_vsg.preview_iq))
+    app.router.add_get('/sweep_status', flask_route(web_vsg.sweep_status))
+    app.router.add_get('/stream_status', flask_route(web_vsg.stream_status))
+    app.router.add_get('/cache_status', flask_route(web_vsg.cache_status))
+    app.router.add_get('/iq_stream_status', flask_route(web_vsg.iq_stream_status))
+    app.router.add_get('/waterfall', flask_route(web_vsg.waterfall_rows))
+    app.router.add_get('/iq_stream', iq_stream)
+    app.router.add_get('/iq_stream_bin', iq_stream_bin)
+    return app
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    web.run_app(make_app(), host="0.0.0.0", port=port)
@@ -1,15 +1,24 @@
 import ctypes
 import os
 from ctypes import byref, c_int, c_double
-from flask import Flask, render_template_string, request, redirect, url_for, Response
+from flask import Flask, render_template_string, request, redirect, url_for, Response, jsonify
 import numpy as np
-import matplotlib.pyplot as plt
-import io
-import base64
 import threading
 import time
 import math
 import random
+import sys
+
+# shared generator modules live in the project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+import hopping
+import pulse_train
+import resampler
+from waveform_cache import WaveformCache, waveform_key
+from spectrum import SpectrumService
+from trace_renderer import TraceRenderer
 
 app = Flask(__name__)
 vsg_status = {'dll_loaded': False, 'device_opened': False, 'error': '', 'handle': c_int(-1)}
@@ -62,11 +71,8 @@ def generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, freq
         symbols = np.exp(1j * (np.pi/8 + np.pi/4 * bits))
     else:
         raise ValueError('Unsupported PSK type')
-    upsampled = np.zeros(num_symbols * sps, dtype=np.complex64)
-    upsampled[::sps] = symbols
-    num_taps = 11 * sps
-    rrc = rrc_filter(num_taps, rolloff, sps)
-    shaped = np.convolve(upsampled, rrc, mode='same')
+    # polyphase RRC at the symbol rate, resampled to the exact sample rate (see resampler.py)
+    shaped = resampler.shape_to_rate(symbols, symrate, rolloff, 11, sample_rate, sps=sps)
     shaped /= np.max(np.abs(shaped))
     t = np.arange(len(shaped)) / sample_rate
     shaped *= np.exp(2j * np.pi * freq_offset * t)
@@ -82,10 +88,8 @@ def generate_tdma_psk_slots(center_freq, gain_dbm, sample_rate, num_samples, num
         mod_type = 'qpsk'
         rolloff = 0.35
         symrate = 1e6
-        sps = int(sample_rate / symrate)
-        if sps < 2:
-            sps = 2
-        num_symbols = int(num_samples / sps)
+        sps, _ = resampler.shaping_sps(sample_rate, symrate)
+        num_symbols = int(np.ceil(num_samples * symrate / sample_rate))
         psk = generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, freq_offset, gain_dbm)
         if len(psk) > num_samples:
             psk = psk[:num_samples]
@@ -108,27 +112,15 @@ def generate_sweeping_cw(freq_offset, gain_dbm, sample_rate, num_samples, sweep_
     amp = 10**(gain_dbm/20)
     return amp * np.exp(2j * np.pi * sweep_freq * t)
 
-def generate_freq_hopping_cw(center_freq, gain_dbm, sample_rate, num_samples, hop_bw, num_slots, hop_rate):
+def generate_freq_hopping_cw(center_freq, gain_dbm, sample_rate, num_samples, hop_bw, num_slots, hop_rate,
+                             seed=None, dwell_jitter=0.0, guard_time=0.0):
     # center_freq: center frequency offset (Hz)
     # hop_bw: total hopping bandwidth (Hz)
     # num_slots: number of frequency slots
     # hop_rate: hops per second
-    t = np.arange(num_samples) / sample_rate
-    slot_width = hop_bw / num_slots
-    slot_freqs = [center_freq - hop_bw/2 + slot_width/2 + i*slot_width for i in range(num_slots)]
-    hop_period = 1.0 / hop_rate
-    slot_indices = np.zeros(num_samples, dtype=int)
-    current_slot = random.randint(0, num_slots-1)
-    next_hop_time = hop_period
-    for i in range(num_samples):
-        if i / sample_rate >= next_hop_time:
-            current_slot = random.randint(0, num_slots-1)
-            next_hop_time += hop_period
-        slot_indices[i] = current_slot
-    inst_freq = np.array([slot_freqs[idx] for idx in slot_indices])
-    phase = 2 * np.pi * np.cumsum(inst_freq) / sample_rate
-    amp = 10**(gain_dbm/20)
-    return amp * np.exp(1j * phase)
+    # Hop boundaries are scheduled once and filled per dwell (see hopping.py)
+    return hopping.generate_freq_hopping_cw(center_freq, gain_dbm, sample_rate, num_samples, hop_bw, num_slots,
+                                            hop_rate, seed=seed, dwell_jitter=dwell_jitter, guard_time=guard_time)
 
 def generate_composite_iq(signals, sample_rate, duration=0.01):
     num_samples = int(sample_rate * duration)
@@ -147,10 +139,8 @@ def generate_composite_iq(signals, sample_rate, duration=0.01):
             mod_type = sig.get('mod_type', 'qpsk')
             rolloff = sig.get('rolloff', 0.35)
             symrate = sig.get('symrate', 1e6)
-            sps = int(sample_rate / symrate)
-            if sps < 2:
-                sps = 2
-            num_symbols = int(num_samples / sps)
+            sps, _ = resampler.shaping_sps(sample_rate, symrate)
+            num_symbols = int(np.ceil(num_samples * symrate / sample_rate))
             psk = generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, sig['freq_offset'], sig['gain_dbm'])
             if len(psk) > num_samples:
                 psk = psk[:num_samples]
@@ -167,7 +157,9 @@ def generate_composite_iq(signals, sample_rate, duration=0.01):
             hop_bw = sig.get('hop_bw', 1e6)
             num_slots = sig.get('num_slots', 8)
             hop_rate = sig.get('hop_rate', 100)
-            iq += generate_freq_hopping_cw(sig['freq_offset'], sig['gain_dbm'], sample_rate, num_samples, hop_bw, num_slots, hop_rate)
+            iq += generate_freq_hopping_cw(sig['freq_offset'], sig['gain_dbm'], sample_rate, num_samples, hop_bw, num_slots, hop_rate,
+                                           seed=sig.get('seed'), dwell_jitter=sig.get('dwell_jitter', 0.0),
+                                           guard_time=sig.get('guard_time', 0.0))
         elif sig['type'] == 'tdma':
             # TDMA Sim: use generate_tdma_psk_slots
             num_slots = sig.get('num_slots', 4)
@@ -190,23 +182,24 @@ def generate_composite_iq(signals, sample_rate, duration=0.01):
     return iq
 
 def apply_pulse_envelope(iq, sample_rate, pulse_width, pulse_freq):
-    num_samples = len(iq)
-    t = np.arange(num_samples) / sample_rate
-    period = 1.0 / pulse_freq
-    pulse_samples = int(pulse_width * sample_rate)
-    env = np.zeros(num_samples)
-    for i in range(num_samples):
-        in_pulse = (t[i] % period) < pulse_width
-        env[i] = 1.0 if in_pulse else 0.0
-    return iq * env
+    # Envelope is built from pulse edges and tiled, no per-sample loop (see pulse_train.py)
+    return pulse_train.apply_pulse_envelope(np.asarray(iq, dtype=np.complex64), sample_rate, pulse_width, pulse_freq)
+
+# Generated composites, keyed by the signal list, so unchanged scenarios are not regenerated
+waveform_cache = WaveformCache(max_bytes=256 * 1024 * 1024)
+
+def cached_composite_iq(signals, sample_rate, duration=0.01):
+    """generate_composite_iq through the waveform cache; returns (key, float32 interleaved IQ)."""
+    signals = [dict(sig) for sig in signals]
+    key = waveform_key(signals, sample_rate, duration)
+    iq = waveform_cache.get_or_create(key, lambda: generate_composite_iq(signals, sample_rate, duration))
+    return key, iq
 
 # Helper to send composite IQ to VSG (if available)
 def vsg_transmit_composite(signals, sample_rate, handle, vsg):
     try:
-        iq = generate_composite_iq(signals, sample_rate)
-        iq_interleaved = np.empty(2 * len(iq), dtype=np.float32)
-        iq_interleaved[0::2] = np.real(iq)
-        iq_interleaved[1::2] = np.imag(iq)
+        _, iq_interleaved = cached_composite_iq(signals, sample_rate)
+        iq = iq_interleaved.view(np.complex64)
         vsg.vsgRepeatWaveform.restype = ctypes.c_int
         vsg.vsgRepeatWaveform.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_float), ctypes.c_int]
         arr = iq_interleaved.ctypes.data_as(ctypes.POINTER(ctypes.c_float))
@@ -228,28 +221,30 @@ composite_iq_enabled = {'state': False}
 single_cw_enabled = False
 
 # --- Real-time spectrum update ---
-spectrum_img_b64 = ''
+spectrum_png = b''
+spectrum_trace = {'freqs': [], 'power': []}
 update_interval = 0.5  # seconds
+SPECTRUM_RBW = 10e3
+SPECTRUM_WIDTH = 1001  # trace points, about one per pixel column
+# one persistent figure; each refresh only redraws the trace line
+spectrum_renderer = TraceRenderer('CW/PSK Composite Spectrum', 'Frequency (MHz)', 'Power (dB)')
 
 def spectrum_update_loop():
-    global spectrum_img_b64
+    global spectrum_png, spectrum_trace
+    last_key = None
     while True:
-        iq = generate_composite_iq(data['signals'], data['sample_rate'])
-        spectrum = np.fft.fftshift(np.fft.fft(iq))
-        freqs = np.fft.fftshift(np.fft.fftfreq(len(iq), d=1.0/data['sample_rate']))
-        power = 20 * np.log10(np.abs(spectrum) + 1e-12)
-        fig, ax = plt.subplots(figsize=(8,4))
-        ax.plot(freqs/1e6, power)
-        ax.set_xlabel('Frequency (MHz)')
-        ax.set_ylabel('Power (dB)')
-        ax.set_title('CW/PSK Composite Spectrum')
-        ax.grid(True)
-        buf = io.BytesIO()
-        plt.tight_layout()
-        plt.savefig(buf, format='png')
-        plt.close(fig)
-        buf.seek(0)
-        spectrum_img_b64 = base64.b64encode(buf.read()).decode('ascii')
+        key, iq = cached_composite_iq(data['signals'], data['sample_rate'])
+        if key == last_key:
+            # nothing changed since the last plot
+            time.sleep(update_interval)
+            continue
+        last_key = key
+        service = SpectrumService(data['sample_rate'], rbw=SPECTRUM_RBW)
+        service.update(iq.view(np.complex64))
+        freqs, power = service.trace_db(SPECTRUM_WIDTH)
+        spectrum_renderer.update(freqs/1e6, power)
+        spectrum_png = spectrum_renderer.png()
+        spectrum_trace = {'freqs': (freqs/1e6).tolist(), 'power': power.tolist()}
         time.sleep(update_interval)
 
 threading.Thread(target=spectrum_update_loop, daemon=True).start()
@@ -525,13 +520,13 @@ def index():
 
 @app.route('/spectrum_img')
 def spectrum_img():
-    global spectrum_img_b64
     # Return the actual PNG image, not an HTML tag
-    if spectrum_img_b64:
-        img_bytes = base64.b64decode(spectrum_img_b64)
-        return Response(img_bytes, mimetype='image/png')
-    else:
-        return Response('', mimetype='image/png')
+    return Response(spectrum_png, mimetype='image/png')
+
+@app.route('/spectrum_trace')
+def spectrum_trace_route():
+    # decimated trace for drawing in the browser instead of fetching PNGs
+    return jsonify(spectrum_trace)
 
 @app.route('/edit_signal/<int:index>', methods=['GET', 'POST'])
 def edit_signal_route(index):
@@ -1,4 +1,5 @@
 import ctypes
+import functools
 import os
 from ctypes import byref, c_int, c_double
 from flask import Flask, render_template, render_template_string, request, redirect, url_for, jsonify, send_file
@@ -6,7 +7,19 @@ import numpy as np
 import threading
 import time
 import random
+import sys
 import scipy.signal
+
+# shared generator modules live in the project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+import pulse_shaping
+import resampler
+from composite import IncrementalComposite
+from spectrum import SpectrumService
+from trace_renderer import TraceRenderer
+from waveform_cache import WaveformCache, waveform_key
 from flask_socketio import SocketIO, emit
 
 app = Flask(__name__)
@@ -92,19 +105,18 @@ def generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, freq
         symbols = np.exp(1j * (np.pi/8 + np.pi/4 * bits))
     else:
         raise ValueError('Unsupported PSK type')
-    upsampled = np.zeros(num_symbols * sps, dtype=np.complex64)
-    upsampled[::sps] = symbols
     num_taps = 41 * sps  # More taps for better filtering
-    rrc = rrc_filter(num_taps, rolloff, sps)
+    rrc = pulse_shaping.rrc_taps(rolloff, sps, 41)
     print(f"[PSK] sps={sps}, num_taps={num_taps}, rrc sum={np.sum(rrc):.4f}, max={np.max(rrc):.4f}, min={np.min(rrc):.4f}")
-    shaped = np.convolve(upsampled, rrc, mode='same')
+    # polyphase RRC at the symbol rate, resampled to the exact sample rate (see resampler.py)
+    shaped = resampler.shape_to_rate(symbols, symrate, rolloff, 41, sample_rate, sps=sps)
     shaped /= np.max(np.abs(shaped))
     t = np.arange(len(shaped)) / sample_rate
     shaped *= np.exp(2j * np.pi * freq_offset * t)
     shaped *= 10**(gain_dbm/20)
     return shaped
 
-def generate_composite_iq(signals, sample_rate, duration=None):
+def composite_duration(signals, duration=None):
     # If duration is None, for sweeping_cw, use one sweep period
     if duration is None:
         for sig in signals:
@@ -116,40 +128,42 @@ def generate_composite_iq(signals, sample_rate, duration=None):
                 break
         if duration is None:
             duration = 0.01
-    num_samples = int(sample_rate * duration)
-    iq = np.zeros(num_samples, dtype=np.complex64)
-    for sig in signals:
-        if not sig.get('enabled', True):
-            continue
-        if sig['type'] == 'cw':
-            iq += generate_cw(sig['freq_offset'], sig['gain_dbm'], sample_rate, num_samples)
-        elif sig['type'] == 'sweeping_cw':
-            sweep_bw = sig.get('sweep_bw', 1e6)
-            sweep_speed = sig.get('sweep_speed', 100)
-            sweep_iq = generate_sweeping_cw(sig['freq_offset'], sig['gain_dbm'], sample_rate, sweep_bw, sweep_speed)
-            if len(sweep_iq) > num_samples:
-                sweep_iq = sweep_iq[:num_samples]
-            elif len(sweep_iq) < num_samples:
-                sweep_iq = np.pad(sweep_iq, (0, num_samples - len(sweep_iq)))
-            iq += sweep_iq
-        elif sig['type'] == 'psk':
-            mod_type = sig.get('mod_type', 'qpsk')
-            rolloff = sig.get('rolloff', 0.35)
-            symrate = sig.get('symrate', 1e6)
-            sps = int(sample_rate / symrate)
-            if sps < 8:
-                sps = 8
-            num_symbols = int(num_samples / sps)
-            psk = generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, sig['freq_offset'], sig['gain_dbm'])
-            if len(psk) > num_samples:
-                psk = psk[:num_samples]
-            elif len(psk) < num_samples:
-                psk = np.pad(psk, (0, num_samples - len(psk)))
-            iq += psk
-    if np.max(np.abs(iq)) > 0:
-        iq /= np.max(np.abs(iq))
+    return duration
+
+def generate_component(sig, sample_rate, num_samples):
+    """One signal of the composite, num_samples long (zeros for unknown types)."""
+    if sig['type'] == 'cw':
+        return generate_cw(sig['freq_offset'], sig['gain_dbm'], sample_rate, num_samples)
+    if sig['type'] == 'sweeping_cw':
+        sweep_bw = sig.get('sweep_bw', 1e6)
+        sweep_speed = sig.get('sweep_speed', 100)
+        iq = generate_sweeping_cw(sig['freq_offset'], sig['gain_dbm'], sample_rate, sweep_bw, sweep_speed)
+    elif sig['type'] == 'psk':
+        mod_type = sig.get('mod_type', 'qpsk')
+        rolloff = sig.get('rolloff', 0.35)
+        symrate = sig.get('symrate', 1e6)
+        sps, _ = resampler.shaping_sps(sample_rate, symrate, min_sps=8)
+        num_symbols = int(np.ceil(num_samples * symrate / sample_rate))
+        iq = generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, sig['freq_offset'], sig['gain_dbm'])
+    else:
+        return np.zeros(num_samples, dtype=np.complex64)
+    if len(iq) > num_samples:
+        iq = iq[:num_samples]
+    elif len(iq) < num_samples:
+        iq = np.pad(iq, (0, num_samples - len(iq)))
     return iq
 
+# Generated components and composites share one cache (and one memory budget), so
+# unchanged scenarios are not regenerated and nothing is held twice
+waveform_cache = WaveformCache(max_bytes=256 * 1024 * 1024)
+
+# Per-signal components and their running sum; an edit only generates the changed signal
+composite = IncrementalComposite(generate_component, cache=waveform_cache)
+
+def generate_composite_iq(signals, sample_rate, duration=None):
+    num_samples = int(sample_rate * composite_duration(signals, duration))
+    return composite.normalized(signals, sample_rate, num_samples)
+
 data = {
     'frequency_hz': 1.23e9,
     'level_dbm': -60.0,
@@ -157,18 +171,38 @@ data = {
     'signals': []
 }
 
+def cached_composite_iq(signals, sample_rate, duration=None):
+    """generate_composite_iq through the waveform cache; returns (key, float32 interleaved IQ)."""
+    signals = [dict(sig) for sig in signals]
+    key = waveform_key(signals, sample_rate, duration)
+    iq = waveform_cache.get_or_create(key, lambda: generate_composite_iq(signals, sample_rate, duration))
+    return key, iq
+
 spectrum_data = {'freqs': [], 'power': []}
 update_interval = 0.5
+# Welch settings for the live trace; width is the number of points sent to the browser
+spectrum_config = {'rbw': 10e3, 'window': 'hann', 'overlap': 0.5, 'mode': 'average', 'avg_count': 10,
+                   'width': 1001}
 
 def spectrum_update_loop():
     global spectrum_data
+    last_key = None
+    service = None
     while True:
-        iq = generate_composite_iq(data['signals'], data['sample_rate'])
-        spectrum = np.fft.fftshift(np.fft.fft(iq))
-        freqs = np.fft.fftshift(np.fft.fftfreq(len(iq), d=1.0/data['sample_rate']))
-        power = 20 * np.log10(np.abs(spectrum) + 1e-12)
-        spectrum_data['freqs'] = (freqs/1e6).tolist()
-        spectrum_data['power'] = power.tolist()
+        key, iq = cached_composite_iq(data['signals'], data['sample_rate'])
+        config = dict(spectrum_config)
+        if key == last_key and service is not None and service.config == config:
+            # unchanged scenario: re-send the last spectrum
+            socketio.emit('spectrum_update', spectrum_data)
+            time.sleep(update_config['interval'])
+            continue
+        last_key = key
+        service = SpectrumService(data['sample_rate'], rbw=config['rbw'], window=config['window'],
+                                  overlap=config['overlap'], mode=config['mode'], avg_count=config['avg_count'])
+        service.config = config
+        service.update(iq.view(np.complex64))
+        freqs, power = service.trace_db(config['width'])
+        spectrum_data = {'freqs': (freqs/1e6).tolist(), 'power': power.tolist(), 'rbw': service.rbw}
         socketio.emit('spectrum_update', spectrum_data)
         time.sleep(update_config['interval'])
 
@@ -236,12 +270,32 @@ def index():
 def spectrum_json():
     return jsonify(spectrum_data)
 
+@app.route('/spectrum_config', methods=['GET', 'POST'])
+def spectrum_config_route():
+    if request.method == 'POST':
+        try:
+            new = dict(spectrum_config)
+            for k, v in (request.json or {}).items():
+                if k in ('window', 'mode'):
+                    new[k] = str(v)
+                elif k in ('avg_count', 'width'):
+                    new[k] = int(v)
+                elif k in ('rbw', 'overlap'):
+                    new[k] = float(v)
+            # validate before the loop picks it up
+            SpectrumService(data['sample_rate'], rbw=new['rbw'], window=new['window'], mode=new['mode'])
+            spectrum_config.update(new)
+        except (TypeError, ValueError) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'ok', **spectrum_config})
+
 @app.route('/preview_signal', methods=['GET'])
 def preview_signal():
     try:
         sample_rate = data.get('sample_rate', 1e6)
         # For sweeping_cw, generate one sweep cycle
-        iq = generate_composite_iq(data['signals'], sample_rate, duration=None)
+        _, iq = cached_composite_iq(data['signals'], sample_rate)
+        iq = iq.view(np.complex64)
         i = np.real(iq).tolist()
         q = np.imag(iq).tolist()
         return jsonify({
@@ -265,7 +319,8 @@ def serve_iq_viewer():
 @app.route('/iq_purity_check', methods=['GET'])
 def iq_purity_check():
     sample_rate = data.get('sample_rate', 1e6)
-    iq = generate_composite_iq(data['signals'], sample_rate, duration=None)
+    _, iq = cached_composite_iq(data['signals'], sample_rate)
+    iq = iq.view(np.complex64)
     spectrum = np.fft.fft(iq)
     N = len(spectrum)
     pos = np.sum(np.abs(spectrum[N//2:]))
@@ -281,28 +336,23 @@ def iq_purity_check():
         'orthogonality': orthogonality
     })
 
+@functools.lru_cache(maxsize=8)
+def rrc_plot_png(sps, num_taps, rolloff):
+    # the plot only depends on the filter parameters, so render it once per set
+    rrc = rrc_filter(num_taps, rolloff, sps)
+    t = np.arange(-num_taps//2, num_taps//2 + 1) / sps
+    renderer = TraceRenderer('Root Raised Cosine Filter', 'Time (symbols)', 'Amplitude', figsize=(6, 3),
+                             label=f'RRC taps={num_taps}, sps={sps}, rolloff={rolloff}')
+    renderer.update(t, rrc)
+    return renderer.png()
+
 @app.route('/rrc_plot')
 def rrc_plot():
-    import matplotlib.pyplot as plt
-    from io import BytesIO
     import base64
     sps = 8
     num_taps = 21 * sps
     rolloff = 0.35
-    rrc = rrc_filter(num_taps, rolloff, sps)
-    t = np.arange(-num_taps//2, num_taps//2 + 1) / sps
-    plt.figure(figsize=(6,3))
-    plt.plot(t, rrc, label=f'RRC taps={num_taps}, sps={sps}, rolloff={rolloff}')
-    plt.title('Root Raised Cosine Filter')
-    plt.xlabel('Time (symbols)')
-    plt.ylabel('Amplitude')
-    plt.grid(True)
-    plt.legend()
-    buf = BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close()
-    buf.seek(0)
-    img_b64 = base64.b64encode(buf.read()).decode('utf-8')
+    img_b64 = base64.b64encode(rrc_plot_png(sps, num_taps, rolloff)).decode('utf-8')
     html = f'<img src="data:image/png;base64,{img_b64}"/><br>sps={sps}, num_taps={num_taps}, rolloff={rolloff}'
     return html
 
@@ -311,10 +361,8 @@ def transmit_vsg():
     try:
         if not vsg_status['dll_loaded'] or not vsg_status['device_opened']:
             return jsonify({'status': 'error', 'message': 'VSG not connected'}), 400
-        iq = generate_composite_iq(data['signals'], data['sample_rate'])
-        iq_interleaved = np.empty(2 * len(iq), dtype=np.float32)
-        iq_interleaved[0::2] = np.real(iq)
-        iq_interleaved[1::2] = np.imag(iq)
+        _, iq_interleaved = cached_composite_iq(data['signals'], data['sample_rate'])
+        iq = iq_interleaved.view(np.complex64)
         status = vsg.vsgRepeatWaveform(vsg_status['handle'], iq_interleaved.ctypes.data_as(ctypes.POINTER(ctypes.c_float)), len(iq))
         if status == 0:
             return jsonify({'status': 'ok', 'message': 'Composite IQ transmitted to VSG and looping.'})
@@ -6,7 +6,14 @@ from flask import Flask, render_template, request, redirect, url_for, jsonify, s
 import numpy as np
 import threading
 import time
+import sys
 import scipy.signal
+
+# shared generator modules live in the project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+import pulse_shaping
 from flask_socketio import SocketIO
 
 app = Flask(__name__)
@@ -50,18 +57,8 @@ def generate_psk(mod_type, num_symbols, sps, rolloff, symrate, sample_rate, freq
         symbols = np.exp(1j * (np.pi/8 + np.pi/4 * bits))
     else:
         raise ValueError('Unsupported PSK type')
-    upsampled = np.zeros(num_symbols * sps, dtype=np.complex64)
-    upsampled[::sps] = symbols
-    num_taps = 41 * sps
-    t = np.arange(-num_taps//2, num_taps//2 + 1) / sps
-    pi = np.pi
-    with np.errstate(divide='ignore', invalid='ignore'):
-        rrc = np.sinc(t) * np.cos(pi * 0.35 * t) / (1 - (2 * 0.35 * t)**2)
-    rrc[t == 0] = 1.0 - 0.35 + 4 * 0.35 / pi
-    t2 = np.abs(t) == 1/(4*0.35)
-    rrc[t2] = (0.35/np.sqrt(2)) * ((1 + 2/pi) * np.sin(pi/(4*0.35)) + (1 - 2/pi) * np.cos(pi/(4*0.35)))
-    rrc = rrc / np.sqrt(np.sum(rrc**2))
-    shaped = np.convolve(upsampled, rrc, mode='same')
+    # polyphase RRC (rolloff 0.35, 41 symbols) at the symbol rate, cached design (see pulse_shaping.py)
+    shaped = pulse_shaping.shape_symbols(symbols, sps, 0.35, 41)
     shaped /= np.max(np.abs(shaped))
     shaped *= 10**(gain_dbm/20)
     t = np.arange(len(shaped)) / sample_rate